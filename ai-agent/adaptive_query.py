@@ -4,8 +4,78 @@
 """
 
 import clickhouse_connect
+from check_columns import CheckColumns
 from config import settings
 
+# Колонки, которые нужны LogAnalyzer (кроме timestamp)
+ANALYSIS_COLUMNS = ['success', 'error', 'response_time', 'status_code']
+
+# Значения вместо отсутствующих в таблице колонок
+ANALYSIS_DEFAULTS = {
+    'success': 'true',
+    'error': "''",
+    'response_time': "CAST(NULL, 'Nullable(Float64)')",
+    'status_code': "CAST(NULL, 'Nullable(UInt16)')",
+}
+
+# Статистика последних N проверок одной строкой: по сети передаются агрегаты,
+# а не проверки, поэтому объем ответа не зависит от их количества
+SUMMARY_QUERY = """
+SELECT
+    count() AS total_checks,
+    countIf(NOT success) AS failed_checks,
+    avg(response_time) AS avg_response_time,
+    min(response_time) AS min_response_time,
+    max(response_time) AS max_response_time,
+    quantileExactInclusive(0.95)(response_time) AS p95_response_time,
+    countIf(status_code >= 200 AND status_code < 300) AS success_codes,
+    toUnixTimestamp(minIf(timestamp, NOT success)) AS first_error_time,
+    toUnixTimestamp(maxIf(timestamp, NOT success)) AS last_error_time,
+    -- Час с наибольшей долей отказов: (час, проверок, отказов) по часам
+    arrayMap((total, failed) -> failed / total, hourly.2, hourly.3) AS hourly_rates,
+    arrayMax(hourly_rates) AS peak_error_rate,
+    toUnixTimestamp((sumMap([toStartOfHour(timestamp)], [toUInt64(1)], [toUInt64(NOT success)]) AS hourly).1[
+        indexOf(hourly_rates, peak_error_rate)]) AS peak_window_start,
+    -- Типы ошибок: количество и время последнего появления (проверки идут от новых к старым)
+    sumMapIf([category], [toUInt64(1)], NOT success) AS category_counts,
+    maxMapIf([category], [toUnixTimestamp(timestamp)], NOT success) AS category_last_seen,
+    sumMapIf([category], [toUInt64(1)], NOT success AND error != '') AS text_category_counts,
+    arraySlice(
+        arrayMap(item -> item.2, arrayReverseSort(item -> item.1, groupArrayIf((timestamp, error), NOT success AND error != ''))),
+        1, 10
+    ) AS errors
+FROM
+(
+    SELECT timestamp, {success} AS success, ifNull({error}, '') AS error,
+           {response_time} AS response_time, {status_code} AS status_code,
+           {category} AS category
+    FROM checks
+    WHERE url = %(url)s
+    ORDER BY timestamp DESC
+    LIMIT {limit}
+)
+"""
+
+
+def _sql_string(value):
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _category_expression(error_patterns):
+    """multiIf по шаблонам ошибок: первый подходящий тип, иначе other (как LogAnalyzer._categorize_errors)"""
+    branches = []
+    for category, patterns in error_patterns.items():
+        needles = ', '.join(_sql_string(pattern) for pattern in patterns)
+        branches.append(f"multiSearchAnyCaseInsensitiveUTF8(error, [{needles}]), {_sql_string(category)}")
+    return f"multiIf({', '.join(branches)}, 'other')"
+
+
+def _ordered_categories(counts, last_seen):
+    """Типы ошибок в порядке первого появления в проверках от новых к старым"""
+    keys, values = counts
+    seen = dict(zip(*last_seen))
+    return {key: values[i] for i, key in sorted(enumerate(keys), key=lambda item: -seen[item[1]])}
+
 class AdaptiveClickHouseClient:
     def __init__(self):
         self.client = None
@@ -100,6 +170,77 @@ class AdaptiveClickHouseClient:
         except Exception as e:
             raise Exception(f"Ошибка при получении данных: {e}")
 
+    def get_checks_columns(self, url, limit=100):
+        """Получает проверки URL колонками для векторного анализа"""
+        if not self.client:
+            self.connect()
+        
+        try:
+            columns = self.get_table_columns()
+            # Время сразу в unix timestamp: колонка приводится к NumPy целиком, без разбора дат
+            select_columns = ['toUnixTimestamp(timestamp) AS ts'] + [
+                col for col in ANALYSIS_COLUMNS if col in columns
+            ]
+            query = (
+                f"SELECT {', '.join(select_columns)} FROM checks "
+                f"WHERE url = %(url)s ORDER BY timestamp DESC LIMIT {int(limit)}"
+            )
+            
+            result = self.client.query(query, {'url': url})
+            
+            # Результат уже по колонкам - без сборки словаря на каждую строку
+            data = dict(zip(result.column_names, result.result_columns))
+            data['timestamp'] = data.pop('ts', [])
+            return CheckColumns.from_columns(data)
+            
+        except Exception as e:
+            raise Exception(f"Ошибка при получении данных: {e}")
+
+    def get_checks_summary(self, url, error_patterns, limit=100):
+        """
+        Статистика последних проверок URL, посчитанная в ClickHouse одним запросом
+
+        Args:
+            error_patterns: Шаблоны типов ошибок (LogAnalyzer.error_patterns)
+
+        Returns:
+            dict: Агрегаты для LogAnalyzer.analyze_summary
+        """
+        if not self.client:
+            self.connect()
+        
+        try:
+            columns = self.get_table_columns()
+            expressions = {
+                col: col if col in columns else ANALYSIS_DEFAULTS[col]
+                for col in ANALYSIS_COLUMNS
+            }
+            query = SUMMARY_QUERY.format(
+                category=_category_expression(error_patterns),
+                limit=int(limit),
+                **expressions
+            )
+            
+            result = self.client.query(query, {'url': url})
+            row = dict(zip(result.column_names, result.result_rows[0]))
+            
+            summary = {
+                key: row[key] for key in (
+                    'total_checks', 'failed_checks', 'success_codes',
+                    'first_error_time', 'last_error_time', 'peak_error_rate', 'peak_window_start', 'errors'
+                )
+            }
+            # Нет ни одного времени ответа - avg/min/max пустые
+            for key in ('avg_response_time', 'min_response_time', 'max_response_time', 'p95_response_time'):
+                value = row[key]
+                summary[key] = float(value) if value is not None and value == value else 0
+            summary['error_categories'] = _ordered_categories(row['category_counts'], row['category_last_seen'])
+            summary['error_text_categories'] = dict(zip(*row['text_category_counts']))
+            return summary
+            
+        except Exception as e:
+            raise Exception(f"Ошибка при получении данных: {e}")
+
 def test_adaptive_query():
     """Тестирует адаптивный запрос"""
     print("🧪 Тестирование адаптивного запроса...")
@@ -1,8 +1,14 @@
 import asyncio
 import json
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-import statistics
+from typing import List, Dict, Any, Optional, Tuple, Union
+from datetime import datetime, timezone
+
+import numpy as np
+
+from check_columns import CheckColumns
+
+# Окно для поиска пика отказов, секунд
+ERROR_WINDOW_SECONDS = 3600
 
 class LogAnalyzer:
     """
@@ -20,89 +26,105 @@ class LogAnalyzer:
             "content": ["content error", "parsing error", "invalid response"]
         }
     
-    async def analyze_logs(self, logs_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def analyze_logs(self, logs_data: Union[CheckColumns, List[Dict[str, Any]]]) -> Dict[str, Any]:
         """
         Анализирует логи и возвращает результат анализа
+
+        Args:
+            logs_data: Колонки проверок или список записей (приводится к колонкам)
         """
-        # Проверяем наличие ошибок (success может быть 0/1 или True/False)
-        error_logs = []
-        for log in logs_data:
-            success = log.get('success', True)
-            # Обрабатываем разные типы данных для success
-            if isinstance(success, (int, str)):
-                success = bool(int(success))
-            if not success:
-                error_logs.append(log)
-        
-        if error_logs:
-            return await self._analyze_errors(error_logs, logs_data)
+        checks = logs_data if isinstance(logs_data, CheckColumns) else CheckColumns.from_records(logs_data)
+
+        if not checks.success.all():
+            return await self._analyze_errors(checks)
         else:
-            return await self._analyze_successful_service(logs_data)
+            return await self._analyze_successful_service(checks)
+    
+    async def analyze_summary(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Анализирует проверки по агрегатам, посчитанным в ClickHouse
+
+        Выводы те же, что у analyze_logs по тем же проверкам, но сами проверки
+        не загружаются (см. AdaptiveClickHouseClient.get_checks_summary).
+        """
+        if summary['failed_checks']:
+            has_span = summary['failed_checks'] > 1
+            error_analysis = self._describe_errors(
+                error_count=summary['failed_checks'],
+                total_checks=summary['total_checks'],
+                time_span=summary['last_error_time'] - summary['first_error_time'] if has_span else None,
+                peak_window=(summary['peak_error_rate'], summary['peak_window_start']) if has_span else None,
+                error_categories=summary['error_categories']
+            )
+            return {
+                "type": "errors",
+                "data": {
+                    "errors": summary['errors'],
+                    "error_analysis": error_analysis,
+                    "recommendations": self._generate_recommendations(summary['error_text_categories'])
+                }
+            }
+        
+        characteristics = self._generate_service_characteristics(
+            summary['avg_response_time'], summary['max_response_time'], summary['min_response_time'],
+            summary['p95_response_time'], summary['success_codes'], summary['total_checks']
+        )
+        return {
+            "type": "status",
+            "data": {
+                "general_characteristics": characteristics
+            }
+        }
     
-    async def _analyze_errors(self, error_logs: List[Dict[str, Any]], all_logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _analyze_errors(self, checks: CheckColumns) -> Dict[str, Any]:
         """
         Анализирует ошибки в логах
         """
-        # Извлекаем ошибки
-        errors = []
-        for log in error_logs:
-            if log.get('error'):
-                errors.append(log['error'])
+        # Тексты ошибок неуспешных проверок
+        error_texts = checks.error[~checks.success]
+        errors = error_texts[error_texts != '']
         
         # Группируем ошибки по типам
         error_categories = self._categorize_errors(errors)
         
         # Анализируем паттерны ошибок
-        error_analysis = self._analyze_error_patterns(error_logs, all_logs)
+        error_analysis = self._analyze_error_patterns(checks)
         
         # Генерируем рекомендации
-        recommendations = self._generate_recommendations(error_categories, error_logs)
+        recommendations = self._generate_recommendations(error_categories)
         
         return {
             "type": "errors",
             "data": {
-                "errors": errors[:10],  # Показываем максимум 10 ошибок
+                "errors": errors[:10].tolist(),  # Показываем максимум 10 ошибок
                 "error_analysis": error_analysis,
                 "recommendations": recommendations
             }
         }
     
-    async def _analyze_successful_service(self, logs_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _analyze_successful_service(self, checks: CheckColumns) -> Dict[str, Any]:
         """
         Анализирует успешно работающий сервис
         """
-        # Вычисляем метрики с безопасным преобразованием типов
-        response_times = []
-        for log in logs_data:
-            rt = log.get('response_time')
-            if rt is not None:
-                try:
-                    response_times.append(float(rt))
-                except (ValueError, TypeError):
-                    continue
-        
-        status_codes = []
-        for log in logs_data:
-            sc = log.get('status_code')
-            if sc is not None:
-                try:
-                    status_codes.append(int(sc))
-                except (ValueError, TypeError):
-                    continue
-        
-        avg_response_time = statistics.mean(response_times) if response_times else 0
-        max_response_time = max(response_times) if response_times else 0
-        min_response_time = min(response_times) if response_times else 0
+        # Метрики по колонкам: пропущенные значения (NaN) не учитываются
+        response_times = checks.response_time[~np.isnan(checks.response_time)]
+        status_codes = checks.status_code[~np.isnan(checks.status_code)].astype(int)
+        
+        if len(response_times):
+            avg_response_time = float(response_times.mean())
+            max_response_time = float(response_times.max())
+            min_response_time = float(response_times.min())
+            p95_response_time = float(np.percentile(response_times, 95))
+        else:
+            avg_response_time = max_response_time = min_response_time = p95_response_time = 0
         
         # Анализируем статус коды
-        status_distribution = {}
-        for status in status_codes:
-            status_distribution[status] = status_distribution.get(status, 0) + 1
+        success_codes = int(((status_codes >= 200) & (status_codes < 300)).sum())
         
         # Генерируем характеристику
         characteristics = self._generate_service_characteristics(
-            avg_response_time, max_response_time, min_response_time, 
-            status_distribution, len(logs_data)
+            avg_response_time, max_response_time, min_response_time, p95_response_time,
+            success_codes, len(checks)
         )
         
         return {
@@ -112,71 +134,75 @@ class LogAnalyzer:
             }
         }
     
-    def _categorize_errors(self, errors: List[str]) -> Dict[str, List[str]]:
+    def _categorize_errors(self, errors: np.ndarray) -> Dict[str, int]:
         """
-        Категоризирует ошибки по типам
+        Категоризирует ошибки по типам: количество ошибок каждого типа
+        
+        Сообщения об ошибках повторяются, поэтому по шаблонам сверяется
+        только каждый уникальный текст.
         """
         categories = {}
+        texts, first_index, counts = np.unique(errors.astype(str), return_index=True, return_counts=True)
         
-        for error in errors:
+        # Категории в порядке первого появления: при равном количестве главной
+        # считается встретившаяся раньше
+        order = np.argsort(first_index)
+        for error, count in zip(texts[order].tolist(), counts[order].tolist()):
             error_lower = error.lower()
-            categorized = False
-            
-            for category, patterns in self.error_patterns.items():
-                if any(pattern in error_lower for pattern in patterns):
-                    if category not in categories:
-                        categories[category] = []
-                    categories[category].append(error)
-                    categorized = True
-                    break
-            
-            if not categorized:
-                if "other" not in categories:
-                    categories["other"] = []
-                categories["other"].append(error)
+            category = next(
+                (name for name, patterns in self.error_patterns.items()
+                 if any(pattern in error_lower for pattern in patterns)),
+                "other"
+            )
+            categories[category] = categories.get(category, 0) + count
         
         return categories
     
-    def _analyze_error_patterns(self, error_logs: List[Dict[str, Any]], all_logs: List[Dict[str, Any]]) -> str:
+    def _analyze_error_patterns(self, checks: CheckColumns) -> str:
         """
         Анализирует паттерны ошибок и генерирует объяснение
         """
-        total_checks = len(all_logs)
-        error_count = len(error_logs)
-        error_rate = (error_count / total_checks) * 100 if total_checks > 0 else 0
+        failed = ~checks.success
         
-        # Анализируем временные паттерны с безопасным преобразованием
-        error_times = []
-        for log in error_logs:
-            timestamp = log.get('timestamp')
-            if timestamp:
-                try:
-                    # Обрабатываем разные форматы timestamp
-                    if isinstance(timestamp, str):
-                        # Убираем 'Z' и добавляем '+00:00' если нужно
-                        ts_str = timestamp.replace('Z', '+00:00')
-                        if '+' not in ts_str and 'Z' not in timestamp:
-                            ts_str += '+00:00'
-                        error_times.append(datetime.fromisoformat(ts_str))
-                    elif isinstance(timestamp, datetime):
-                        error_times.append(timestamp)
-                except (ValueError, TypeError):
-                    continue
-        error_times.sort()
+        # Время ошибок (проверки без времени пропускаем)
+        error_times = checks.timestamp[failed]
+        error_times = error_times[~np.isnan(error_times)]
+        time_span = error_times.max() - error_times.min() if len(error_times) > 1 else None
+        
+        return self._describe_errors(
+            error_count=int(failed.sum()),
+            total_checks=len(checks),
+            time_span=time_span,
+            peak_window=self._peak_error_window(checks) if time_span is not None else None,
+            # Неуспешные проверки без текста ошибки - "other"
+            error_categories=self._categorize_errors(checks.error[failed])
+        )
+    
+    def _describe_errors(self, error_count: int, total_checks: int, time_span: Optional[float],
+                         peak_window: Optional[Tuple[float, float]], error_categories: Dict[str, int]) -> str:
+        """
+        Объяснение ошибок по их статистике
+
+        Args:
+            time_span: Секунд между первой и последней ошибкой (None - меньше двух ошибок)
+            peak_window: Доля отказов и начало (unix timestamp) самого худшего часа
+            error_categories: Количество ошибок по типам в порядке первого появления
+        """
+        error_rate = (error_count / total_checks) * 100 if total_checks > 0 else 0
         
         # Проверяем на концентрацию ошибок во времени
-        if len(error_times) > 1:
-            time_span = (error_times[-1] - error_times[0]).total_seconds()
-            if time_span < 3600:  # Менее часа
-                time_pattern = "Ошибки сконцентрированы в коротком временном промежутке"
-            else:
-                time_pattern = "Ошибки распределены во времени"
-        else:
+        if time_span is None:
             time_pattern = "Единичная ошибка"
+        elif time_span < ERROR_WINDOW_SECONDS:  # Менее часа
+            time_pattern = "Ошибки сконцентрированы в коротком временном промежутке"
+        else:
+            peak_rate, peak_start = peak_window
+            window_start = datetime.fromtimestamp(peak_start, timezone.utc)
+            time_pattern = (f"Ошибки распределены во времени, пик отказов - {peak_rate * 100:.0f}% "
+                            f"проверок за час с {window_start:%d.%m %H:%M} UTC")
         
-        # Анализируем типы ошибок
-        error_categories = self._categorize_errors([log.get('error', '') for log in error_logs])
-        main_category = max(error_categories.keys(), key=lambda k: len(error_categories[k])) if error_categories else "unknown"
+        # При равном количестве главный тип - встретившийся раньше
+        main_category = max(error_categories, key=error_categories.get) if error_categories else "unknown"
         
         analysis = f"Обнаружено {error_count} ошибок из {total_checks} проверок ({error_rate:.1f}% отказов). {time_pattern}. "
         
@@ -193,7 +219,26 @@ class LogAnalyzer:
         
         return analysis
     
-    def _generate_recommendations(self, error_categories: Dict[str, List[str]], error_logs: List[Dict[str, Any]]) -> str:
+    def _peak_error_window(self, checks: CheckColumns) -> Tuple[float, float]:
+        """
+        Часовое окно с наибольшей долей отказов (гистограммы всех и неуспешных проверок)
+
+        Returns:
+            (доля отказов, начало окна в unix timestamp)
+        """
+        has_time = ~np.isnan(checks.timestamp)
+        times = checks.timestamp[has_time]
+        start = np.floor(times.min() / ERROR_WINDOW_SECONDS) * ERROR_WINDOW_SECONDS
+        edges = np.arange(start, times.max() + ERROR_WINDOW_SECONDS, ERROR_WINDOW_SECONDS)
+        
+        totals, _ = np.histogram(times, edges)
+        errors, _ = np.histogram(checks.timestamp[has_time & ~checks.success], edges)
+        rates = np.divide(errors, totals, out=np.zeros(len(totals)), where=totals > 0)
+        peak = int(rates.argmax())
+        
+        return float(rates[peak]), float(edges[peak])
+    
+    def _generate_recommendations(self, error_categories: Dict[str, int]) -> str:
         """
         Генерирует рекомендации по устранению ошибок
         """
@@ -223,8 +268,8 @@ class LogAnalyzer:
         return "Рекомендации: " + "; ".join(recommendations) + "."
     
     def _generate_service_characteristics(self, avg_response_time: float, max_response_time: float, 
-                                        min_response_time: float, status_distribution: Dict[int, int], 
-                                        total_checks: int) -> str:
+                                        min_response_time: float, p95_response_time: float,
+                                        success_codes: int, total_checks: int) -> str:
         """
         Генерирует характеристику успешно работающего сервиса
         """
@@ -239,13 +284,12 @@ class LogAnalyzer:
             perf_desc = "требует оптимизации"
         
         # Анализируем стабильность
-        if max_response_time / avg_response_time < 2:
+        if not avg_response_time or max_response_time / avg_response_time < 2:
             stability_desc = "стабильная"
         else:
             stability_desc = "нестабильная"
         
         # Проверяем статус коды
-        success_codes = sum(count for status, count in status_distribution.items() if 200 <= status < 300)
         success_rate = (success_codes / total_checks) * 100 if total_checks > 0 else 0
         
         if success_rate >= 99:
@@ -255,4 +299,4 @@ class LogAnalyzer:
         else:
             reliability_desc = "средняя надежность"
         
-        return f"Сервис работает стабильно с {reliability_desc} ({success_rate:.1f}% успешных запросов). Производительность {perf_desc} (среднее время отклика {avg_response_time:.0f}мс), {stability_desc} работа."
+        return f"Сервис работает стабильно с {reliability_desc} ({success_rate:.1f}% успешных запросов). Производительность {perf_desc} (среднее время отклика {avg_response_time:.0f}мс, p95 {p95_response_time:.0f}мс), {stability_desc} работа."
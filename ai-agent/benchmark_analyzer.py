@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк LogAnalyzer на больших выборках проверок
+
+Выборка в двух видах: список записей (как из get_checks_data) и колонки
+(как из get_checks_columns). Для каждого размера - время анализа с ошибками
+и без.
+"""
+
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from ai_agent import LogAnalyzer
+from check_columns import CheckColumns
+
+SIZES = (1000, 10000, 100000)
+ROUNDS = 5
+ERRORS = ["Connection timeout", "SSL handshake failed", "502 Bad Gateway", "connection refused"]
+
+
+def build_records(count: int, error_share: float) -> list:
+    random.seed(count)
+    start = datetime(2024, 1, 1)
+    records = []
+    for i in range(count):
+        failed = random.random() < error_share
+        records.append({
+            'url': 'https://example.com',
+            'timestamp': (start + timedelta(seconds=30 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+            'success': 0 if failed else 1,
+            'error': random.choice(ERRORS) if failed else None,
+            'response_time': round(random.uniform(0.05, 0.4) + (5 if failed else 0), 3),
+            'status_code': 0 if failed else random.choice((200, 200, 200, 301)),
+        })
+    return records
+
+
+def measure(analyzer: LogAnalyzer, data) -> float:
+    durations = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        asyncio.run(analyzer.analyze_logs(data))
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def main():
+    analyzer = LogAnalyzer()
+    print(f"⏱  Медиана из {ROUNDS} прогонов, мс")
+    print(f"{'проверок':>9} {'ошибки':>7} {'записи':>9} {'колонки':>9}")
+    for count in SIZES:
+        for error_share in (0.0, 0.05):
+            records = build_records(count, error_share)
+            columns = CheckColumns.from_records(records)
+            print(f"{count:>9} {error_share:>7.0%} {measure(analyzer, records) * 1000:>9.1f} "
+                  f"{measure(analyzer, columns) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
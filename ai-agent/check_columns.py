@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Проверки сервиса в колоночном виде для векторного анализа
+
+Каждое поле проверки - массив NumPy, статистика считается целиком по массивам
+(среднее, перцентили, гистограммы) без обхода записей в Python.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+
+def _parse_timestamp(value: Any) -> float:
+    """Время проверки в unix timestamp (строка ISO, datetime или число); NaN - не распознано"""
+    try:
+        if isinstance(value, datetime):
+            return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+        if value is not None:
+            return float(value)
+    except (ValueError, TypeError):
+        pass
+    return np.nan
+
+
+def _parse_timestamps(values: Sequence[Any]) -> np.ndarray:
+    """Колонка времени: числа и строки без часового пояса разбираются NumPy целиком, остальное - поштучно"""
+    first = values[0] if len(values) else None
+    if isinstance(first, str):
+        if all(isinstance(value, str) and len(value) == 19 for value in values):
+            try:
+                return np.array(values, dtype='datetime64[s]').astype('int64').astype(float)
+            except ValueError:
+                pass
+    elif not isinstance(first, datetime):
+        try:
+            return np.asarray(values, dtype=float)
+        except (ValueError, TypeError):
+            pass
+    return np.array([_parse_timestamp(value) for value in values], dtype=float)
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _to_success(value: Any) -> bool:
+    # success может быть 0/1, '0'/'1' или True/False
+    if isinstance(value, (int, str)):
+        try:
+            return bool(int(value))
+        except ValueError:
+            return False
+    return bool(value)
+
+
+class CheckColumns:
+    """
+    Колонки проверок:
+        timestamp - unix timestamp (NaN - нет времени)
+        success - bool
+        error - текст ошибки ('' - нет)
+        response_time - время отклика (NaN - нет значения)
+        status_code - HTTP статус (NaN - нет значения)
+    """
+
+    def __init__(self, timestamp: np.ndarray, success: np.ndarray, error: np.ndarray,
+                 response_time: np.ndarray, status_code: np.ndarray):
+        self.timestamp = timestamp
+        self.success = success
+        self.error = error
+        self.response_time = response_time
+        self.status_code = status_code
+
+    def __len__(self) -> int:
+        return len(self.success)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence[Any]]) -> 'CheckColumns':
+        """Из колонок результата запроса (имя колонки -> значения); отсутствующие колонки пустые"""
+        size = len(next(iter(columns.values()))) if columns else 0
+
+        def column(name, convert, dtype, default):
+            values = columns.get(name)
+            if values is None:
+                return np.full(size, default, dtype=dtype)
+            array = np.asarray(values)
+            # Числовая колонка (как ее отдает ClickHouse) приводится целиком,
+            # смешанные типы и строки - поштучно
+            if array.dtype.kind in 'biuf':
+                return array.astype(dtype)
+            return np.array([convert(value) for value in values], dtype=dtype)
+
+        timestamps = columns.get('timestamp')
+        return cls(
+            timestamp=_parse_timestamps(list(timestamps)) if timestamps is not None else np.full(size, np.nan),
+            # Нет колонки success - считаем проверки успешными
+            success=column('success', _to_success, bool, True),
+            error=column('error', lambda value: value or '', object, ''),
+            response_time=column('response_time', _to_float, float, np.nan),
+            status_code=column('status_code', _to_float, float, np.nan),
+        )
+
+    @classmethod
+    def from_records(cls, logs_data: List[Dict[str, Any]]) -> 'CheckColumns':
+        """Из списка записей (формат get_checks_data)"""
+        keys = ('timestamp', 'error', 'response_time', 'status_code')
+        columns = {key: [log.get(key) for log in logs_data] for key in keys}
+        columns['success'] = [log.get('success', True) for log in logs_data]
+        return cls.from_columns(columns)
@@ -18,5 +18,8 @@ class Settings:
     # Настройки анализа
     DEFAULT_CHECK_COUNT: int = int(os.getenv("DEFAULT_CHECK_COUNT", "100"))
     MAX_CHECK_COUNT: int = int(os.getenv("MAX_CHECK_COUNT", "1000"))
+    # aggregate - статистика считается в ClickHouse одним запросом,
+    # columns - проверки загружаются колонками и анализируются в NumPy
+    ANALYSIS_MODE: str = os.getenv("ANALYSIS_MODE", "aggregate")
 
 settings = Settings()
@@ -61,18 +61,31 @@ async def analyze_service_logs(request: AnalysisRequest):
         
         # Получаем данные из ClickHouse с адаптивным запросом
         try:
-            logs_data, used_columns = adaptive_client.get_checks_data(
-                url=request.url, 
-                limit=request.check_count
-            )
+            if settings.ANALYSIS_MODE == "aggregate":
+                # В ClickHouse считаются агрегаты, по сети передается одна строка
+                summary = adaptive_client.get_checks_summary(
+                    url=request.url,
+                    error_patterns=log_analyzer.error_patterns,
+                    limit=request.check_count
+                )
+                total_checks = summary['total_checks']
+            else:
+                checks = adaptive_client.get_checks_columns(
+                    url=request.url, 
+                    limit=request.check_count
+                )
+                total_checks = len(checks)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         
-        if not logs_data:
+        if not total_checks:
             raise HTTPException(status_code=404, detail=f"No data found for URL: {request.url}")
         
         # Анализируем данные с помощью AI агента
-        analysis_result = await log_analyzer.analyze_logs(logs_data)
+        if settings.ANALYSIS_MODE == "aggregate":
+            analysis_result = await log_analyzer.analyze_summary(summary)
+        else:
+            analysis_result = await log_analyzer.analyze_logs(checks)
         
         return AnalysisResponse(
             url=request.url,
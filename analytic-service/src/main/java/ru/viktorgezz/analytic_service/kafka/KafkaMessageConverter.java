@@ -23,6 +23,11 @@ public class KafkaMessageConverter {
                 .configure(
                         DeserializationFeature.FAIL_ON_UNKNOWN_PROPERTIES,
                         false
+                )
+                // Одна запись на результат (новый формат) или массив результатов (старый)
+                .configure(
+                        DeserializationFeature.ACCEPT_SINGLE_VALUE_AS_ARRAY,
+                        true
                 );
     }
 
@@ -223,5 +223,21 @@ class KafkaMessageConverterTest {
         checks.forEach(System.out::println);
         assertEquals(2, checks.size());
     }
-}
 
+    @Test
+    void testConvertSingleCheckRecord() {
+        String json = """
+                {
+                  "url": "https://github.com",
+                  "timestamp": "2025-09-20T01:46:19.339932+00:00",
+                  "success": true,
+                  "status_code": 200
+                }
+                """;
+
+        List<Check> checks = converter.toChecks(json);
+
+        assertEquals(1, checks.size());
+        assertEquals("https://github.com", checks.get(0).getUrl());
+    }
+}
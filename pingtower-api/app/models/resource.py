@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Integer, JSON, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -27,6 +27,12 @@ class Endpoint(Base):
     resource_id = Column(UUID(as_uuid=True), ForeignKey("resources.id"), nullable=False)
     path = Column(String, nullable=False)
     method = Column(String, nullable=False)  # GET, POST, PUT, DELETE, etc.
+    # Параметры проверки: заголовки и тело запроса, ожидаемый ответ
+    request_headers = Column(JSON)  # {"Authorization": "Bearer ..."}
+    request_body = Column(Text)
+    expected_status = Column(Integer)  # по умолчанию успех - 2xx/3xx
+    expected_body = Column(String)  # подстрока, которая должна быть в ответе
+    availability_only = Column(Boolean, default=False)  # GET проверяется запросом HEAD
     current_status = Column(String, default="UNKNOWN")  # UP, DOWN, UNKNOWN
     incidents_24h = Column(Integer, default=0)
     last_response_time = Column(Integer, default=0)  # в миллисекундах
@@ -340,6 +340,11 @@ async def create_endpoints(
             resource_id=request_data.resource_id,
             path=endpoint_data.path,
             method=endpoint_data.method,
+            request_headers=endpoint_data.request_headers,
+            request_body=endpoint_data.request_body,
+            expected_status=endpoint_data.expected_status,
+            expected_body=endpoint_data.expected_body,
+            availability_only=endpoint_data.availability_only,
             current_status="UNKNOWN"
         )
         db.add(endpoint)
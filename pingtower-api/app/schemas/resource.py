@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from uuid import UUID
 
@@ -50,6 +50,11 @@ class EndpointsUpdate(BaseModel):
 class EndpointCreate(BaseModel):
     path: str
     method: str
+    request_headers: Optional[Dict[str, str]] = None
+    request_body: Optional[str] = None
+    expected_status: Optional[int] = None
+    expected_body: Optional[str] = None
+    availability_only: bool = False
 
 class EndpointsCreateRequest(BaseModel):
     resource_id: UUID
@@ -12,50 +12,68 @@ class MonitoringService:
         self.api_url = "http://203.81.208.57:8020/api/v1/test-endpoints"
         self.timeout = 30
         self.max_concurrent = 20
+        # Сервис только ставит задание в очередь и сразу отвечает 202
+        self.request_timeout = 10
     
     def send_endpoints_for_monitoring(
         self, 
-        urls: List[str], 
+        urls: List[str] = None, 
         max_concurrent: int = None, 
-        timeout: int = None
+        timeout: int = None,
+        targets: List[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Отправка эндпоинтов на внешний сервис мониторинга
         
         Args:
-            urls: Список URL для мониторинга
+            urls: Список URL для мониторинга (проверяются GET)
             max_concurrent: Максимальное количество одновременных запросов
             timeout: Таймаут для запросов
+            targets: Проверки с методом, телом запроса и ожидаемым ответом (build_check_targets)
             
         Returns:
             Dict с результатом запроса
         """
-        if not urls:
+        urls = urls or []
+        targets = targets or []
+        if not urls and not targets:
             logger.warning("Список URL для мониторинга пуст")
             return {"error": "No URLs provided"}
-        print(f"urls: {urls}")
         payload = {
             "urls": urls,
+            "targets": targets,
             "max_concurrent": max_concurrent or self.max_concurrent,
             "timeout": timeout or self.timeout
         }
+        total_urls = len(urls) + len(targets)
         
         try:
-            logger.info(f"Отправка {len(urls)} URL на мониторинг: {self.api_url}")
+            logger.info(f"Отправка {total_urls} URL на мониторинг: {self.api_url}")
             
             response = requests.post(
                 self.api_url,
                 json=payload,
-                timeout=self.timeout + 10  # Дополнительное время для HTTP запроса
+                timeout=self.request_timeout
             )
             
-            if response.status_code == 200:
+            if response.status_code in (200, 202):
                 result = response.json()
                 logger.info(f"Успешно отправлено на мониторинг: {result}")
                 return {
                     "success": True,
                     "data": result,
-                    "total_urls": len(urls)
+                    "batch_id": result.get("batch_id"),
+                    "total_urls": total_urls
+                }
+            elif response.status_code == 429:
+                # Очередь сервиса мониторинга заполнена - повторим на следующем запуске
+                retry_after = response.headers.get("Retry-After")
+                logger.warning(f"Очередь API мониторинга заполнена, повтор через {retry_after} с")
+                return {
+                    "success": False,
+                    "error": "Queue full",
+                    "retry_after": int(retry_after) if retry_after and retry_after.isdigit() else None,
+                    "details": response.json() if response.content else {}
                 }
             else:
                 error_data = response.json() if response.content else {}
@@ -95,6 +113,51 @@ class MonitoringService:
                 "details": str(e)
             }
     
+    def build_check_targets(self, endpoints: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Построение проверок из эндпоинтов: полный URL, метод и параметры запроса/ответа
+        
+        Args:
+            endpoints: Список эндпоинтов с информацией о ресурсе
+            
+        Returns:
+            Список проверок для поля targets API мониторинга
+        """
+        targets = []
+        for endpoint in endpoints:
+            full_url = self._build_full_url(endpoint)
+            if not full_url:
+                logger.warning(f"Пропуск эндпоинта из-за отсутствия URL: {endpoint}")
+                continue
+            
+            target = {
+                "url": full_url,
+                "method": (endpoint.get("method") or "GET").upper(),
+                "availability_only": bool(endpoint.get("availability_only"))
+            }
+            # Необязательные параметры передаем только если заданы
+            optional_fields = {
+                "headers": endpoint.get("request_headers"),
+                "body": endpoint.get("request_body"),
+                "expected_status": endpoint.get("expected_status"),
+                "expected_body": endpoint.get("expected_body")
+            }
+            target.update({key: value for key, value in optional_fields.items() if value is not None})
+            targets.append(target)
+        
+        logger.info(f"Итого построено {len(targets)} проверок")
+        return targets
+    
+    @staticmethod
+    def _build_full_url(endpoint: Dict[str, Any]) -> str:
+        """Полный URL эндпоинта (пустая строка, если у ресурса нет URL)"""
+        resource_url = endpoint.get("resource_url", "").rstrip("/")
+        endpoint_path = endpoint.get("path", "").lstrip("/")
+        
+        if resource_url and endpoint_path:
+            return f"{resource_url}/{endpoint_path}"
+        return resource_url
+    
     def build_full_urls(self, endpoints: List[Dict[str, Any]]) -> List[str]:
         """
         Построение полных URL из эндпоинтов и ресурсов
@@ -110,14 +173,8 @@ class MonitoringService:
         
         for i, endpoint in enumerate(endpoints):
             logger.info(f"Обработка эндпоинта {i+1}: {endpoint}")
-            resource_url = endpoint.get("resource_url", "").rstrip("/")
-            endpoint_path = endpoint.get("path", "").lstrip("/")
-            
-            if resource_url and endpoint_path:
-                full_url = f"{resource_url}/{endpoint_path}"
-            elif resource_url:
-                full_url = resource_url
-            else:
+            full_url = self._build_full_url(endpoint)
+            if not full_url:
                 logger.warning(f"Пропуск эндпоинта из-за отсутствия URL: {endpoint}")
                 continue
                 
@@ -29,24 +29,25 @@ def monitor_all_endpoints(self):
         # Создаем сервис мониторинга
         monitoring_service = MonitoringService()
         
-        # Строим полные URL
-        urls = monitoring_service.build_full_urls(endpoints_data)
+        # Строим проверки: URL, метод, тело запроса и ожидаемый ответ
+        targets = monitoring_service.build_check_targets(endpoints_data)
         
-        if not urls:
+        if not targets:
             logger.warning("Не удалось построить URL для мониторинга")
             return {"message": "No valid URLs to monitor"}
         
-        logger.info(f"Отправка {len(urls)} URL на мониторинг")
+        logger.info(f"Отправка {len(targets)} URL на мониторинг")
         
         # Отправляем на внешний API
-        result = monitoring_service.send_endpoints_for_monitoring(urls)
+        result = monitoring_service.send_endpoints_for_monitoring(targets=targets)
         
         if result.get("success"):
-            logger.info(f"Успешно отправлено на мониторинг: {result.get('total_urls', 0)} URL")
+            logger.info(f"Успешно отправлено на мониторинг: {result.get('total_urls', 0)} URL, batch_id: {result.get('batch_id')}")
             return {
                 "status": "success",
                 "message": f"Sent {result.get('total_urls', 0)} URLs for monitoring",
-                "total_urls": result.get('total_urls', 0)
+                "total_urls": result.get('total_urls', 0),
+                "batch_id": result.get('batch_id')
             }
         else:
             logger.error(f"Ошибка при отправке на мониторинг: {result.get('error')}")
@@ -96,6 +97,11 @@ def get_all_active_endpoints() -> List[Dict[str, Any]]:
                 "resource_url": str(resource.url),
                 "path": endpoint.path,
                 "method": endpoint.method,
+                "request_headers": endpoint.request_headers,
+                "request_body": endpoint.request_body,
+                "expected_status": endpoint.expected_status,
+                "expected_body": endpoint.expected_body,
+                "availability_only": bool(endpoint.availability_only),
                 "user_id": user_selected.user_id
             }
             endpoints_data.append(endpoint_data)
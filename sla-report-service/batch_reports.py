@@ -0,0 +1,252 @@
+"""
+Пакетная генерация SLA-отчетов по списку ресурсов за период
+
+Данные читаются из хранилища метрик пачками (несколько агрегирующих запросов
+на пачку вместо запроса на ресурс), отчеты строятся параллельно в пуле процессов
+и складываются в zip-архив по мере готовности. Архив открывается, пополняется
+и закрывается в потоке, чтобы запись большого пакета не останавливала event loop.
+Прогресс доступен по id задания.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class BatchLimitError(Exception):
+    """Выполняется максимальное число пакетных заданий"""
+
+    def __init__(self, max_running: int):
+        super().__init__(f"Уже выполняется {max_running} пакетных заданий, повторите позже")
+        self.max_running = max_running
+
+
+def _archive_names(resource_ids: List[str]) -> Dict[str, str]:
+    """Имена файлов в архиве; id, совпавшим после замены символов, добавляется суффикс"""
+    names: Dict[str, str] = {}
+    used = set()
+    for resource_id in resource_ids:
+        base = f"sla_report_{re.sub(r'[^A-Za-z0-9_.-]', '_', resource_id)}"
+        name, suffix = f"{base}.pdf", 1
+        while name in used:
+            suffix += 1
+            name = f"{base}_{suffix}.pdf"
+        used.add(name)
+        names[resource_id] = name
+    return names
+
+
+def _locked(lock: threading.Lock, func: Callable, *args):
+    with lock:
+        return func(*args)
+
+
+class BatchJob:
+    def __init__(self, job_id: str, resources: List[Dict], start: datetime, end: datetime, path: str):
+        self.job_id = job_id
+        self.resources = resources
+        self.start = start
+        self.end = end
+        self.path = path
+        self.archive_names = _archive_names([resource['resourceId'] for resource in resources])
+        self.status = QUEUED
+        self.completed = 0
+        self.failed = 0
+        self.errors: Dict[str, str] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        total = len(self.resources)
+        processed = self.completed + self.failed
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            'jobId': self.job_id,
+            'status': self.status,
+            'periodStart': self.start.isoformat(),
+            'periodEnd': self.end.isoformat(),
+            'total': total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'progress': round(processed * 100 / total, 1) if total else 100.0,
+            'elapsedSeconds': round(elapsed, 1),
+            'errors': dict(list(self.errors.items())[:100]),
+            'error': self.error,
+        }
+
+
+class BatchReportManager:
+    def __init__(self, fetch: Callable[[List[Dict], datetime, datetime], Dict[str, Dict]],
+                 render: Callable[[Dict], Awaitable[bytes]], output_dir: str,
+                 concurrency: int, fetch_chunk: int, max_jobs: int, max_running: int):
+        """
+        Args:
+            fetch: Блокирующая загрузка данных отчетов пачки ресурсов (выполняется в потоке)
+            render: Генерация PDF по данным отчета
+            output_dir: Каталог архивов
+            concurrency: Сколько отчетов задания генерируется одновременно
+            fetch_chunk: Сколько ресурсов запрашивается из хранилища за раз
+            max_jobs: Сколько заданий (и их архивов) хранится
+            max_running: Сколько заданий выполняется одновременно (каждое занимает concurrency генераций)
+        """
+        self.fetch = fetch
+        self.render = render
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.fetch_chunk = fetch_chunk
+        self.max_jobs = max_jobs
+        self.max_running = max_running
+        self._jobs: 'OrderedDict[str, BatchJob]' = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, resources: List[Dict], start: datetime, end: datetime) -> BatchJob:
+        """
+        Запуск задания
+
+        Raises:
+            BatchLimitError: если уже выполняется max_running заданий
+        """
+        if len(self._tasks) >= self.max_running:
+            raise BatchLimitError(self.max_running)
+        # Повторы resourceId дали бы одинаковые файлы в архиве - остается первое вхождение
+        unique: Dict[str, Dict] = {}
+        for resource in resources:
+            unique.setdefault(resource['resourceId'], resource)
+        resources = list(unique.values())
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        job_id = f"batch_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        job = BatchJob(job_id, resources, start, end, os.path.join(self.output_dir, f"{job_id}.zip"))
+        self._jobs[job_id] = job
+        self._trim_history()
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return job
+
+    def cleanup(self):
+        """Удаление архивов, оставшихся от прошлого запуска (их задания не сохраняются)"""
+        if not os.path.isdir(self.output_dir):
+            return
+        for name in os.listdir(self.output_dir):
+            if name.startswith('batch_') and name.endswith('.zip'):
+                os.unlink(os.path.join(self.output_dir, name))
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self._jobs.get(job_id)
+
+    def _trim_history(self):
+        """Удаление самых старых завершенных заданий вместе с архивами"""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            job = self._jobs[job_id]
+            if job.status in (DONE, FAILED):
+                del self._jobs[job_id]
+                try:
+                    os.unlink(job.path)
+                except OSError:
+                    pass
+
+    async def stop(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _run(self, job: BatchJob):
+        job.status = RUNNING
+        job.started_at = time.time()
+        logger.info(f"Пакет {job.job_id}: {len(job.resources)} ресурсов за {job.start:%d.%m.%Y}-{job.end:%d.%m.%Y}")
+
+        # Ограниченная очередь: загрузка следующей пачки идет, пока строятся отчеты
+        # предыдущей, но в памяти не больше пачки данных сверх работающих генераций
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.fetch_chunk)
+        try:
+            archive = await asyncio.to_thread(zipfile.ZipFile, job.path, 'w', compression=zipfile.ZIP_STORED)
+            # zipfile не допускает одновременной записи - файлы дописываются по одному.
+            # Блокировка берется в потоке: запись, начатая до отмены задания,
+            # завершается раньше закрытия архива
+            lock = threading.Lock()
+            try:
+                workers = [asyncio.create_task(self._render_worker(job, queue, archive, lock))
+                           for _ in range(self.concurrency)]
+                try:
+                    await self._produce(job, queue)
+                    for _ in workers:
+                        await queue.put(None)
+                    await asyncio.gather(*workers)
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+            finally:
+                # Центральный каталог пишется при закрытии
+                await asyncio.to_thread(_locked, lock, archive.close)
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = FAILED
+            job.error = 'Задание остановлено'
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"Пакет {job.job_id} завершился с ошибкой: {e}")
+        finally:
+            job.finished_at = time.time()
+
+        logger.info(f"Пакет {job.job_id}: готово {job.completed}, ошибок {job.failed} "
+                    f"за {job.finished_at - job.started_at:.1f} с")
+
+    async def _produce(self, job: BatchJob, queue: asyncio.Queue):
+        for offset in range(0, len(job.resources), self.fetch_chunk):
+            chunk = job.resources[offset:offset + self.fetch_chunk]
+            reports = await asyncio.to_thread(self.fetch, chunk, job.start, job.end)
+            for resource in chunk:
+                data = reports.get(resource['resourceId'])
+                if data is None:
+                    self._record_error(job, resource['resourceId'], 'Нет проверок за период')
+                else:
+                    await queue.put(data)
+
+    async def _render_worker(self, job: BatchJob, queue: asyncio.Queue, archive: zipfile.ZipFile,
+                             lock: threading.Lock):
+        while True:
+            data = await queue.get()
+            if data is None:
+                return
+            try:
+                pdf = await self.render(data)
+                await asyncio.to_thread(_locked, lock, archive.writestr, job.archive_names[data['resourceId']], pdf)
+                job.completed += 1
+                self._log_progress(job)
+            except Exception as e:
+                self._record_error(job, data['resourceId'], str(e) or type(e).__name__)
+
+    def _record_error(self, job: BatchJob, resource_id: str, error: str):
+        job.failed += 1
+        job.errors[resource_id] = error
+        self._log_progress(job)
+
+    def _log_progress(self, job: BatchJob):
+        total = len(job.resources)
+        processed = job.completed + job.failed
+        # Прогресс в лог - каждые 10%
+        if processed == total or processed * 10 // total != (processed - 1) * 10 // total:
+            logger.info(f"Пакет {job.job_id}: {processed}/{total} ({processed * 100 // total}%)")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк графиков отчета: PNG из matplotlib против векторных графиков ReportLab
+
+Ряды - 30 дней почасовых данных (720 точек). Для каждого варианта измеряется
+время генерации отчета и размер PDF.
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from report_generator import render_report
+
+POINTS = 30 * 24
+ROUNDS = 5
+
+
+def build_payload(points: int = POINTS) -> dict:
+    start = datetime(2024, 1, 1)
+    timestamps = [(start + timedelta(hours=i)).isoformat() + 'Z' for i in range(points)]
+    return {
+        'resourceId': 'benchmark',
+        'resourceName': 'Benchmark',
+        'url': 'https://example.com',
+        'metrics': {'uptime': 99.7, 'avgResponseTime': 180, 'incidents': 12, 'mttr': 25, 'slaCompliance': 99.2},
+        'stats': {
+            'failuresCount': [{'timestamp': t, 'value': (i * 7) % 11 // 3} for i, t in enumerate(timestamps)],
+            'responseTime': [{'timestamp': t, 'value': 90 + (i * 37) % 280} for i, t in enumerate(timestamps)],
+            'failuresByTypes': {'critical': 4, 'warning': 9, 'resolved': 30},
+        },
+    }
+
+
+def measure(payload: dict, vector: bool):
+    render_report(payload, vector)  # прогрев: импорт, шрифты, кэши matplotlib
+    durations = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        pdf = render_report(payload, vector)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), len(pdf)
+
+
+def main():
+    payload = build_payload()
+    print(f"📊 {POINTS} точек в ряду, медиана из {ROUNDS} прогонов")
+    print(f"{'графики':>10} {'время, мс':>10} {'PDF, КиБ':>9}")
+    results = {}
+    for name, vector in (('raster', False), ('vector', True)):
+        duration, size = measure(payload, vector)
+        results[name] = (duration, size)
+        print(f"{name:>10} {duration * 1000:>10.0f} {size / 1024:>9.0f}")
+
+    raster, vector = results['raster'], results['vector']
+    print(f"\nvector/raster: время ×{vector[0] / raster[0]:.2f}, размер ×{vector[1] / raster[1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
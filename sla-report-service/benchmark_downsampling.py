@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк прореживания рядов: время отчета в зависимости от длины ряда
+
+Ряды с минутным шагом от суток до 30 дней (43 200 точек). После прореживания
+на график попадает не больше MAX_POINTS точек, поэтому время отчета почти
+не зависит от длины ряда (остается только разбор JSON и меток времени).
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from downsampling import MAX_POINTS
+from report_generator import init_worker, render_report
+
+ROUNDS = 3
+
+
+def build_payload(points: int) -> dict:
+    start = datetime(2024, 1, 1)
+    timestamps = [(start + timedelta(minutes=i)).isoformat() + 'Z' for i in range(points)]
+    return {
+        'resourceId': 'benchmark',
+        'resourceName': 'Benchmark',
+        'url': 'https://example.com',
+        'metrics': {'uptime': 99.7, 'avgResponseTime': 180, 'incidents': 12, 'mttr': 25, 'slaCompliance': 99.2},
+        'stats': {
+            'failuresCount': [{'timestamp': t, 'value': (i * 7) % 11 // 3} for i, t in enumerate(timestamps)],
+            'responseTime': [{'timestamp': t, 'value': 90 + (i * 37) % 280} for i, t in enumerate(timestamps)],
+            'failuresByTypes': {'critical': 4, 'warning': 9, 'resolved': 30},
+        },
+    }
+
+
+def measure(payload: dict, vector: bool) -> float:
+    durations = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        render_report(payload, vector)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def main():
+    init_worker(False)
+    init_worker(True)
+    print(f"📉 Не больше {MAX_POINTS} точек на графике, медиана из {ROUNDS} прогонов")
+    print(f"{'точек':>7} {'raster, мс':>11} {'vector, мс':>11}")
+    for points in (1440, 7 * 1440, 30 * 1440):
+        payload = build_payload(points)
+        raster = measure(payload, vector=False)
+        vector = measure(payload, vector=True)
+        print(f"{points:>7} {raster * 1000:>11.0f} {vector * 1000:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк прогретого движка отчетов
+
+- холодный старт: импорт модуля и init_worker в новом процессе;
+- время отчета с общим движком процесса против движка, создаваемого на каждый
+  запрос (прежнее поведение: регистрация шрифта и стили заново).
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmark_charts import build_payload
+from report_generator import ReportEngine, SLAReportGenerator, get_engine, init_worker
+
+ROUNDS = 10
+COLD_START_SCRIPT = '''
+import time
+started = time.perf_counter()
+from report_generator import init_worker
+imported = time.perf_counter()
+init_worker({vector})
+print(imported - started, time.perf_counter() - imported)
+'''
+
+
+def cold_start(vector: bool):
+    output = subprocess.check_output([sys.executable, '-c', COLD_START_SCRIPT.format(vector=vector)], text=True)
+    import_time, init_time = map(float, output.split())
+    return import_time, init_time
+
+
+def per_report(payload: dict, vector: bool, shared: bool) -> float:
+    durations = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        engine = get_engine() if shared else ReportEngine()
+        SLAReportGenerator(payload, vector, engine).generate_report()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def main():
+    print("🧊 Холодный старт процесса (импорт + прогрев движка)")
+    for name, vector in (('raster', False), ('vector', True)):
+        import_time, init_time = cold_start(vector)
+        print(f"{name:>8}: импорт {import_time * 1000:.0f} мс, init_worker {init_time * 1000:.0f} мс")
+
+    init_worker(False)
+    init_worker(True)
+    print(f"\n🔥 Время отчета, медиана из {ROUNDS}")
+    print(f"{'графики':>8} {'точек':>6} {'движок на запрос':>17} {'общий движок':>13} {'экономия':>9}")
+    for points in (24, 720):
+        payload = build_payload(points)
+        for name, vector in (('raster', False), ('vector', True)):
+            fresh = per_report(payload, vector, shared=False)
+            warm = per_report(payload, vector, shared=True)
+            print(f"{name:>8} {points:>6} {fresh * 1000:>14.0f} мс {warm * 1000:>10.0f} мс "
+                  f"{(fresh - warm) * 1000:>6.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Прореживание временных рядов перед построением графиков
+
+На графике шириной 6 дюймов различимо несколько сотен точек, а месячный ряд
+с минутным шагом - это десятки тысяч. Ряды сокращаются до MAX_POINTS точек
+так, чтобы форма и выбросы сохранились:
+
+- min_max - в каждой корзине остаются минимум и максимум (ни один пик не теряется);
+- lttb - Largest-Triangle-Three-Buckets: из корзины берется точка, образующая
+  наибольший треугольник с соседними, форма линии сохраняется лучше, чем
+  при усреднении.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+MAX_POINTS = 500
+
+
+def min_max(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """Минимум и максимум каждой из max_points / 2 корзин в исходном порядке точек"""
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    buckets = max_points // 2
+    bucket = np.arange(n) * buckets // n
+    # Сортировка по (корзина, значение): первая точка корзины - минимум, последняя - максимум
+    order = np.lexsort((y, bucket))
+    edges = np.flatnonzero(np.diff(bucket[order])) + 1
+    first = order[np.concatenate(([0], edges))]
+    last = order[np.concatenate((edges - 1, [n - 1]))]
+    keep = np.unique(np.concatenate((first, last)))
+    return x[keep], y[keep]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: max_points точек, первая и последняя сохраняются"""
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return x, y
+    # Корзины между первой и последней точкой
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Третья вершина - среднее следующей корзины (для последней - последняя точка)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        # Удвоенная площадь треугольника (предыдущая выбранная, кандидат, среднее следующей)
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        keep[i + 1] = previous
+    return x[keep], y[keep]
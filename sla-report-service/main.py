@@ -1,24 +1,46 @@
-import json
+import asyncio
+import logging
 import tempfile
-from datetime import datetime
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from datetime import datetime, date, timedelta, timezone
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pydantic import BaseModel
-from typing import Dict, Any, List
-import uuid
+from typing import Dict, Any, List, Optional
+from urllib.parse import quote
 import os
 
-# Импорт вашего существующего кода
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.ticker import MaxNLocator
+from report_generator import init_worker, render_report
+from report_pool import ReportPool, PoolSaturatedError, PoolUnavailableError
+from report_cache import ReportCache, request_key
+from metrics_store import MetricsStore
+from batch_reports import BatchLimitError, BatchReportManager, DONE
+
+logging.basicConfig(level=logging.INFO)
+
+# Пул генерации: процессы по числу ядер, ограниченная очередь ожидающих задач
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', os.cpu_count() or 1))
+REPORT_QUEUE_SIZE = int(os.getenv('REPORT_QUEUE_SIZE', 2 * REPORT_WORKERS))
+REPORT_TIMEOUT = float(os.getenv('REPORT_TIMEOUT', 60))
+# Формат графиков: raster (PNG из matplotlib) или vector (примитивы ReportLab)
+REPORT_CHART_FORMAT = os.getenv('REPORT_CHART_FORMAT', 'raster').lower()
+# Кэш готовых отчетов на диске (REPORT_CACHE_MAX_MB=0 - отключен)
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sla_report_cache'))
+REPORT_CACHE_MAX_MB = int(os.getenv('REPORT_CACHE_MAX_MB', 256))
+# Пакетная генерация: архивы, размер пачки запроса к хранилищу, число хранимых заданий
+REPORT_BATCH_DIR = os.getenv('REPORT_BATCH_DIR', os.path.join(tempfile.gettempdir(), 'sla_report_batches'))
+REPORT_BATCH_CHUNK = int(os.getenv('REPORT_BATCH_CHUNK', 200))
+REPORT_BATCH_HISTORY = int(os.getenv('REPORT_BATCH_HISTORY', 20))
+REPORT_BATCH_MAX_RESOURCES = int(os.getenv('REPORT_BATCH_MAX_RESOURCES', 10000))
+# Одновременно выполняемые задания: сверх лимита - 429 с Retry-After
+REPORT_BATCH_MAX_RUNNING = int(os.getenv('REPORT_BATCH_MAX_RUNNING', 2))
+REPORT_BATCH_RETRY_AFTER = int(os.getenv('REPORT_BATCH_RETRY_AFTER', 60))
+# Хранилище метрик (таблица checks) и целевая доступность для slaCompliance
+CLICKHOUSE_HOST = os.getenv('CLICKHOUSE_HOST', 'localhost')
+CLICKHOUSE_PORT = int(os.getenv('CLICKHOUSE_PORT', 8123))
+CLICKHOUSE_DATABASE = os.getenv('CLICKHOUSE_DATABASE', 'default')
+CLICKHOUSE_USER = os.getenv('CLICKHOUSE_USER', 'default')
+CLICKHOUSE_PASSWORD = os.getenv('CLICKHOUSE_PASSWORD', '')
+SLA_TARGET = float(os.getenv('SLA_TARGET', 99.9))
 
 app = FastAPI(
     title="SLA Report Generator API",
@@ -50,229 +72,127 @@ class Metrics(BaseModel):
     incidents: int
     mttr: int
     slaCompliance: float
+    # Перцентили времени ответа (мс) - есть у метрик, посчитанных сервисом
+    responseTimeP50: Optional[int] = None
+    responseTimeP95: Optional[int] = None
+    responseTimeP99: Optional[int] = None
 
 
 class SLAReportRequest(BaseModel):
     resourceId: str
     resourceName: str
     url: str
-    metrics: Metrics
-    stats: Dict[str, Any]
-
-
-class SLAReportGenerator:
-    def __init__(self, data: Dict[str, Any]):
-        """
-        Инициализация генератора отчетов
-
-        Args:
-            data (dict): Данные для отчета в формате JSON
-        """
-        self.data = data
-        self.styles = getSampleStyleSheet()
-        self.story = []
-
-        # Регистрируем шрифт с поддержкой кириллицы из файла в папке проекта
-        self._register_cyrillic_font()
-
-        # Настройка стилей с кириллическими шрифтами
-        self.title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontName='DejaVuSans',
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1  # Center alignment
-        )
+    # Без metrics и stats они считаются по проверкам из ClickHouse за период
+    metrics: Optional[Metrics] = None
+    stats: Optional[Dict[str, Any]] = None
+    periodStart: Optional[datetime] = None  # по умолчанию - 30 дней до periodEnd
+    periodEnd: Optional[datetime] = None  # по умолчанию - текущий момент
 
-        self.heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=self.styles['Heading2'],
-            fontName='DejaVuSans',
-            fontSize=16,
-            spaceAfter=12,
-            spaceBefore=12
-        )
 
-        self.normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=self.styles['Normal'],
-            fontName='DejaVuSans',
-            fontSize=10,
-            spaceAfter=6
-        )
+class BatchResource(BaseModel):
+    resourceId: str
+    resourceName: Optional[str] = None
+    url: str
 
-    def _register_cyrillic_font(self):
-        """Регистрация шрифта DejaVuSans с поддержкой кириллицы"""
-        try:
-            # Файл шрифта должен лежать в той же папке, где скрипт (папка проекта)
-            font_path = os.path.join(os.path.dirname(__file__), 'DejaVuSans.ttf')
-            pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-        except Exception as e:
-            print(f"Ошибка регистрации шрифта: {e}")
-
-    def _create_failures_chart(self):
-        failures = self.data['stats']['failuresCount']
-        timestamps = [datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00')) for item in failures]
-        values = [item['value'] for item in failures]
-
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(timestamps, values, marker='o', linestyle='-', color='#43464B', linewidth=2)
-
-        for i, value in enumerate(values):
-            if value > 2:
-                color = '#DC2626'  # красный
-            elif value > 0:
-                color = '#EAB308'  # желтый
-            else:
-                color = '#16A34A'  # зеленый
-            ax.plot(timestamps[i], values[i], 'o', color=color, markersize=8)
-
-        ax.set_title('График сбоев', fontsize=14, pad=20)
-        ax.set_ylabel('Количество сбоев')
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-        ax.xaxis.set_major_locator(mdates.HourLocator(interval=2))
-        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-        ax.grid(True, alpha=0.3)
-        fig.autofmt_xdate()
-
-        temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-        plt.savefig(temp_file.name, dpi=150, bbox_inches='tight')
-        plt.close()
-
-        return temp_file.name
-
-    def _create_response_time_chart(self):
-        response_times = self.data['stats']['responseTime']
-        timestamps = [datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00')) for item in response_times]
-        values = [item['value'] for item in response_times]
-
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(timestamps, values, marker='o', linestyle='-', color='#43464B', linewidth=2)
-
-        ax.set_title('Время ответа', fontsize=14, pad=20)
-        ax.set_ylabel('Время ответа (мс)')
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-        ax.xaxis.set_major_locator(mdates.HourLocator(interval=2))
-        ax.grid(True, alpha=0.3)
-        fig.autofmt_xdate()
-
-        ax.axhline(y=100, color='#EAB308', linestyle='--', alpha=0.7, label='Предупреждение (100 мс)')
-        ax.axhline(y=300, color='#DC2626', linestyle='--', alpha=0.7, label='Критический (300 мс)')
-        ax.legend()
-
-        temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-        plt.savefig(temp_file.name, dpi=150, bbox_inches='tight')
-        plt.close()
-
-        return temp_file.name
-
-    def _create_failure_types_chart(self):
-        failures_by_types = self.data['stats']['failuresByTypes']
-        labels = ['Critical', 'Warning', 'Resolved']
-        values = [failures_by_types['critical'], failures_by_types['warning'], failures_by_types['resolved']]
-        colors = ['#DC2626', '#EAB308', '#16A34A']
-
-        fig, ax = plt.subplots(figsize=(6, 4))
-        wedges, texts, autotexts = ax.pie(values, labels=labels, colors=colors, autopct='%1.0f%%', startangle=90)
-
-        ax.set_title('Типы ошибок', fontsize=14, pad=20)
-
-        temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-        plt.savefig(temp_file.name, dpi=150, bbox_inches='tight')
-        plt.close()
-
-        return temp_file.name
-
-    def _create_metrics_table(self):
-        metrics = self.data['metrics']
-
-        metrics_data = [
-            ['Метрика', 'Значение', 'Цель'],
-            ['Доступность', f"{metrics['uptime']}%", "99.9%"],
-            ['Время отклика', f"{metrics['avgResponseTime']} мс", "< 200 мс"],
-            ['Инциденты', str(metrics['incidents']), "Минимум"],
-            ['Среднее время восстановления', f"{metrics['mttr']} мин", "< 60 мин"],
-            ['Соблюдение SLA', f"{metrics['slaCompliance']}%", "> 99%"]
-        ]
-
-        table = Table(metrics_data, colWidths=[2.5 * inch, 1.5 * inch, 1.5 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-
-        return table
-
-    def generate_report(self, output_filename: str):
-        doc = SimpleDocTemplate(
-            output_filename,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
 
-        title = Paragraph("SLA ОТЧЕТ ПО РАБОТЕ СЕРВИСА", self.title_style)
-        self.story.append(title)
-
-        resource_info = [
-            [Paragraph("<b>Ресурс:</b>", self.normal_style), Paragraph(self.data['resourceName'], self.normal_style)],
-            [Paragraph("<b>URL:</b>", self.normal_style), Paragraph(self.data['url'], self.normal_style)],
-            [Paragraph("<b>ID ресурса:</b>", self.normal_style), Paragraph(self.data['resourceId'], self.normal_style)],
-            [Paragraph("<b>Дата отчета:</b>", self.normal_style),
-             Paragraph(datetime.now().strftime("%d.%m.%Y"), self.normal_style)]
-        ]
-
-        resource_table = Table(resource_info, colWidths=[1.5 * inch, 4 * inch])
-        resource_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
-        ]))
-
-        self.story.append(resource_table)
-        self.story.append(Spacer(1, 0.25 * inch))
-
-        metrics_heading = Paragraph("Ключевые метрики", self.heading_style)
-        self.story.append(metrics_heading)
-        self.story.append(self._create_metrics_table())
-        self.story.append(Spacer(1, 0.25 * inch))
-
-        failures_heading = Paragraph("График сбоев", self.heading_style)
-        self.story.append(failures_heading)
-        failures_chart_path = self._create_failures_chart()
-        self.story.append(Image(failures_chart_path, width=6 * inch, height=2.5 * inch))
-        self.story.append(Spacer(1, 0.25 * inch))
-
-        response_time_heading = Paragraph("Время ответа", self.heading_style)
-        self.story.append(response_time_heading)
-        response_time_chart_path = self._create_response_time_chart()
-        self.story.append(Image(response_time_chart_path, width=6 * inch, height=2.5 * inch))
-        self.story.append(Spacer(1, 0.25 * inch))
-
-        failure_types_heading = Paragraph("Типы ошибок", self.heading_style)
-        self.story.append(failure_types_heading)
-        failure_types_chart_path = self._create_failure_types_chart()
-        self.story.append(Image(failure_types_chart_path, width=4 * inch, height=3 * inch))
-
-        doc.build(self.story)
+class BatchReportRequest(BaseModel):
+    resources: List[BatchResource]
+    periodStart: Optional[datetime] = None  # по умолчанию - 30 дней до periodEnd
+    periodEnd: Optional[datetime] = None  # по умолчанию - текущий момент
+
+
+# Каждый процесс пула при старте один раз готовит движок отчетов (init_worker)
+report_pool = ReportPool(
+    workers=REPORT_WORKERS,
+    queue_size=REPORT_QUEUE_SIZE,
+    timeout=REPORT_TIMEOUT,
+    initializer=init_worker,
+    initargs=(REPORT_CHART_FORMAT == 'vector',)
+)
+report_cache = ReportCache(directory=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_MB * 1024 * 1024)
+metrics_store = MetricsStore(
+    host=CLICKHOUSE_HOST,
+    port=CLICKHOUSE_PORT,
+    database=CLICKHOUSE_DATABASE,
+    username=CLICKHOUSE_USER,
+    password=CLICKHOUSE_PASSWORD,
+    sla_target=SLA_TARGET
+)
+
 
+def report_key(data_dict: Dict[str, Any]) -> str:
+    """Ключ отчета в кэше (он же ETag)"""
+    # В отчет входит дата генерации и формат графиков - они тоже часть ключа
+    return request_key({'request': data_dict, 'charts': REPORT_CHART_FORMAT, 'date': date.today().isoformat()})
+
+
+async def render_cached(data_dict: Dict[str, Any], key: str):
+    """
+    PDF отчета через кэш и пул генерации
+
+    Returns:
+        (PDF, признак попадания в кэш)
+    """
+    return await report_cache.get_or_create(
+        key, lambda: report_pool.run(render_report, data_dict, REPORT_CHART_FORMAT == 'vector')
+    )
+
+
+async def render_batch_report(data: Dict[str, Any]) -> bytes:
+    """Отчет пакетного задания: при заполненной очереди ждем, а не отказываем"""
+    # Кэш отчетов не используется: месячный пакет по многим ресурсам вытеснил бы
+    # из него все интерактивные отчеты
+    while True:
         try:
-            os.unlink(failures_chart_path)
-            os.unlink(response_time_chart_path)
-            os.unlink(failure_types_chart_path)
-        except Exception:
-            pass
+            return await report_pool.run(render_report, data, REPORT_CHART_FORMAT == 'vector')
+        except PoolSaturatedError as e:
+            await asyncio.sleep(e.retry_after)
+
+
+batch_reports = BatchReportManager(
+    fetch=metrics_store.fetch_reports_data,
+    render=render_batch_report,
+    output_dir=REPORT_BATCH_DIR,
+    concurrency=REPORT_WORKERS,
+    fetch_chunk=REPORT_BATCH_CHUNK,
+    max_jobs=REPORT_BATCH_HISTORY,
+    max_running=REPORT_BATCH_MAX_RUNNING
+)
+
+
+@app.on_event("startup")
+async def startup_event():
+    report_cache.load()
+    batch_reports.cleanup()
+    report_pool.start()
+    await report_pool.warm_up()
+
 
-        return output_filename
+@app.on_event("shutdown")
+async def shutdown_event():
+    await batch_reports.stop()
+    report_pool.stop()
+
+
+def _attachment(filename: str) -> str:
+    """Content-Disposition с именем файла в UTF-8 (RFC 6266), как у FileResponse"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _period(start: Optional[datetime], end: Optional[datetime]):
+    """Период отчета в UTC; по умолчанию - последние 30 дней"""
+    # Текущий момент с точностью до минуты: повторные запросы попадают в кэш
+    end = end or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    start = start or end - timedelta(days=30)
+    # Время без часового пояса считаем UTC
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="periodStart должен быть раньше periodEnd")
+    return start, end
 
 
 @app.get("/")
@@ -281,42 +201,117 @@ async def root():
 
 
 @app.post("/generate-report")
-async def generate_sla_report(report_data: SLAReportRequest):
+async def generate_sla_report(report_data: SLAReportRequest, if_none_match: Optional[str] = Header(None)):
     """
     Генерация отчета SLA в формате PDF
 
-    Принимает данные отчета и возвращает сгенерированный PDF файл
+    Принимает данные отчета и возвращает сгенерированный PDF файл. Если metrics
+    и stats не переданы, они считаются по проверкам ресурса из ClickHouse за период.
+    Повторный запрос с теми же данными отдается из кэша; ETag - ключ отчета.
     """
     try:
-        # Конвертируем Pydantic модель в dict
-        data_dict = report_data.dict()
-
-        # Создаем временный файл для отчета
-        temp_dir = tempfile.gettempdir()
-        report_filename = f"sla_report_{uuid.uuid4().hex}.pdf"
-        report_path = os.path.join(temp_dir, report_filename)
-
-        # Генерируем отчет
-        generator = SLAReportGenerator(data_dict)
-        generated_path = generator.generate_report(report_path)
-
-        # Возвращаем файл как ответ
-        return FileResponse(
-            generated_path,
+        if report_data.metrics is None or report_data.stats is None:
+            start, end = _period(report_data.periodStart, report_data.periodEnd)
+            resource = {'resourceId': report_data.resourceId, 'resourceName': report_data.resourceName,
+                        'url': report_data.url}
+            reports = await asyncio.to_thread(metrics_store.fetch_reports_data, [resource], start, end)
+            if report_data.resourceId not in reports:
+                raise HTTPException(status_code=404, detail="Нет проверок ресурса за период")
+            data_dict = reports[report_data.resourceId]
+        else:
+            # Конвертируем Pydantic модель в dict
+            data_dict = report_data.dict(exclude={'periodStart', 'periodEnd'})
+
+        # ETag - ключ отчета в кэше, он же определяет содержимое PDF
+        key = report_key(data_dict)
+        etag = f'"{key}"'
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        # Генерируем отчет в процессе пула, не блокируя event loop
+        pdf, cached = await render_cached(data_dict, key)
+
+        return Response(
+            content=pdf,
             media_type="application/pdf",
-            filename=f"sla_report_{data_dict['resourceName']}.pdf"
+            headers={
+                "Content-Disposition": _attachment(f"sla_report_{data_dict['resourceName']}.pdf"),
+                "ETag": etag,
+                "X-Cache": "HIT" if cached else "MISS",
+            }
         )
 
+    except HTTPException:
+        raise
+    except PoolSaturatedError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail=f"Отчет не сформирован за {REPORT_TIMEOUT:g} с")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка генерации отчета: {str(e)}")
 
 
+@app.post("/batch-reports", status_code=202)
+async def create_batch_reports(request: BatchReportRequest):
+    """
+    Пакетная генерация отчетов по списку ресурсов за период
+
+    Данные берутся из хранилища метрик, отчеты складываются в zip-архив.
+    Возвращает id задания для отслеживания прогресса.
+    """
+    if not request.resources or len(request.resources) > REPORT_BATCH_MAX_RESOURCES:
+        raise HTTPException(status_code=422, detail=f"Нужно от 1 до {REPORT_BATCH_MAX_RESOURCES} ресурсов")
+
+    start, end = _period(request.periodStart, request.periodEnd)
+    try:
+        job = batch_reports.submit([resource.dict() for resource in request.resources], start, end)
+    except BatchLimitError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(REPORT_BATCH_RETRY_AFTER)}
+        )
+    return job.to_dict()
+
+
+@app.get("/batch-reports/{job_id}")
+async def get_batch_reports(job_id: str):
+    """Прогресс пакетного задания"""
+    job = batch_reports.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return job.to_dict()
+
+
+@app.get("/batch-reports/{job_id}/download")
+async def download_batch_reports(job_id: str):
+    """Zip-архив отчетов завершенного задания"""
+    job = batch_reports.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Задание не завершено: {job.status}")
+    return FileResponse(job.path, media_type="application/zip", filename=f"{job_id}.zip")
+
+
 @app.get("/health")
 async def health_check():
     """Проверка здоровья сервиса"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/stats")
+async def get_stats():
+    """Загрузка пула генерации и эффективность кэша отчетов"""
+    return {"report_pool": report_pool.get_stats(), "report_cache": report_cache.get_stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,198 @@
+"""
+Данные для SLA-отчетов из ClickHouse (таблица checks)
+
+Метрики и ряды для пачки ресурсов считаются агрегирующими запросами на стороне
+ClickHouse: по сети передаются почасовые агрегаты, а не сырые проверки. Ресурс
+сопоставляется с проверками по префиксу URL, как в analytic-service; при
+вложенных префиксах проверка относится к первому подходящему ресурсу.
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import clickhouse_connect
+
+# Почасовые агрегаты: ряды графиков, slaCompliance и среднее время ответа
+HOURLY_SQL = """
+SELECT
+    idx,
+    toStartOfHour(timestamp) AS bucket,
+    count() AS checks,
+    countIf(success) AS successes,
+    sum(response_time) AS response_time_sum,
+    countIf(NOT success AND response_time > 3) AS critical,
+    countIf(NOT success AND response_time >= 1 AND response_time <= 3) AS warning,
+    countIf(NOT success AND response_time < 1) AS resolved
+FROM checks
+WHERE timestamp >= {start:DateTime} AND timestamp < {end:DateTime}
+  AND (arrayFirstIndex(p -> startsWith(url, p), {prefixes:Array(String)}) AS idx) > 0
+GROUP BY idx, bucket
+ORDER BY idx, bucket
+"""
+
+# Итоги периода по проверкам каждого URL:
+# - доступность с учетом времени: состояние проверки действует до следующей проверки;
+# - инцидент - серия неуспешных проверок подряд, длится от первой из них до первой
+#   успешной; незавершенные к концу периода в MTTR не входят;
+# - перцентили времени ответа (состояния quantiles по URL сливаются по ресурсу).
+SUMMARY_SQL = """
+SELECT
+    idx,
+    sum(observed_seconds) AS observed_seconds,
+    sum(up_seconds) AS up_seconds,
+    countIf(failed_checks > 0) AS incidents,
+    ifNotFinite(avgIf(dateDiff('second', failure_start, recovered_at), failed_checks > 0 AND recovered), 0)
+        AS mttr_seconds,
+    quantilesMerge(0.5, 0.95, 0.99)(response_time_state) AS response_time_quantiles
+FROM
+(
+    -- Интервал между инцидентами: серия неуспешных проверок и успешные после нее
+    SELECT
+        idx, url, incident,
+        sum(dateDiff('second', timestamp, next_timestamp)) AS observed_seconds,
+        sumIf(dateDiff('second', timestamp, next_timestamp), success) AS up_seconds,
+        countIf(NOT success) AS failed_checks,
+        minIf(timestamp, NOT success) AS failure_start,
+        maxIf(next_timestamp, NOT success) AS recovered_at,
+        minIf(has_next, NOT success) AS recovered,
+        quantilesState(0.5, 0.95, 0.99)(response_time) AS response_time_state
+    FROM
+    (
+        SELECT idx, url, timestamp, success, response_time, has_next,
+               if(has_next, next_timestamp, timestamp) AS next_timestamp,
+               sum(is_start) OVER (PARTITION BY url ORDER BY timestamp ROWS UNBOUNDED PRECEDING) AS incident
+        FROM
+        (
+            SELECT
+                arrayFirstIndex(p -> startsWith(url, p), {prefixes:Array(String)}) AS idx,
+                url,
+                timestamp,
+                success,
+                response_time,
+                NOT success AND lagInFrame(success, 1, true) OVER w AS is_start,
+                leadInFrame(timestamp, 1) OVER w AS next_timestamp,
+                leadInFrame(toUInt8(1), 1, toUInt8(0)) OVER w AS has_next
+            FROM checks
+            WHERE timestamp >= {start:DateTime} AND timestamp < {end:DateTime}
+              AND idx > 0
+            WINDOW w AS (PARTITION BY url ORDER BY timestamp ROWS BETWEEN 1 PRECEDING AND 1 FOLLOWING)
+        )
+    )
+    GROUP BY idx, url, incident
+)
+GROUP BY idx
+"""
+
+
+def normalize_url(url: str) -> str:
+    """Префикс URL ресурса без завершающего слэша (как в analytic-service)"""
+    return url.rstrip('/')
+
+
+def _iso(bucket: datetime) -> str:
+    return bucket.replace(tzinfo=None).isoformat() + 'Z'
+
+
+class MetricsStore:
+    def __init__(self, host: str, port: int, database: str, username: str, password: str, sla_target: float):
+        """
+        Args:
+            sla_target: Целевая доступность часа в процентах для slaCompliance
+        """
+        self.connection_settings = {
+            'host': host,
+            'port': port,
+            'database': database,
+            'username': username,
+            'password': password,
+        }
+        self.sla_target = sla_target
+        self._client = None
+        # Клиент clickhouse-connect не рассчитан на параллельные запросы из разных потоков
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, parameters: Dict[str, Any]):
+        with self._lock:
+            if self._client is None:
+                self._client = clickhouse_connect.get_client(**self.connection_settings)
+            return self._client.query(sql, parameters=parameters).result_rows
+
+    def fetch_reports_data(self, resources: List[Dict], start: datetime, end: datetime) -> Dict[str, Dict]:
+        """
+        Данные отчетов для пачки ресурсов двумя агрегирующими запросами
+
+        Args:
+            resources: Ресурсы с ключами resourceId, resourceName, url
+            start, end: Период отчета (UTC)
+
+        Returns:
+            dict: resourceId -> данные в формате SLAReportRequest
+                  (ресурсы без проверок за период не попадают в результат)
+        """
+        prefixes = list(dict.fromkeys(normalize_url(resource['url']) for resource in resources))
+        parameters = {
+            'prefixes': prefixes,
+            'start': start.astimezone(timezone.utc).replace(tzinfo=None),
+            'end': end.astimezone(timezone.utc).replace(tzinfo=None),
+        }
+
+        hourly: Dict[int, List] = {}
+        for row in self._query(HOURLY_SQL, parameters):
+            hourly.setdefault(row[0], []).append(row[1:])
+        summaries = {row[0]: row[1:] for row in self._query(SUMMARY_SQL, parameters)}
+
+        by_prefix = {}
+        for idx, prefix in enumerate(prefixes, start=1):
+            if idx in hourly and idx in summaries:
+                by_prefix[prefix] = self._build(hourly[idx], summaries[idx])
+
+        result = {}
+        for resource in resources:
+            data = by_prefix.get(normalize_url(resource['url']))
+            if data is not None:
+                result[resource['resourceId']] = {
+                    'resourceId': resource['resourceId'],
+                    'resourceName': resource.get('resourceName') or resource['url'],
+                    'url': resource['url'],
+                    'periodStart': _iso(parameters['start']),
+                    'periodEnd': _iso(parameters['end']),
+                    **data,
+                }
+        return result
+
+    def _build(self, buckets: List, summary) -> Dict:
+        checks = sum(bucket[1] for bucket in buckets)
+        successes = sum(bucket[2] for bucket in buckets)
+        response_time_sum = sum(bucket[3] for bucket in buckets)
+        compliant_hours = sum(1 for bucket in buckets if bucket[2] * 100 >= self.sla_target * bucket[1])
+        observed_seconds, up_seconds, incidents, mttr_seconds, quantiles = summary
+        # Единственная проверка не задает интервала - доступность по доле успешных проверок
+        uptime = up_seconds / observed_seconds if observed_seconds else successes / checks
+        p50, p95, p99 = (round(value * 1000) for value in quantiles)
+
+        return {
+            'metrics': {
+                'uptime': round(uptime * 100, 2),
+                'avgResponseTime': round(response_time_sum * 1000 / checks),
+                'incidents': incidents,
+                'mttr': round(mttr_seconds / 60),
+                'slaCompliance': round(compliant_hours * 100 / len(buckets), 2),
+                'responseTimeP50': p50,
+                'responseTimeP95': p95,
+                'responseTimeP99': p99,
+            },
+            'stats': {
+                'failuresCount': [
+                    {'timestamp': _iso(bucket[0]), 'value': bucket[1] - bucket[2]} for bucket in buckets
+                ],
+                'responseTime': [
+                    {'timestamp': _iso(bucket[0]), 'value': round(bucket[3] * 1000 / bucket[1])} for bucket in buckets
+                ],
+                'failuresByTypes': {
+                    'critical': sum(bucket[4] for bucket in buckets),
+                    'warning': sum(bucket[5] for bucket in buckets),
+                    'resolved': sum(bucket[6] for bucket in buckets),
+                },
+            },
+        }
@@ -0,0 +1,185 @@
+"""
+Кэш сгенерированных отчетов с адресацией по содержимому запроса
+
+Ключ - SHA-256 нормализованного запроса (JSON с отсортированными ключами),
+значение - PDF на диске. Объем кэша ограничен, при переполнении удаляются
+давно не запрашивавшиеся отчеты (LRU). Одинаковые запросы, пришедшие
+одновременно, генерируют отчет один раз. Файлы читаются и пишутся в потоках,
+индекс меняется только в event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Ключ отчета: хэш нормализованного JSON запроса"""
+    normalized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Args:
+            directory: Каталог с PDF отчетов
+            max_bytes: Максимальный суммарный размер отчетов (0 - кэш отключен)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def load(self):
+        """Восстановление индекса по файлам каталога (после перезапуска кэш не теряется)"""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.pdf'):
+                stat = os.stat(path)
+                files.append((stat.st_atime, name[:-4], stat.st_size))
+            elif name.endswith('.tmp'):
+                # Незавершенная запись при остановке сервиса
+                os.unlink(path)
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._remove_files(self._evict())
+        logger.info(f"Кэш отчетов: {len(self._entries)} файлов, {self.total_bytes / 1024 / 1024:.1f} МиБ")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key not in self._entries:
+            return None
+        try:
+            content = await asyncio.to_thread(self._read, self._path(key))
+        except OSError:
+            # Файл удален вручную или вытеснен во время чтения - считаем промахом
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)
+            return None
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return content
+
+    async def put(self, key: str, content: bytes):
+        if not self.enabled or len(content) > self.max_bytes:
+            return
+        await asyncio.to_thread(self._write, self._path(key), content)
+
+        self.total_bytes += len(content) - self._entries.pop(key, 0)
+        self._entries[key] = len(content)
+        evicted = self._evict()
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _write(path: str, content: bytes):
+        # Запись через временный файл: читатель не увидит PDF частично
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def _evict(self) -> List[str]:
+        """Вытеснение из индекса; возвращает пути файлов, которые нужно удалить"""
+        paths = []
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            paths.append(self._path(key))
+        return paths
+
+    @staticmethod
+    def _remove_files(paths: List[str]):
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, bool]:
+        """
+        Отчет из кэша или новый, созданный create()
+
+        Returns:
+            (содержимое PDF, True если отчет взят из кэша)
+        """
+        if not self.enabled:
+            return await create(), False
+
+        content = await self.get(key)
+        if content is not None:
+            self.hits += 1
+            return content, True
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending), True
+
+        self.misses += 1
+        # Генерация не привязана к запросу: разрыв соединения первого клиента
+        # не отменяет отчет для остальных ожидающих
+        task = asyncio.ensure_future(self._create_and_store(key, create))
+        self._pending[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), False
+
+    async def _create_and_store(self, key: str, create: Callable[[], Awaitable[bytes]]) -> bytes:
+        content = await create()
+        try:
+            await self.put(key, content)
+        except OSError as e:
+            # Ошибка записи в кэш не должна ломать выдачу отчета
+            logger.warning(f"Не удалось сохранить отчет {key} в кэш: {e}")
+        return content
+
+    def _finished(self, key: str, task: asyncio.Future):
+        del self._pending[key]
+        if not task.cancelled():
+            # Ошибка уже передана ожидающим; если их не осталось - не логируем ее как неполученную
+            task.exception()
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            'enabled': self.enabled,
+            'reports_cached': len(self._entries),
+            'size_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'lookups': lookups,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,395 @@
+"""
+Генерация PDF-отчета SLA: графики matplotlib и документ ReportLab
+
+Модуль не зависит от FastAPI - функция render_report выполняется в
+процессах пула генерации (см. main.py).
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+import vector_charts
+from downsampling import lttb, min_max
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _series(items: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Ряд из запроса: время (unix timestamp, по возрастанию) и значения"""
+    timestamps = np.array([_parse_timestamp(item['timestamp']).timestamp() for item in items], dtype=float)
+    values = np.array([item['value'] for item in items], dtype=float)
+    order = np.argsort(timestamps, kind='stable')
+    return timestamps[order], values[order]
+
+
+def _failure_colors(values: np.ndarray) -> np.ndarray:
+    """Цвета точек графика сбоев по количеству сбоев"""
+    return np.where(values > 2, '#DC2626',  # красный
+                    np.where(values > 0, '#EAB308',  # желтый
+                             '#16A34A'))  # зеленый
+
+
+def _to_datetime64(timestamps: np.ndarray) -> np.ndarray:
+    """Unix timestamp -> datetime64 (UTC) для оси времени matplotlib"""
+    return (timestamps * 1000).astype('int64').astype('datetime64[ms]')
+
+
+class ReportEngine:
+    """
+    Неизменяемая между отчетами часть генератора: шрифт, стили, matplotlib
+
+    Создается один раз на процесс (get_engine), отчеты используют его повторно.
+    """
+
+    def __init__(self):
+        # Регистрируем шрифт с поддержкой кириллицы из файла в папке проекта
+        self._register_cyrillic_font()
+        self.styles = getSampleStyleSheet()
+
+        # Настройка стилей с кириллическими шрифтами
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=self.styles['Heading1'],
+            fontName='DejaVuSans',
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        )
+
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=self.styles['Heading2'],
+            fontName='DejaVuSans',
+            fontSize=16,
+            spaceAfter=12,
+            spaceBefore=12
+        )
+
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=self.styles['Normal'],
+            fontName='DejaVuSans',
+            fontSize=10,
+            spaceAfter=6
+        )
+
+        self._plt = None
+
+    def _register_cyrillic_font(self):
+        """Регистрация шрифта DejaVuSans с поддержкой кириллицы"""
+        try:
+            # Файл шрифта должен лежать в той же папке, где скрипт (папка проекта)
+            font_path = os.path.join(os.path.dirname(__file__), 'DejaVuSans.ttf')
+            pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
+        except Exception as e:
+            print(f"Ошибка регистрации шрифта: {e}")
+
+    @property
+    def plt(self):
+        """pyplot с бэкендом Agg; импортируется только при первом растровом графике"""
+        if self._plt is None:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            self._plt = plt
+        return self._plt
+
+    def figure_to_png(self, fig) -> BytesIO:
+        """Отрисовка графика в PNG в памяти (без временных файлов)"""
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+        self.plt.close(fig)
+        buffer.seek(0)
+        return buffer
+
+
+_engine: Optional[ReportEngine] = None
+
+
+def get_engine() -> ReportEngine:
+    """Движок отчетов текущего процесса"""
+    global _engine
+    if _engine is None:
+        _engine = ReportEngine()
+    return _engine
+
+
+class SLAReportGenerator:
+    def __init__(self, data: Dict[str, Any], vector_charts: bool = False, engine: Optional[ReportEngine] = None):
+        """
+        Инициализация генератора отчетов
+
+        Args:
+            data (dict): Данные для отчета в формате JSON
+            vector_charts (bool): Векторные графики ReportLab вместо PNG из matplotlib
+            engine (ReportEngine): Шрифт, стили и matplotlib (по умолчанию - общий для процесса, см. init_worker)
+        """
+        self.data = data
+        self.vector_charts = vector_charts
+        self.engine = engine or get_engine()
+        self.title_style = self.engine.title_style
+        self.heading_style = self.engine.heading_style
+        self.normal_style = self.engine.normal_style
+        self.story = []
+
+    def _failures_series(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Минимумы и максимумы корзин: ни один пик сбоев не теряется при прореживании
+        return min_max(*_series(self.data['stats']['failuresCount']))
+
+    def _response_time_series(self) -> Tuple[np.ndarray, np.ndarray]:
+        return lttb(*_series(self.data['stats']['responseTime']))
+
+    @staticmethod
+    def _set_time_axis(ax, timestamps: np.ndarray):
+        """Деления оси времени: каждые 2 часа в пределах суток, иначе - по датам"""
+        import matplotlib.dates as mdates
+
+        if len(timestamps) and timestamps[-1] - timestamps[0] > 86400:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=10))
+        else:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+            ax.xaxis.set_major_locator(mdates.HourLocator(interval=2))
+
+    def _create_failures_chart(self):
+        from matplotlib.ticker import MaxNLocator
+
+        timestamps, values = self._failures_series()
+        times = _to_datetime64(timestamps)
+
+        fig, ax = self.engine.plt.subplots(figsize=(10, 4))
+        ax.plot(times, values, linestyle='-', color='#43464B', linewidth=2)
+        # Цветные маркеры одним вызовом; на длинных рядах уменьшаются, чтобы не сливаться
+        ax.scatter(times, values, c=_failure_colors(values), s=64 if len(values) <= 100 else 16, zorder=3)
+
+        ax.set_title('График сбоев', fontsize=14, pad=20)
+        ax.set_ylabel('Количество сбоев')
+        self._set_time_axis(ax, timestamps)
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.grid(True, alpha=0.3)
+        fig.autofmt_xdate()
+
+        return self.engine.figure_to_png(fig)
+
+    def _create_response_time_chart(self):
+        timestamps, values = self._response_time_series()
+
+        fig, ax = self.engine.plt.subplots(figsize=(10, 4))
+        ax.plot(_to_datetime64(timestamps), values, marker='o', markersize=6 if len(values) <= 100 else 2,
+                linestyle='-', color='#43464B', linewidth=2)
+
+        ax.set_title('Время ответа', fontsize=14, pad=20)
+        ax.set_ylabel('Время ответа (мс)')
+        self._set_time_axis(ax, timestamps)
+        ax.grid(True, alpha=0.3)
+        fig.autofmt_xdate()
+
+        ax.axhline(y=100, color='#EAB308', linestyle='--', alpha=0.7, label='Предупреждение (100 мс)')
+        ax.axhline(y=300, color='#DC2626', linestyle='--', alpha=0.7, label='Критический (300 мс)')
+        ax.legend()
+
+        return self.engine.figure_to_png(fig)
+
+    def _create_failure_types_chart(self):
+        failures_by_types = self.data['stats']['failuresByTypes']
+        labels = ['Critical', 'Warning', 'Resolved']
+        values = [failures_by_types['critical'], failures_by_types['warning'], failures_by_types['resolved']]
+        colors = ['#DC2626', '#EAB308', '#16A34A']
+
+        fig, ax = self.engine.plt.subplots(figsize=(6, 4))
+        if sum(values):
+            ax.pie(values, labels=labels, colors=colors, autopct='%1.0f%%', startangle=90)
+        else:
+            # Сбоев за период не было - круговую диаграмму из нулей не построить
+            ax.text(0.5, 0.5, 'Нет данных', ha='center', va='center', fontsize=12, transform=ax.transAxes)
+            ax.axis('off')
+
+        ax.set_title('Типы ошибок', fontsize=14, pad=20)
+
+        return self.engine.figure_to_png(fig)
+
+    def _create_failures_drawing(self, width: float, height: float):
+        timestamps, values = self._failures_series()
+        return vector_charts.time_series_chart(
+            timestamps.tolist(), values.tolist(), width, height,
+            title='График сбоев',
+            y_label='Количество сбоев',
+            marker_colors=_failure_colors(values).tolist(),
+            integer_y=True
+        )
+
+    def _create_response_time_drawing(self, width: float, height: float):
+        timestamps, values = self._response_time_series()
+        return vector_charts.time_series_chart(
+            timestamps.tolist(), values.tolist(), width, height,
+            title='Время ответа',
+            y_label='Время ответа (мс)',
+            thresholds=[(100, '#EAB308', 'Предупреждение (100 мс)'), (300, '#DC2626', 'Критический (300 мс)')]
+        )
+
+    def _create_failure_types_drawing(self, width: float, height: float):
+        failures_by_types = self.data['stats']['failuresByTypes']
+        return vector_charts.pie_chart(
+            [failures_by_types['critical'], failures_by_types['warning'], failures_by_types['resolved']],
+            ['Critical', 'Warning', 'Resolved'],
+            ['#DC2626', '#EAB308', '#16A34A'],
+            width, height,
+            title='Типы ошибок'
+        )
+
+    def _create_metrics_table(self):
+        metrics = self.data['metrics']
+
+        metrics_data = [
+            ['Метрика', 'Значение', 'Цель'],
+            ['Доступность', f"{metrics['uptime']}%", "99.9%"],
+            ['Время отклика', f"{metrics['avgResponseTime']} мс", "< 200 мс"],
+        ]
+        # Перцентили есть, если метрики посчитаны сервисом по проверкам
+        if metrics.get('responseTimeP95') is not None:
+            metrics_data += [
+                ['Время отклика p50', f"{metrics['responseTimeP50']} мс", "< 200 мс"],
+                ['Время отклика p95', f"{metrics['responseTimeP95']} мс", "< 300 мс"],
+                ['Время отклика p99', f"{metrics['responseTimeP99']} мс", "< 1000 мс"],
+            ]
+        metrics_data += [
+            ['Инциденты', str(metrics['incidents']), "Минимум"],
+            ['Среднее время восстановления', f"{metrics['mttr']} мин", "< 60 мин"],
+            ['Соблюдение SLA', f"{metrics['slaCompliance']}%", "> 99%"]
+        ]
+
+        table = Table(metrics_data, colWidths=[2.5 * inch, 1.5 * inch, 1.5 * inch])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+
+        return table
+
+    def generate_report(self) -> bytes:
+        """Сборка PDF в памяти; возвращает содержимое документа"""
+        output = BytesIO()
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+
+        title = Paragraph("SLA ОТЧЕТ ПО РАБОТЕ СЕРВИСА", self.title_style)
+        self.story.append(title)
+
+        resource_info = [
+            [Paragraph("<b>Ресурс:</b>", self.normal_style), Paragraph(self.data['resourceName'], self.normal_style)],
+            [Paragraph("<b>URL:</b>", self.normal_style), Paragraph(self.data['url'], self.normal_style)],
+            [Paragraph("<b>ID ресурса:</b>", self.normal_style), Paragraph(self.data['resourceId'], self.normal_style)],
+            [Paragraph("<b>Дата отчета:</b>", self.normal_style),
+             Paragraph(datetime.now().strftime("%d.%m.%Y"), self.normal_style)]
+        ]
+        if self.data.get('periodStart') and self.data.get('periodEnd'):
+            period = (f"{_parse_timestamp(self.data['periodStart']):%d.%m.%Y %H:%M} - "
+                      f"{_parse_timestamp(self.data['periodEnd']):%d.%m.%Y %H:%M} UTC")
+            resource_info.append([Paragraph("<b>Период:</b>", self.normal_style), Paragraph(period, self.normal_style)])
+
+        resource_table = Table(resource_info, colWidths=[1.5 * inch, 4 * inch])
+        resource_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
+        ]))
+
+        self.story.append(resource_table)
+        self.story.append(Spacer(1, 0.25 * inch))
+
+        metrics_heading = Paragraph("Ключевые метрики", self.heading_style)
+        self.story.append(metrics_heading)
+        self.story.append(self._create_metrics_table())
+        self.story.append(Spacer(1, 0.25 * inch))
+
+        failures_heading = Paragraph("График сбоев", self.heading_style)
+        self.story.append(failures_heading)
+        if self.vector_charts:
+            self.story.append(self._create_failures_drawing(6 * inch, 2.5 * inch))
+        else:
+            self.story.append(Image(self._create_failures_chart(), width=6 * inch, height=2.5 * inch))
+        self.story.append(Spacer(1, 0.25 * inch))
+
+        response_time_heading = Paragraph("Время ответа", self.heading_style)
+        self.story.append(response_time_heading)
+        if self.vector_charts:
+            self.story.append(self._create_response_time_drawing(6 * inch, 2.5 * inch))
+        else:
+            self.story.append(Image(self._create_response_time_chart(), width=6 * inch, height=2.5 * inch))
+        self.story.append(Spacer(1, 0.25 * inch))
+
+        failure_types_heading = Paragraph("Типы ошибок", self.heading_style)
+        self.story.append(failure_types_heading)
+        if self.vector_charts:
+            self.story.append(self._create_failure_types_drawing(4 * inch, 3 * inch))
+        else:
+            self.story.append(Image(self._create_failure_types_chart(), width=4 * inch, height=3 * inch))
+
+        doc.build(self.story)
+        return output.getvalue()
+
+
+def render_report(data: Dict[str, Any], vector_charts: bool = False) -> bytes:
+    """Точка входа для процесса пула: PDF отчета по данным запроса"""
+    return SLAReportGenerator(data, vector_charts).generate_report()
+
+
+WARM_UP_DATA = {
+    'resourceId': 'warm-up',
+    'resourceName': 'warm-up',
+    'url': 'https://example.com',
+    'metrics': {'uptime': 100.0, 'avgResponseTime': 100, 'incidents': 0, 'mttr': 0, 'slaCompliance': 100.0},
+    'stats': {
+        'failuresCount': [{'timestamp': '2024-01-01T00:00:00Z', 'value': 0},
+                          {'timestamp': '2024-01-01T01:00:00Z', 'value': 1}],
+        'responseTime': [{'timestamp': '2024-01-01T00:00:00Z', 'value': 100},
+                         {'timestamp': '2024-01-01T01:00:00Z', 'value': 120}],
+        'failuresByTypes': {'critical': 1, 'warning': 1, 'resolved': 1},
+    },
+}
+
+
+def init_worker(vector_charts: bool = False) -> float:
+    """
+    Инициализатор процесса пула: движок и пробный отчет до первого запроса
+
+    Пробный отчет прогревает то, что иначе оплатил бы первый клиент: импорт
+    matplotlib, кэш шрифтов, подмножество TTF в ReportLab.
+
+    Returns:
+        float: Время холодного старта в секундах
+    """
+    started = time.perf_counter()
+    render_report(WARM_UP_DATA, vector_charts)
+    cold_start = time.perf_counter() - started
+    logger.info(f"Движок отчетов готов (pid {os.getpid()}), холодный старт {cold_start:.2f} с")
+    return cold_start
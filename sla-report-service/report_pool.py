@@ -0,0 +1,160 @@
+"""
+Ограниченный пул процессов для генерации отчетов
+
+matplotlib не потокобезопасен, а отрисовка и сборка PDF занимают CPU на секунды,
+поэтому отчеты строятся в отдельных процессах, а event loop только ждет результат.
+Число одновременно принятых задач ограничено: workers в работе + queue_size в очереди.
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def _ping() -> None:
+    """Пустая задача: заставляет пул запустить процесс (и его инициализатор)"""
+
+
+class PoolSaturatedError(Exception):
+    """Все процессы заняты и очередь заполнена - клиенту стоит повторить позже"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Очередь генерации заполнена, повторите через {retry_after} с")
+        self.retry_after = retry_after
+
+
+class PoolUnavailableError(Exception):
+    """Пул не запущен, остановлен или процесс генерации упал"""
+
+
+class ReportPool:
+    def __init__(self, workers: int, queue_size: int, timeout: float,
+                 initializer: Optional[Callable] = None, initargs: Tuple = ()):
+        """
+        Args:
+            workers: Число процессов генерации
+            queue_size: Сколько задач может ждать свободный процесс
+            timeout: Максимальное время ожидания отчета в секундах
+            initializer: Функция, выполняемая при старте каждого процесса
+            initargs: Аргументы initializer
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.timed_out = 0
+        self._avg_duration = 1.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=self.initializer, initargs=self.initargs
+            )
+
+    async def warm_up(self):
+        """
+        Запуск всех процессов заранее
+
+        ProcessPoolExecutor создает процессы по мере поступления задач, и без
+        прогрева холодный старт (импорты, шрифты, инициализатор) оплатили бы
+        первые запросы.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Пересоздание пула после падения процесса (BrokenProcessPool)"""
+        # Одновременные задачи упавшего пула пересоздают его только один раз
+        if self._executor is not broken:
+            return
+        self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def _retry_after(self) -> int:
+        """Оценка времени до освобождения места в очереди"""
+        waves = (self.in_flight - self.capacity) / self.workers + 1
+        return max(1, math.ceil(self._avg_duration * waves))
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Выполнение func(*args) в процессе пула
+
+        Raises:
+            PoolSaturatedError: Достигнут лимит одновременно принятых задач
+            PoolUnavailableError: Пул не запущен или процесс генерации упал
+            asyncio.TimeoutError: Отчет не получен за timeout секунд
+        """
+        if self._executor is None:
+            raise PoolUnavailableError("Пул генерации не запущен")
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise PoolSaturatedError(self._retry_after())
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        executor = self._executor
+        try:
+            future = executor.submit(func, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._restart(executor)
+            raise PoolUnavailableError(f"Пул генерации недоступен: {e}")
+
+        # Место освобождается, когда процесс действительно закончил работу,
+        # а не когда клиент перестал ждать (таймаут или разрыв соединения)
+        self.in_flight += 1
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._finished))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+        except BrokenProcessPool as e:
+            self.failed += 1
+            self._restart(executor)
+            raise PoolUnavailableError(f"Процесс генерации завершился аварийно: {e}")
+        except Exception:
+            self.failed += 1
+            raise
+
+        duration = time.monotonic() - started
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+        self.completed += 1
+        return result
+
+    def _finished(self):
+        self.in_flight -= 1
+
+    def get_stats(self) -> Dict:
+        return {
+            'running': self._executor is not None,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'in_flight': self.in_flight,
+            'queued': max(0, self.in_flight - self.workers),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'avg_duration_seconds': round(self._avg_duration, 3),
+        }
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Тесты генерации SLA-отчета для ресурса без сбоев за период
+
+Запуск: python test_report_generator.py (или python -m pytest test_report_generator.py)
+"""
+
+import unittest
+
+from report_generator import render_report
+
+
+def healthy_resource_data() -> dict:
+    """Данные ресурса без сбоев - в том виде, в каком их собирает MetricsStore"""
+    timestamps = [f'2024-01-01T{hour:02d}:00:00Z' for hour in range(24)]
+    return {
+        'resourceId': 'healthy',
+        'resourceName': 'Healthy',
+        'url': 'https://example.com',
+        'metrics': {'uptime': 100.0, 'avgResponseTime': 120, 'incidents': 0, 'mttr': 0, 'slaCompliance': 100.0},
+        'stats': {
+            'failuresCount': [{'timestamp': t, 'value': 0} for t in timestamps],
+            'responseTime': [{'timestamp': t, 'value': 120} for t in timestamps],
+            'failuresByTypes': {'critical': 0, 'warning': 0, 'resolved': 0},
+        },
+    }
+
+
+class HealthyResourceReportTest(unittest.TestCase):
+    def test_raster_report_without_failures(self):
+        """Круговая диаграмма из нулей не ломает растровый отчет"""
+        pdf = render_report(healthy_resource_data(), False)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_vector_report_without_failures(self):
+        pdf = render_report(healthy_resource_data(), True)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_raster_report_with_failures(self):
+        data = healthy_resource_data()
+        data['stats']['failuresByTypes'] = {'critical': 2, 'warning': 1, 'resolved': 3}
+        pdf = render_report(data, False)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+
+if __name__ == "__main__":
+    unittest.main()
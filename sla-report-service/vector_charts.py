@@ -0,0 +1,181 @@
+"""
+Векторные графики отчета на ReportLab graphics
+
+Графики строятся из примитивов PDF (линии, окружности, текст) и встраиваются
+в документ без растеризации: они не размываются при увеличении, занимают меньше
+места и строятся быстрее, чем PNG из matplotlib.
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Circle, Drawing, Group, Line, PolyLine, Rect, String
+from reportlab.lib import colors
+
+FONT = 'DejaVuSans'
+LINE_COLOR = colors.HexColor('#43464B')
+GRID_COLOR = colors.HexColor('#E5E7EB')
+TEXT_COLOR = colors.HexColor('#374151')
+
+# Шаги делений оси времени в секундах
+TIME_STEPS = [3600 * hours for hours in (1, 2, 3, 6, 12)] + [86400 * days for days in (1, 2, 5, 7, 14, 30)]
+
+# Поля области построения (в пунктах)
+LEFT, RIGHT, BOTTOM, TOP = 48, 12, 30, 26
+
+
+def _nice_ticks(low: float, high: float, count: int = 5, integer: bool = False) -> List[float]:
+    """Круглые значения делений оси (1, 2, 5 × 10^n), покрывающие [low, high]"""
+    if high <= low:
+        high = low + 1
+    raw_step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step)
+    if integer:
+        step = max(1, round(step))
+    start = math.floor(low / step) * step
+    ticks = []
+    value = start
+    while value < high + step:
+        ticks.append(round(value, 10))
+        value += step
+    return ticks
+
+
+def _time_labels(start: float, end: float, max_count: int = 8) -> List[Tuple[float, str]]:
+    """Деления оси времени, кратные круглому шагу (час, 2 часа, ..., неделя), в UTC"""
+    span = end - start
+    step = next((step for step in TIME_STEPS if span / step <= max_count), TIME_STEPS[-1])
+    label_format = '%H:%M' if step < 86400 else '%d.%m'
+    first = math.ceil(start / step) * step
+    return [
+        (t, datetime.fromtimestamp(t, timezone.utc).strftime(label_format))
+        for t in range(int(first), int(end) + 1, step)
+    ]
+
+
+def time_series_chart(timestamps: Sequence[float], values: Sequence[float], width: float, height: float,
+                      title: str, y_label: str, marker_colors: Optional[Sequence] = None,
+                      thresholds: Sequence[Tuple[float, str, str]] = (), integer_y: bool = False) -> Drawing:
+    """
+    Линейный график временного ряда
+
+    Args:
+        timestamps: Время точек (unix timestamp, по возрастанию)
+        values: Значения точек
+        width, height: Размер графика в пунктах
+        title: Заголовок
+        y_label: Подпись оси Y
+        marker_colors: Цвет маркера каждой точки (None - маркеры не рисуются)
+        thresholds: Горизонтальные пороговые линии (значение, цвет, подпись)
+        integer_y: Только целые деления оси Y
+    """
+    drawing = Drawing(width, height)
+    drawing.hAlign = 'CENTER'
+    drawing.add(String(width / 2, height - 14, title, fontName=FONT, fontSize=11,
+                       fillColor=TEXT_COLOR, textAnchor='middle'))
+    if not timestamps:
+        drawing.add(String(width / 2, height / 2, 'Нет данных', fontName=FONT, fontSize=9,
+                           fillColor=TEXT_COLOR, textAnchor='middle'))
+        return drawing
+
+    plot_w = width - LEFT - RIGHT
+    plot_h = height - BOTTOM - TOP
+    t_min, t_max = timestamps[0], timestamps[-1]
+    if t_max == t_min:
+        t_min, t_max = t_min - 3600, t_max + 3600
+
+    threshold_values = [threshold[0] for threshold in thresholds]
+    y_ticks = _nice_ticks(min(0, min(values)), max([max(values)] + threshold_values), integer=integer_y)
+    y_min, y_max = y_ticks[0], y_ticks[-1]
+
+    def x_pos(t: float) -> float:
+        return LEFT + (t - t_min) / (t_max - t_min) * plot_w
+
+    def y_pos(v: float) -> float:
+        return BOTTOM + (v - y_min) / (y_max - y_min) * plot_h
+
+    for tick in y_ticks:
+        y = y_pos(tick)
+        drawing.add(Line(LEFT, y, LEFT + plot_w, y, strokeColor=GRID_COLOR, strokeWidth=0.5))
+        drawing.add(String(LEFT - 4, y - 3, f'{tick:g}', fontName=FONT, fontSize=7,
+                           fillColor=TEXT_COLOR, textAnchor='end'))
+    for t, label in _time_labels(t_min, t_max):
+        x = x_pos(t)
+        drawing.add(Line(x, BOTTOM, x, BOTTOM + plot_h, strokeColor=GRID_COLOR, strokeWidth=0.5))
+        drawing.add(String(x, BOTTOM - 11, label, fontName=FONT, fontSize=7,
+                           fillColor=TEXT_COLOR, textAnchor='middle'))
+    drawing.add(Line(LEFT, BOTTOM, LEFT + plot_w, BOTTOM, strokeColor=TEXT_COLOR, strokeWidth=0.7))
+    drawing.add(Line(LEFT, BOTTOM, LEFT, BOTTOM + plot_h, strokeColor=TEXT_COLOR, strokeWidth=0.7))
+
+    y_axis_label = Group(String(0, 0, y_label, fontName=FONT, fontSize=7, fillColor=TEXT_COLOR, textAnchor='middle'))
+    y_axis_label.translate(10, BOTTOM + plot_h / 2)
+    y_axis_label.rotate(90)
+    drawing.add(y_axis_label)
+
+    for value, color, label in thresholds:
+        y = y_pos(value)
+        drawing.add(Line(LEFT, y, LEFT + plot_w, y, strokeColor=colors.HexColor(color),
+                         strokeWidth=0.8, strokeDashArray=[4, 3]))
+
+    points = []
+    for t, v in zip(timestamps, values):
+        points.extend((x_pos(t), y_pos(v)))
+    drawing.add(PolyLine(points, strokeColor=LINE_COLOR, strokeWidth=1.2 if len(timestamps) > 100 else 1.5))
+
+    if marker_colors is not None:
+        # Маркеры уменьшаются на длинных рядах, чтобы не сливаться
+        radius = 2.5 if len(timestamps) <= 100 else 1.2
+        hex_colors = {}
+        for i in range(len(timestamps)):
+            fill = hex_colors.setdefault(marker_colors[i], colors.HexColor(marker_colors[i]))
+            drawing.add(Circle(points[2 * i], points[2 * i + 1], radius, fillColor=fill, strokeColor=None))
+
+    if thresholds:
+        # Легенда порогов поверх данных в правом верхнем углу, как у matplotlib
+        legend_w, legend_h = 118, 6 + 10 * len(thresholds)
+        legend_x, legend_top = LEFT + plot_w - legend_w - 4, BOTTOM + plot_h - 4
+        drawing.add(Rect(legend_x, legend_top - legend_h, legend_w, legend_h, fillColor=colors.white,
+                         fillOpacity=0.85, strokeColor=GRID_COLOR, strokeWidth=0.5))
+        for i, (value, color, label) in enumerate(thresholds):
+            y = legend_top - 10 - i * 10
+            drawing.add(Line(legend_x + 4, y + 2.5, legend_x + 18, y + 2.5, strokeColor=colors.HexColor(color),
+                             strokeWidth=0.8, strokeDashArray=[4, 3]))
+            drawing.add(String(legend_x + 22, y, label, fontName=FONT, fontSize=6.5, fillColor=TEXT_COLOR))
+
+    return drawing
+
+
+def pie_chart(values: Sequence[float], labels: Sequence[str], slice_colors: Sequence[str],
+              width: float, height: float, title: str) -> Drawing:
+    """Круговая диаграмма с долями в процентах"""
+    drawing = Drawing(width, height)
+    drawing.hAlign = 'CENTER'
+    drawing.add(String(width / 2, height - 14, title, fontName=FONT, fontSize=11,
+                       fillColor=TEXT_COLOR, textAnchor='middle'))
+    total = sum(values)
+    if not total:
+        drawing.add(String(width / 2, height / 2, 'Нет данных', fontName=FONT, fontSize=9,
+                           fillColor=TEXT_COLOR, textAnchor='middle'))
+        return drawing
+
+    size = min(width, height - 30) * 0.7
+    pie = Pie()
+    pie.x = (width - size) / 2
+    pie.y = (height - 20 - size) / 2
+    pie.width = pie.height = size
+    pie.data = list(values)
+    pie.labels = [f'{label} {value / total:.0%}' if value else '' for label, value in zip(labels, values)]
+    pie.startAngle = 90
+    pie.direction = 'anticlockwise'
+    pie.slices.strokeColor = colors.white
+    pie.slices.strokeWidth = 1
+    pie.slices.fontName = FONT
+    pie.slices.fontSize = 8
+    pie.slices.labelRadius = 1.15
+    for i, color in enumerate(slice_colors):
+        pie.slices[i].fillColor = colors.HexColor(color)
+    drawing.add(pie)
+    return drawing
@@ -0,0 +1,209 @@
+"""
+Дедупликация алертов и подавление флаппинга для результатов проверок
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from config import settings
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+UP = 'UP'
+SUSPECT = 'SUSPECT'
+DOWN = 'DOWN'
+RECOVERING = 'RECOVERING'
+
+# Переходы, о которых нужно уведомлять
+ALERT_DOWN = 'down'
+ALERT_STILL_DOWN = 'still_down'
+ALERT_RECOVERED = 'recovered'
+
+
+@dataclass(frozen=True)
+class AlertPolicy:
+    """Параметры алертинга; delay и repeat_interval совпадают с полями AlertRule"""
+    delay: int = 0  # сколько секунд цель должна быть недоступна до алерта
+    repeat_interval: int = 300  # интервал повторного алерта, пока цель недоступна
+    failure_threshold: int = 3  # подряд неудачных проверок до DOWN
+    recovery_threshold: int = 2  # подряд успешных проверок до UP
+
+
+@dataclass
+class Transition:
+    """Событие, о котором нужно уведомить"""
+    kind: str
+    url: str
+    failures: int
+    down_since: float
+
+
+class TargetState:
+    """Компактное состояние одной цели проверки"""
+    __slots__ = ('state', 'failures', 'successes', 'first_failure', 'last_alert')
+
+    def __init__(self, state: str = UP, failures: int = 0, successes: int = 0,
+                 first_failure: float = 0.0, last_alert: float = 0.0):
+        self.state = state
+        self.failures = failures
+        self.successes = successes
+        self.first_failure = first_failure
+        self.last_alert = last_alert
+
+    def dump(self) -> str:
+        return f"{self.state}|{self.failures}|{self.successes}|{self.first_failure:.0f}|{self.last_alert:.0f}"
+
+    @classmethod
+    def load(cls, raw: str) -> 'TargetState':
+        state, failures, successes, first_failure, last_alert = raw.split('|')
+        return cls(state, int(failures), int(successes), float(first_failure), float(last_alert))
+
+
+class AlertTracker:
+    """
+    Конечный автомат UP → SUSPECT → DOWN → RECOVERING → UP для каждой цели
+
+    Наружу отдаются только переходы: первый DOWN, повтор раз в repeat_interval
+    и восстановление. Одиночные сбои и кратковременные восстановления гасятся
+    порогами failure_threshold / recovery_threshold.
+    """
+
+    def __init__(self, redis_url: str = '', redis_key: str = 'url_analysis:alert_state'):
+        self.redis_url = redis_url
+        self.redis_key = redis_key
+        self._states: Dict[str, TargetState] = {}
+        self._dirty: Set[str] = set()
+        self._redis = None
+
+    def observe(self, url: str, failed: bool, policy: AlertPolicy,
+                now: Optional[float] = None) -> Optional[Transition]:
+        """Учитывает результат проверки и возвращает переход, если нужен алерт"""
+        now = time.time() if now is None else now
+        target = self._states.get(url)
+        if target is None:
+            if not failed:
+                # Здоровые цели без истории не храним
+                return None
+            target = self._states[url] = TargetState()
+
+        transition = self._failure(url, target, policy, now) if failed else self._success(url, target, policy)
+
+        if target.state == UP:
+            self._states.pop(url, None)
+        self._dirty.add(url)
+        return transition
+
+    def _failure(self, url: str, target: TargetState, policy: AlertPolicy, now: float) -> Optional[Transition]:
+        target.successes = 0
+        if target.state == UP:
+            target.state = SUSPECT
+            target.failures = 0
+            target.first_failure = now
+
+        target.failures += 1
+
+        if target.state == SUSPECT:
+            if target.failures >= policy.failure_threshold and now - target.first_failure >= policy.delay:
+                target.state = DOWN
+                target.last_alert = now
+                return Transition(ALERT_DOWN, url, target.failures, target.first_failure)
+            return None
+
+        # Неудача во время восстановления возвращает в DOWN без нового алерта
+        target.state = DOWN
+        if now - target.last_alert >= policy.repeat_interval:
+            target.last_alert = now
+            return Transition(ALERT_STILL_DOWN, url, target.failures, target.first_failure)
+        return None
+
+    def _success(self, url: str, target: TargetState, policy: AlertPolicy) -> Optional[Transition]:
+        if target.state == SUSPECT:
+            # Флаппинг: сбой не подтвердился, алерт не отправлялся
+            target.state = UP
+            return None
+
+        target.successes += 1
+        if target.successes >= policy.recovery_threshold:
+            transition = Transition(ALERT_RECOVERED, url, target.failures, target.first_failure)
+            target.state = UP
+            return transition
+
+        target.state = RECOVERING
+        return None
+
+    def get_state(self, url: str) -> str:
+        target = self._states.get(url)
+        return target.state if target else UP
+
+    def get_stats(self) -> Dict:
+        counts = {SUSPECT: 0, DOWN: 0, RECOVERING: 0}
+        for target in self._states.values():
+            counts[target.state] += 1
+        return {'tracked_targets': len(self._states), **counts}
+
+    async def _get_redis(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def restore(self):
+        """Восстановление состояния из Redis после перезапуска или перераспределения хостов"""
+        try:
+            client = await self._get_redis()
+            if client is None:
+                return
+            raw_states = await client.hgetall(self.redis_key)
+            states = {url: TargetState.load(raw) for url, raw in raw_states.items()}
+            # Еще не сохраненные изменения новее, чем в Redis
+            for url in self._dirty:
+                if url in self._states:
+                    states[url] = self._states[url]
+                else:
+                    states.pop(url, None)
+            self._states = states
+            logger.info(f"Восстановлено состояние алертов для {len(self._states)} целей из Redis")
+        except Exception as e:
+            logger.error(f"Не удалось восстановить состояние алертов из Redis: {e}")
+
+    async def save(self):
+        """Сохранение измененных состояний в Redis (только изменившиеся цели)"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            client = await self._get_redis()
+            if client is None:
+                return
+            changed = {url: self._states[url].dump() for url in dirty if url in self._states}
+            removed = [url for url in dirty if url not in self._states]
+            async with client.pipeline(transaction=False) as pipe:
+                if changed:
+                    pipe.hset(self.redis_key, mapping=changed)
+                if removed:
+                    pipe.hdel(self.redis_key, *removed)
+                await pipe.execute()
+        except Exception as e:
+            self._dirty |= dirty
+            logger.error(f"Не удалось сохранить состояние алертов в Redis: {e}")
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+# Политика по умолчанию и глобальный трекер процесса
+default_alert_policy = AlertPolicy(
+    delay=settings.ALERT_DELAY,
+    repeat_interval=settings.ALERT_REPEAT_INTERVAL,
+    failure_threshold=settings.ALERT_FAILURE_THRESHOLD,
+    recovery_threshold=settings.ALERT_RECOVERY_THRESHOLD
+)
+
+alert_tracker = AlertTracker(redis_url=settings.REDIS_URL)
@@ -0,0 +1,128 @@
+"""
+Статус заданий, разосланных probe-воркерам (PROBE_MODE=sharded)
+
+API при публикации назначений записывает задание в Redis, воркер после проверки
+хоста сохраняет итог назначения в поле этого хоста. Повторная доставка назначения
+перезаписывает то же поле, поэтому итог не учитывается дважды. Задание завершено,
+когда записаны итоги всех хостов. Без REDIS_URL статус не отслеживается.
+"""
+
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from config import settings
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+DISPATCHED = 'dispatched'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_HOST_PREFIX = 'host:'
+
+
+class ShardedBatchTracker:
+    """Прогресс заданий по хостам в Redis, общий для API и всех probe-воркеров"""
+
+    def __init__(self, redis_url: str = '', ttl: int = 24 * 3600, key_prefix: str = 'url_analysis:batch:'):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._redis = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.redis_url)
+
+    async def _get_redis(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def register(self, batch_id: str, total_urls: int, hosts: int):
+        """Регистрация разосланного задания (вызывает API)"""
+        client = await self._get_redis()
+        if client is None:
+            return
+        key = self.key_prefix + batch_id
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={'total_urls': total_urls, 'hosts': hosts, 'created_at': time.time()})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def started(self, batch_id: str):
+        """Отметка начала проверки первого назначения задания (вызывает воркер)"""
+        try:
+            client = await self._get_redis()
+            if client is not None:
+                await client.hsetnx(self.key_prefix + batch_id, 'started_at', time.time())
+        except Exception as e:
+            logger.error(f"Не удалось обновить статус задания {batch_id} в Redis: {e}")
+
+    async def record(self, batch_id: str, host: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        """Итог назначения одного хоста: статистика run_test_batch или ошибка (вызывает воркер)"""
+        try:
+            client = await self._get_redis()
+            if client is None:
+                return
+            outcome = {**(result or {}), 'error': error, 'finished_at': time.time()}
+            await client.hset(self.key_prefix + batch_id, _HOST_PREFIX + host, json.dumps(outcome))
+        except Exception as e:
+            logger.error(f"Не удалось сохранить итог назначения {batch_id} ({host}) в Redis: {e}")
+
+    async def get(self, batch_id: str) -> Optional[Dict]:
+        """Статус задания в формате очереди заданий; None - задание неизвестно"""
+        client = await self._get_redis()
+        if client is None:
+            return None
+        fields = await client.hgetall(self.key_prefix + batch_id)
+        # Итоги воркеров без регистрации задания (Redis был недоступен API) не показываем
+        if 'hosts' not in fields:
+            return None
+
+        outcomes = [json.loads(value) for name, value in fields.items() if name.startswith(_HOST_PREFIX)]
+        hosts = int(fields['hosts'])
+        errors = [outcome['error'] for outcome in outcomes if outcome.get('error')]
+        successful = sum(outcome.get('successful', 0) for outcome in outcomes)
+        response_time_sum = sum(outcome.get('avg_response_time', 0) * outcome.get('successful', 0)
+                                for outcome in outcomes)
+
+        if not outcomes:
+            status = DISPATCHED
+        elif len(outcomes) < hosts:
+            status = RUNNING
+        else:
+            status = FAILED if errors else DONE
+
+        return {
+            'batch_id': batch_id,
+            'status': status,
+            'total_urls': int(fields['total_urls']),
+            'created_at': float(fields['created_at']),
+            'started_at': float(fields['started_at']) if 'started_at' in fields else None,
+            'finished_at': max(outcome['finished_at'] for outcome in outcomes) if status in (DONE, FAILED) else None,
+            'result': {
+                'successful': successful,
+                'failed': sum(outcome.get('failed', 0) for outcome in outcomes),
+                'avg_response_time': round(response_time_sum / max(successful, 1), 3),
+                'hosts': hosts,
+                'hosts_done': len(outcomes),
+            } if outcomes else None,
+            'error': f"Не выполнено назначений: {len(errors)} из {hosts} ({errors[0]})" if errors else None,
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+# Глобальный экземпляр: API и probe-воркеры используют один Redis
+batch_tracker = ShardedBatchTracker(redis_url=settings.REDIS_URL, ttl=settings.BATCH_STATUS_TTL)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк фронтира обхода и классификатора URL на синтетическом сайте с 10k ссылок
+"""
+
+import contextlib
+import io
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from url_parser import WebsiteCrawler
+
+TOTAL_LINKS = 10_000
+LINKS_PER_PAGE = 50
+PORT = 8765
+
+
+class SyntheticSiteHandler(BaseHTTPRequestHandler):
+    """Главная страница ссылается на все 10k страниц, каждая страница - на 50 случайных"""
+
+    def do_GET(self):
+        rnd = random.Random(self.path)
+        if self.path == '/':
+            targets = range(TOTAL_LINKS)
+        else:
+            targets = (rnd.randrange(TOTAL_LINKS) for _ in range(LINKS_PER_PAGE))
+        links = ''.join(f'<a href="/p/{i}">page {i}</a><img src="/images/{i}.png">' for i in targets)
+        body = f'<html><body>{links}</body></html>'.encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LegacyWebsiteCrawler(WebsiteCrawler):
+    """Прежняя реализация: линейный поиск по очереди и классификатор без предкомпиляции"""
+
+    def is_media_url(self, url: str) -> bool:
+        media_extensions = {
+            '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp',
+            '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm',
+            '.mp3', '.wav', '.ogg', '.m4a', '.flac',
+            '.pdf', '.doc', '.docx', '.xls', '.xlsx',
+            '.zip', '.rar', '.tar', '.gz',
+            '.css', '.js'
+        }
+        path = urlparse(url).path.lower()
+        media_patterns = [
+            r'/media/', r'/uploads/', r'/images/', r'/videos/',
+            r'/audio/', r'/assets/', r'/static/', r'/files/',
+            r'/img/', r'/video/', r'/audio/', r'/downloads/'
+        ]
+        return (any(path.endswith(ext) for ext in media_extensions) or
+                any(pattern in path for pattern in media_patterns) or
+                'image' in path or 'video' in path or 'audio' in path)
+
+    def crawl_website(self, start_url: str, max_pages: int = 100):
+        from collections import deque
+        start_url = self.normalize_url(start_url)
+        queue = deque([start_url])
+        self.internal_urls.add(start_url)
+
+        while queue and len(self.visited_urls) < max_pages:
+            current_url = queue.popleft()
+            if current_url in self.visited_urls:
+                continue
+            response = self.session.get(current_url, headers={'User-Agent': self.user_agent}, timeout=10)
+            self.visited_urls.add(current_url)
+            for url in self.extract_urls_from_page(current_url, response.text):
+                normalized_url = self.normalize_url(url)
+                if self.is_media_url(normalized_url):
+                    self.media_urls.add(normalized_url)
+                elif self.should_visit_url(normalized_url, start_url):
+                    if normalized_url not in queue and normalized_url not in self.visited_urls:
+                        queue.append(normalized_url)
+                        self.internal_urls.add(normalized_url)
+
+        self.internal_urls.discard(start_url)
+        return {
+            'internal_urls': sorted(self.internal_urls),
+            'media_urls': sorted(self.media_urls),
+            'visited_pages': len(self.visited_urls)
+        }
+
+
+def run(crawler: WebsiteCrawler, start_url: str, max_pages: int):
+    """Время обхода и время, потраченное на классификацию и очередь (без сети и парсинга)"""
+    parse_time = 0.0
+    original_extract = crawler.extract_urls_from_page
+
+    def timed_extract(url, html):
+        nonlocal parse_time
+        started = time.perf_counter()
+        try:
+            return original_extract(url, html)
+        finally:
+            parse_time += time.perf_counter() - started
+
+    crawler.extract_urls_from_page = timed_extract
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = crawler.crawl_website(start_url, max_pages)
+    return time.perf_counter() - started, parse_time, result
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', PORT), SyntheticSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f'http://127.0.0.1:{PORT}/'
+
+    try:
+        print(f"🌐 Синтетический сайт: {TOTAL_LINKS} страниц, {LINKS_PER_PAGE} ссылок на странице")
+        print(f"{'реализация':>12} {'страниц':>8} {'всего, с':>9} {'без парсинга, с':>16} {'URL':>7}")
+        for max_pages in (20, 100):
+            for name, crawler in (('legacy', LegacyWebsiteCrawler(delay=0)),
+                                  ('frontier', WebsiteCrawler(delay=0)),
+                                  ('bloom', WebsiteCrawler(delay=0, bloom_capacity=TOTAL_LINKS * 10))):
+                total, parse_time, result = run(crawler, start_url, max_pages)
+                found = len(result['internal_urls']) + len(result['media_urls'])
+                print(f"{name:>12} {max_pages:>8} {total:>9.2f} {total - parse_time:>16.2f} {found:>7}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Сравнение размера и времени сериализации: прежний JSON против probe/deep MessagePack
+"""
+
+import json
+import time
+
+from result_schema import EncodedResult, decode_to_json
+
+SAMPLE_RESULT = {
+    'url': 'https://github.com/features/actions',
+    'timestamp': '2025-09-20T01:46:19.339932+00:00',
+    'success': True,
+    'error': None,
+    'response_time': 0.7221615314483643,
+    'status_code': 200,
+    'content_type': 'text/html; charset=utf-8',
+    'content_length': None,
+    'headers': {
+        'Date': 'Sat, 20 Sep 2025 01:46:22 GMT',
+        'Content-Type': 'text/html; charset=utf-8',
+        'Vary': 'X-PJAX, X-PJAX-Container, Turbo-Visit, Turbo-Frame, Accept-Language, Accept-Encoding, Accept',
+        'Etag': 'W/"8149b7c6f656cfd3a60dac8742e54240"',
+        'Cache-Control': 'max-age=0, private, must-revalidate',
+        'Strict-Transport-Security': 'max-age=31536000; includeSubdomains; preload',
+        'X-Frame-Options': 'deny',
+        'X-Content-Type-Options': 'nosniff',
+        'X-XSS-Protection': '0',
+        'Referrer-Policy': 'origin-when-cross-origin, strict-origin-when-cross-origin',
+        'Server': 'github.com',
+        'Content-Encoding': 'gzip',
+        'X-GitHub-Request-Id': 'A610:2D4EB:163229B:12C51F2:68CE0770',
+    },
+    'is_https': True,
+    'technology_stack': ['react', 'bootstrap'],
+    'security_headers': {
+        'strict-transport-security': 'max-age=31536000; includeSubdomains; preload',
+        'x-content-type-options': 'nosniff',
+        'x-frame-options': 'deny',
+        'x-xss-protection': '0',
+        'content-security-policy': None,
+        'referrer-policy': 'origin-when-cross-origin, strict-origin-when-cross-origin',
+        'permissions-policy': None,
+        'access-control-allow-origin': None,
+        'access-control-allow-methods': None,
+    },
+    'content_analysis': {
+        'title': 'Features · GitHub Actions · GitHub',
+        'meta_tags': {'viewport': 'width=device-width', 'description': 'Automate your workflow'},
+        'element_count': {'links': 180, 'images': 24, 'scripts': 31, 'stylesheets': 6, 'forms': 2},
+    },
+    'additional_checks': {
+        'robots_txt': {'exists': True, 'status_code': 200, 'content_type': 'text/plain'},
+        'sitemap_xml': {'exists': False, 'status_code': 404, 'content_type': 'text/html'},
+        'favicon': {'exists': True, 'content_type': 'image/x-icon', 'size': '6518'},
+    },
+    'redirect_chain': [],
+    'ssl_info': {'cipher': ['TLS_AES_128_GCM_SHA256', 'TLSv1.3', 128], 'protocol': 'TLSv1.3'},
+    'request_id': 'test_100_1758332779',
+    'batch_timestamp': '2025-09-20T01:46:19.339932+00:00',
+    'service_version': '1.0.0',
+}
+
+
+def bench(func, repeat: int = 20000) -> float:
+    """Среднее время вызова в микросекундах"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def encode_probe_and_deep():
+    encoded = EncodedResult(SAMPLE_RESULT)
+    return encoded.probe, encoded.deep
+
+
+def main():
+    encoded = EncodedResult(SAMPLE_RESULT)
+    json_size = len(json.dumps(SAMPLE_RESULT, ensure_ascii=False).encode('utf-8'))
+
+    print(f"{'формат':>14} {'байт':>7} {'мкс/запись':>11}")
+    print(f"{'json':>14} {json_size:>7} "
+          f"{bench(lambda: json.dumps(SAMPLE_RESULT, ensure_ascii=False).encode('utf-8')):>11.1f}")
+    print(f"{'probe':>14} {len(encoded.probe):>7} "
+          f"{bench(lambda: EncodedResult(SAMPLE_RESULT, include_deep=False).probe):>11.1f}")
+    print(f"{'probe + deep':>14} {len(encoded.probe) + len(encoded.deep):>7} "
+          f"{bench(encode_probe_and_deep):>11.1f}")
+
+    restored = json.loads(decode_to_json(encoded.probe, encoded.deep))
+    print(f"\n🔁 Восстановление JSON из probe + deep: {len(restored)} полей, "
+          f"status_code={restored['status_code']}, response_time={restored['response_time']}")
+
+
+if __name__ == "__main__":
+    main()
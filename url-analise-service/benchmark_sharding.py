@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк масштабирования probe-воркеров с шардированием по хосту (без брокера Kafka)
+
+Хосты 127.0.0.1..127.0.0.N раскладываются по партициям тем же murmur2, что и в Kafka,
+партиции делятся между процессами-воркерами как в range assignor. Каждый воркер -
+отдельный процесс со своим event loop и EndpointTester.
+
+Как и в продакшене, параллельность одного воркера ограничена (WORKER_CONCURRENCY),
+а ответ хоста занимает SERVER_DELAY: пропускная способность одного воркера -
+около WORKER_CONCURRENCY / SERVER_DELAY проверок в секунду, и добавление воркеров
+увеличивает ее почти линейно, пока хватает CPU. Страница небольшая, чтобы на
+машине с одним ядром упираться в задержку хостов, а не в разбор HTML.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault('TELEGRAM_ENABLED', 'false')
+
+from sharding import assign_partitions, partition_for_host  # noqa: E402
+
+PORT = 8766
+HOSTS = 32
+URLS_PER_HOST = 10
+PARTITIONS = 12
+SERVER_DELAY = 0.2
+WORKER_CONCURRENCY = 5
+PAGE = ('<html><head><title>page</title><meta name="description" content="synthetic"></head><body>'
+        + ''.join(f'<div class="item"><a href="/p/{i}">link {i}</a><img src="/i/{i}.png"><p>text {i}</p></div>'
+                  for i in range(10))
+        + '</body></html>').encode('utf-8')
+
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(SERVER_DELAY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve():
+    ThreadingHTTPServer(('0.0.0.0', PORT), SyntheticHandler).serve_forever()
+
+
+def all_hosts():
+    return [f'127.0.0.{i}:{PORT}' for i in range(1, HOSTS + 1)]
+
+
+def hosts_for_worker(worker: int, workers: int):
+    partitions = set(assign_partitions(PARTITIONS, workers)[worker])
+    return [host for host in all_hosts() if partition_for_host(host, PARTITIONS) in partitions]
+
+
+def run_worker(worker: int, workers: int, results):
+    from endpoint_tester import EndpointTester
+
+    urls = [f'http://{host}/p/{i}' for host in hosts_for_worker(worker, workers) for i in range(URLS_PER_HOST)]
+
+    async def probe():
+        tester = EndpointTester(max_concurrent=WORKER_CONCURRENCY, timeout=30)
+        try:
+            return await tester.test_multiple_endpoints(urls)
+        finally:
+            await tester.close_session()
+
+    probed = asyncio.run(probe()) if urls else []
+    results.put(sum(1 for r in probed if r.get('success')))
+
+
+def measure(workers: int) -> tuple:
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_worker, args=(w, workers, results)) for w in range(workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    successful = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return time.perf_counter() - started, successful
+
+
+def sticky_reassign(assignment, workers: int):
+    """Упрощенная модель sticky assignor: партиции остаются у прежних владельцев, переезжает только избыток"""
+    kept = [list(partitions) for partitions in assignment[:workers]] + [[] for _ in range(workers - len(assignment))]
+    orphans = [p for partitions in assignment[workers:] for p in partitions]
+    target = -(-PARTITIONS // workers)
+    for partitions in kept:
+        while len(partitions) > target:
+            orphans.append(partitions.pop())
+    for partition in orphans:
+        min(kept, key=len).append(partition)
+    return kept
+
+
+def moved_hosts(before: int, after: int, sticky: bool) -> int:
+    """Сколько хостов сменили воркера при изменении числа воркеров"""
+    old = assign_partitions(PARTITIONS, before)
+    new = sticky_reassign(old, after) if sticky else assign_partitions(PARTITIONS, after)
+    owner_before = {p: w for w, partitions in enumerate(old) for p in partitions}
+    owner_after = {p: w for w, partitions in enumerate(new) for p in partitions}
+    return sum(1 for host in all_hosts()
+               if owner_before[partition_for_host(host, PARTITIONS)] != owner_after[partition_for_host(host, PARTITIONS)])
+
+
+def main():
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    total = HOSTS * URLS_PER_HOST
+    print(f"🌐 {HOSTS} хостов × {URLS_PER_HOST} URL = {total} проверок, {PARTITIONS} партиций, CPU: {os.cpu_count()}")
+    print(f"{'воркеров':>9} {'время, с':>9} {'URL/с':>8} {'ускорение':>10} {'хостов на воркер':>17}")
+    baseline = None
+    try:
+        for workers in (1, 2, 4):
+            elapsed, successful = measure(workers)
+            throughput = successful / elapsed
+            baseline = baseline or throughput
+            per_worker = [len(hosts_for_worker(w, workers)) for w in range(workers)]
+            print(f"{workers:>9} {elapsed:>9.2f} {throughput:>8.1f} {throughput / baseline:>9.2f}x {str(per_worker):>17}")
+
+        print(f"\n🔄 Перебалансировка: хостов сменили воркера (из {HOSTS})")
+        print(f"{'переход':>9} {'range':>6} {'sticky':>7}")
+        for before, after in ((2, 3), (3, 4), (4, 3)):
+            print(f"{before:>5} → {after} {moved_hosts(before, after, False):>6} {moved_hosts(before, after, True):>7}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
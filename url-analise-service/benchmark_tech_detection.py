@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк определения технологий: старый цикл по индикаторам против Aho-Corasick
+"""
+
+import random
+import string
+import time
+from typing import Dict, List
+
+from tech_signatures import BODY_SIGNATURES, TechnologyMatcher
+
+
+def legacy_match(content: bytes, signatures: Dict[str, List[str]]) -> set:
+    """Прежняя реализация: отдельный поиск по телу для каждого индикатора"""
+    content_str = content.decode('utf-8', errors='ignore').lower()
+    detected = set()
+    for tech, indicators in signatures.items():
+        if any(indicator in content_str for indicator in indicators):
+            detected.add(tech)
+    return detected
+
+
+def make_signatures(extra: int) -> Dict[str, List[str]]:
+    """Реальные сигнатуры плюс синтетические для имитации большой базы"""
+    rnd = random.Random(42)
+    signatures = dict(BODY_SIGNATURES)
+    for i in range(extra):
+        suffix = ''.join(rnd.choices(string.ascii_lowercase, k=6))
+        signatures[f'tech{i}'] = [f'sig-{i}-{suffix}', f'x{i}lib.min.js']
+    return signatures
+
+
+def make_body(size: int) -> bytes:
+    """Синтетическая HTML-страница заданного размера"""
+    rnd = random.Random(7)
+    words = ['<div class="container">', '<a href="/page">', 'jquery', 'wp-content',
+             '<script src="/static/app.js"></script>', 'lorem', 'ipsum', 'dolor']
+    parts = []
+    total = 0
+    while total < size:
+        word = rnd.choice(words) if rnd.random() < 0.3 else ''.join(
+            rnd.choices(string.ascii_letters, k=rnd.randint(3, 10)))
+        parts.append(word)
+        total += len(word) + 1
+    return ' '.join(parts).encode('utf-8')
+
+
+def bench(func, *args, repeat: int = 20) -> float:
+    """Среднее время вызова в миллисекундах"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    body = make_body(300_000)
+    print(f"📄 Размер тела: {len(body) // 1024} KB")
+    print(f"{'сигнатур':>10} {'цикл, мс':>10} {'AC, мс':>10} {'ускорение':>10}")
+
+    for extra in (0, 100, 500, 1000):
+        signatures = make_signatures(extra)
+        matcher = TechnologyMatcher(body_signatures=signatures)
+        assert matcher.match_body(body) == legacy_match(body, signatures)
+
+        indicators = sum(len(v) for v in signatures.values())
+        legacy_ms = bench(legacy_match, body, signatures)
+        matcher_ms = bench(matcher.match_body, body)
+        print(f"{indicators:>10} {legacy_ms:>10.2f} {matcher_ms:>10.2f} {legacy_ms / matcher_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,26 +16,100 @@ class Settings:
     # Настройки Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = os.getenv('KAFKA_BOOTSTRAP_SERVERS', '193.124.114.117:9092')
     KAFKA_TOPIC: str = os.getenv('KAFKA_TOPIC', 'endpoint_test_results')
+    # Формат результатов: json (прежний топик), msgpack (компактные probe/deep топики) или both
+    KAFKA_RESULT_FORMAT: str = os.getenv('KAFKA_RESULT_FORMAT', 'json')
+    KAFKA_PROBE_TOPIC: str = os.getenv('KAFKA_PROBE_TOPIC', 'endpoint_probe_results.v1')
+    KAFKA_DEEP_TOPIC: str = os.getenv('KAFKA_DEEP_TOPIC', 'endpoint_deep_results.v1')
+    KAFKA_SEND_DEEP: bool = os.getenv('KAFKA_SEND_DEEP', 'true').lower() == 'true'
     KAFKA_USERNAME: str = os.getenv('KAFKA_USERNAME', 'user1')
     KAFKA_PASSWORD: str = os.getenv('KAFKA_PASSWORD', 'pass1')
     KAFKA_SECURITY_PROTOCOL: str = os.getenv('KAFKA_SECURITY_PROTOCOL', 'SASL_PLAINTEXT')
     KAFKA_SASL_MECHANISM: str = os.getenv('KAFKA_SASL_MECHANISM', 'PLAIN')
+    KAFKA_COMPRESSION_TYPE: str = os.getenv('KAFKA_COMPRESSION_TYPE', 'lz4')  # lz4, zstd, gzip
+    KAFKA_LINGER_MS: int = int(os.getenv('KAFKA_LINGER_MS', '20'))
+    KAFKA_BATCH_SIZE: int = int(os.getenv('KAFKA_BATCH_SIZE', str(256 * 1024)))
     
     # Настройки логирования
     LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
     
     # Настройки парсера URL
     DEFAULT_MAX_PAGES: int = int(os.getenv('DEFAULT_MAX_PAGES', '50'))
-    DEFAULT_DELAY: float = float(os.getenv('DEFAULT_DELAY', '0.3'))
+    CRAWLER_MAX_CONCURRENT: int = int(os.getenv('CRAWLER_MAX_CONCURRENT', '10'))
+    CRAWLER_HOST_RPS: float = float(os.getenv('CRAWLER_HOST_RPS', '10'))
+    # Сколько байт HTML страницы читается для поиска ссылок
+    CRAWLER_MAX_PAGE_SIZE: int = int(os.getenv('CRAWLER_MAX_PAGE_SIZE', str(5 * 1024 * 1024)))
+    DEFAULT_USE_SITEMAP: bool = os.getenv('DEFAULT_USE_SITEMAP', 'false').lower() == 'true'
+    SITEMAP_MAX_FILES: int = int(os.getenv('SITEMAP_MAX_FILES', '50'))
+    SITEMAP_MAX_URLS: int = int(os.getenv('SITEMAP_MAX_URLS', '50000'))
+    # Распакованный размер одного sitemap (лимит протокола sitemap - 50 МБ)
+    SITEMAP_MAX_SIZE: int = int(os.getenv('SITEMAP_MAX_SIZE', str(50 * 1024 * 1024)))
     
     # Настройки тестера эндпоинтов
     DEFAULT_MAX_CONCURRENT: int = int(os.getenv('DEFAULT_MAX_CONCURRENT', '20'))
     DEFAULT_TIMEOUT: int = int(os.getenv('DEFAULT_TIMEOUT', '15'))
+    # Тело ответа читается потоком не более MAX_BODY_SIZE байт
+    MAX_BODY_SIZE: int = int(os.getenv('MAX_BODY_SIZE', str(2 * 1024 * 1024)))
+    BODY_CHUNK_SIZE: int = int(os.getenv('BODY_CHUNK_SIZE', str(64 * 1024)))
+    # Адаптивные лимиты по хосту: AIMD-параллельность, таймаут = p99 × multiplier, circuit breaker
+    HOST_CONCURRENCY_INITIAL: float = float(os.getenv('HOST_CONCURRENCY_INITIAL', '4'))
+    HOST_CONCURRENCY_MAX: float = float(os.getenv('HOST_CONCURRENCY_MAX', '16'))
+    HOST_LATENCY_WINDOW: int = int(os.getenv('HOST_LATENCY_WINDOW', '100'))
+    HOST_LATENCY_MIN_SAMPLES: int = int(os.getenv('HOST_LATENCY_MIN_SAMPLES', '20'))
+    HOST_TIMEOUT_MULTIPLIER: float = float(os.getenv('HOST_TIMEOUT_MULTIPLIER', '3'))
+    HOST_TIMEOUT_MIN: float = float(os.getenv('HOST_TIMEOUT_MIN', '2'))
+    HOST_CONTROL_MAX_HOSTS: int = int(os.getenv('HOST_CONTROL_MAX_HOSTS', '10000'))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_OPEN_SECONDS: float = float(os.getenv('CIRCUIT_OPEN_SECONDS', '60'))
+    # Проверка TLS-сертификатов: одно рукопожатие на host:port за TLS_CERT_REFRESH секунд
+    TLS_INSPECTION_ENABLED: bool = os.getenv('TLS_INSPECTION_ENABLED', 'true').lower() == 'true'
+    TLS_CERT_REFRESH: float = float(os.getenv('TLS_CERT_REFRESH', str(24 * 3600)))
+    TLS_HANDSHAKE_TIMEOUT: float = float(os.getenv('TLS_HANDSHAKE_TIMEOUT', '10'))
+    TLS_EXPIRY_WARNING_DAYS: int = int(os.getenv('TLS_EXPIRY_WARNING_DAYS', '14'))
+    TLS_CERT_MAX_HOSTS: int = int(os.getenv('TLS_CERT_MAX_HOSTS', '10000'))
+    # Ошибки рукопожатия кэшируются ненадолго (negative TTL)
+    TLS_ERROR_TTL: float = float(os.getenv('TLS_ERROR_TTL', '300'))
+    KAFKA_CERT_TOPIC: str = os.getenv('KAFKA_CERT_TOPIC', 'endpoint_cert_expiry')
+    # Фоновые задания /api/v1/test-endpoints: число воркеров и глубина очереди
+    JOB_WORKERS: int = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_QUEUE_SIZE: int = int(os.getenv('JOB_QUEUE_SIZE', '20'))
+    JOB_HISTORY_SIZE: int = int(os.getenv('JOB_HISTORY_SIZE', '1000'))
+    JOB_RETRY_AFTER: int = int(os.getenv('JOB_RETRY_AFTER', '30'))
+    # local - проверки в процессе API, sharded - назначения по хостам в Kafka для probe_worker.py
+    PROBE_MODE: str = os.getenv('PROBE_MODE', 'local')
+    KAFKA_ASSIGNMENT_TOPIC: str = os.getenv('KAFKA_ASSIGNMENT_TOPIC', 'endpoint_check_assignments')
+    PROBE_WORKER_GROUP: str = os.getenv('PROBE_WORKER_GROUP', 'url-analysis-probe-workers')
+    PROBE_WORKER_MAX_RECORDS: int = int(os.getenv('PROBE_WORKER_MAX_RECORDS', '20'))
+    PROBE_WORKER_MAX_POLL_INTERVAL_MS: int = int(os.getenv('PROBE_WORKER_MAX_POLL_INTERVAL_MS', '600000'))
+    # Общая сессия проверок процесса: всего соединений и сколько держать простаивающее (keep-alive)
+    PROBE_CONNECTION_LIMIT: int = int(os.getenv('PROBE_CONNECTION_LIMIT', '100'))
+    PROBE_KEEPALIVE_TIMEOUT: float = float(os.getenv('PROBE_KEEPALIVE_TIMEOUT', '75'))
+    # Сколько хранить статус разосланных заданий в Redis (нужен REDIS_URL)
+    BATCH_STATUS_TTL: int = int(os.getenv('BATCH_STATUS_TTL', str(24 * 3600)))
+    
+    # Кэш дополнительных проверок (robots.txt, sitemap.xml, favicon) по хосту
+    ADDITIONAL_CHECKS_TTL: float = float(os.getenv('ADDITIONAL_CHECKS_TTL', str(6 * 3600)))
+    ADDITIONAL_CHECKS_MAX_HOSTS: int = int(os.getenv('ADDITIONAL_CHECKS_MAX_HOSTS', '10000'))
+    # Результат с ошибкой сети (таймаут, сброс соединения) кэшируется ненадолго
+    ADDITIONAL_CHECKS_ERROR_TTL: float = float(os.getenv('ADDITIONAL_CHECKS_ERROR_TTL', '300'))
     
     # Настройки Telegram уведомлений
     TELEGRAM_BOT_TOKEN: str = os.getenv('TELEGRAM_BOT_TOKEN', '8427093098:AAHMU1khBdU22vfvlsXh8fccigW30EgzI1g')
     TELEGRAM_CHAT_ID: str = os.getenv('TELEGRAM_CHAT_ID', '1377775487')
     TELEGRAM_ENABLED: bool = os.getenv('TELEGRAM_ENABLED', 'true').lower() == 'true'
+    # Окно объединения ошибок в одну сводку и лимиты отправки
+    TELEGRAM_BATCH_WINDOW: float = float(os.getenv('TELEGRAM_BATCH_WINDOW', '5'))
+    TELEGRAM_MAX_BATCH: int = int(os.getenv('TELEGRAM_MAX_BATCH', '100'))
+    TELEGRAM_MIN_INTERVAL: float = float(os.getenv('TELEGRAM_MIN_INTERVAL', '3'))
+    TELEGRAM_QUEUE_SIZE: int = int(os.getenv('TELEGRAM_QUEUE_SIZE', '1000'))
+    
+    # Политика алертов по умолчанию (delay и repeat_interval - как в AlertRule)
+    ALERT_DELAY: int = int(os.getenv('ALERT_DELAY', '0'))
+    ALERT_REPEAT_INTERVAL: int = int(os.getenv('ALERT_REPEAT_INTERVAL', '300'))
+    ALERT_FAILURE_THRESHOLD: int = int(os.getenv('ALERT_FAILURE_THRESHOLD', '3'))
+    ALERT_RECOVERY_THRESHOLD: int = int(os.getenv('ALERT_RECOVERY_THRESHOLD', '2'))
+    
+    # Redis для сохранения состояния алертов между перезапусками (пусто - не сохранять)
+    REDIS_URL: str = os.getenv('REDIS_URL', '')
     
     @classmethod
     def get_kafka_config(cls) -> dict:
@@ -46,7 +120,10 @@ class Settings:
             'security_protocol': cls.KAFKA_SECURITY_PROTOCOL,
             'sasl_mechanism': cls.KAFKA_SASL_MECHANISM,
             'sasl_plain_username': cls.KAFKA_USERNAME,
-            'sasl_plain_password': cls.KAFKA_PASSWORD
+            'sasl_plain_password': cls.KAFKA_PASSWORD,
+            'compression_type': cls.KAFKA_COMPRESSION_TYPE,
+            'linger_ms': cls.KAFKA_LINGER_MS,
+            'batch_size': cls.KAFKA_BATCH_SIZE
         }
     
     @classmethod
@@ -2,7 +2,7 @@ import aiohttp
 import asyncio
 from urllib.parse import urlparse
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import ssl
 import json
 from datetime import datetime, timezone
@@ -10,43 +10,85 @@ import asyncpg
 from bs4 import BeautifulSoup
 import re
 import logging
-from telegram_service import telegram_service
+import hashlib
+from config import settings
+from telegram_service import telegram_notifier
+from tech_signatures import technology_matcher
+from host_checks_cache import host_checks_cache
+from host_control import host_controls
+from tls_inspector import tls_inspector
+from result_schema import SECURITY_HEADERS
+from alert_state import (
+    AlertPolicy, alert_tracker, default_alert_policy,
+    ALERT_DOWN, ALERT_STILL_DOWN, ALERT_RECOVERED
+)
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Сертификат в запросах проверки не проверяется (его проверяет tls_inspector).
+# Контекст общий: он входит в ключ пула соединений, и с отдельным контекстом
+# на каждый тестер соединения общей сессии не переиспользовались бы
+_ssl_context = ssl.create_default_context()
+_ssl_context.check_hostname = False
+_ssl_context.verify_mode = ssl.CERT_NONE
+
+
+def create_probe_session(limit: int, timeout: float) -> aiohttp.ClientSession:
+    """Сессия проверок: соединения с хостом переиспользуются между запросами (keep-alive)"""
+    connector = aiohttp.TCPConnector(limit=limit, ssl=_ssl_context, keepalive_timeout=settings.PROBE_KEEPALIVE_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+
 class EndpointTester:
-    def __init__(self, max_concurrent: int = 50, timeout: int = 30):
+    def __init__(self, max_concurrent: int = 50, timeout: int = 30, alert_policy: AlertPolicy = None,
+                 max_body_size: int = None, session: aiohttp.ClientSession = None):
+        """
+        Args:
+            session: Общая сессия (create_probe_session), которой владеет вызывающий код;
+                по умолчанию тестер создает и закрывает свою
+        """
         self.max_concurrent = max_concurrent
         self.timeout = timeout
-        self.session = None
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.max_body_size = max_body_size or settings.MAX_BODY_SIZE
+        self.alert_policy = alert_policy or default_alert_policy
+        self.session = session
+        self._owns_session = session is None
+        self.ssl_context = _ssl_context
 
     async def init_session(self):
         """Инициализация асинхронной сессии"""
-        connector = aiohttp.TCPConnector(
-            limit=self.max_concurrent,
-            ssl=self.ssl_context,
-            force_close=True
-        )
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=aiohttp.ClientTimeout(total=self.timeout)
-        )
+        self.session = create_probe_session(self.max_concurrent, self.timeout)
 
     async def close_session(self):
-        """Закрытие сессии"""
-        if self.session:
+        """Закрытие сессии (общая сессия закрывается ее владельцем)"""
+        if self.session and self._owns_session:
             await self.session.close()
 
-    async def test_endpoint(self, url: str) -> Dict:
-        """Тестирование одного эндпоинта с сбором максимальной информации"""
+    async def test_endpoint(self, url: str, method: str = 'GET', headers: Optional[Dict[str, str]] = None,
+                            body: Optional[str] = None, expected_status: Optional[int] = None,
+                            expected_body: Optional[str] = None, availability_only: bool = False) -> Dict:
+        """
+        Тестирование одного эндпоинта с сбором максимальной информации
+
+        Args:
+            url: Проверяемый URL
+            method: HTTP-метод эндпоинта (Endpoint.method)
+            headers: Дополнительные заголовки запроса
+            body: Тело запроса (для POST/PUT/PATCH)
+            expected_status: Ожидаемый код ответа (по умолчанию успех - 2xx/3xx)
+            expected_body: Подстрока, которая должна быть в теле ответа
+            availability_only: Проверка только доступности - для GET выполняется HEAD без тела
+        """
+        method = method.upper()
+        request_method = self._probe_method(method, availability_only, expected_body)
+        # Состояние алертов для не-GET проверок ведется отдельно от GET того же URL
+        alert_key = url if method == 'GET' else f"{method} {url}"
         result = {
             'url': url,
+            'method': request_method,
             'timestamp': datetime.now(timezone.utc).isoformat(),
             'success': False,
             'error': None,
@@ -63,34 +105,55 @@ class EndpointTester:
             'redirect_chain': []
         }
 
+        alert_error = None
+        tls_target = None
+
+        # Хост с открытым circuit breaker не проверяем - сразу фиксируем недоступность
+        control = host_controls.get(urlparse(url).netloc)
+        allowed, trial = control.allow_request()
+        if not allowed or not await control.acquire(trial):
+            host_controls.fast_failed += 1
+            result['error'] = f"Circuit breaker open: host unavailable, retry in {control.retry_in():.0f}s"
+            self._track_alert_state(alert_key, 0, f"Хост недоступен ({control.consecutive_failures} ошибок соединения подряд)")
+            return result
+
+        request_timeout = control.timeout(self.timeout)
         start_time = time.time()
+        timed_out = False
 
         try:
-            async with self.session.get(
-                    url,
-                    allow_redirects=True,
-                    ssl=self.ssl_context
-            ) as response:
+            response = await self._send_request(
+                request_method, url, headers, body, aiohttp.ClientTimeout(total=request_timeout)
+            )
+            if request_method == 'HEAD' and response.status in (405, 501):
+                # Сервер не поддерживает HEAD - повторяем исходным методом
+                response.release()
+                request_method = result['method'] = method
+                response = await self._send_request(
+                    method, url, headers, body, aiohttp.ClientTimeout(total=request_timeout)
+                )
+
+            async with response:
                 # Базовая информация
                 result['response_time'] = time.time() - start_time
                 result['status_code'] = response.status
                 result['content_type'] = response.headers.get('Content-Type')
                 result['content_length'] = response.headers.get('Content-Length')
-                result['success'] = 200 <= response.status < 400
+                if expected_status is not None:
+                    result['success'] = response.status == expected_status
+                else:
+                    result['success'] = 200 <= response.status < 400
                 result['is_https'] = response.url.scheme == 'https'
+                if result['is_https']:
+                    # Сертификат проверяется для итогового хоста после редиректов
+                    tls_target = (response.url.host, response.url.port or 443)
+                if not result['success'] and expected_status is not None:
+                    result['error'] = f"Expected status {expected_status}, got {response.status}"
+                    alert_error = f"Ожидался код {expected_status}, получен {response.status}"
                 
-                # Отправляем уведомление в Telegram при статусе 500
                 if response.status == 500:
-                    error_message = f"Внутренняя ошибка сервера (500) для URL: {url}"
                     logger.warning(f"Обнаружена ошибка 500: {url}")
-                    try:
-                        telegram_service.send_error_notification(
-                            url=url,
-                            status_code=500,
-                            error_message="Внутренняя ошибка сервера"
-                        )
-                    except Exception as e:
-                        logger.error(f"Ошибка отправки Telegram уведомления: {e}")
+                    alert_error = "Внутренняя ошибка сервера"
 
                 # Заголовки
                 result['headers'] = dict(response.headers)
@@ -105,15 +168,6 @@ class EndpointTester:
                 # Анализ технологического стека
                 self._analyze_technology_stack(result, response.headers)
 
-                # Чтение и анализ контента
-                try:
-                    content = await response.read()
-                    if content and result['content_type']:
-                        self._analyze_content(result, content, result['content_type'])
-                except Exception as e:
-                    logger.warning(f"Content analysis failed for {url}: {str(e)}")
-                    result['content_analysis']['error'] = str(e)
-
                 # Информация о SSL (только для HTTPS)
                 if result['is_https']:
                     try:
@@ -129,28 +183,51 @@ class EndpointTester:
                         logger.warning(f"SSL info extraction failed for {url}: {str(e)}")
                         result['ssl_info'] = {'error': str(e)}
 
+                # Потоковое чтение тела с ограничением размера (у HEAD тела нет)
+                try:
+                    needs_body = request_method != 'HEAD' and (
+                        expected_body is not None or self._is_analyzed_type(result['content_type'])
+                    )
+                    content, result['body'] = await self._read_body(response, expected_body, needs_body)
+                    if content and result['content_type']:
+                        self._analyze_content(result, content, result['content_type'])
+                        if result['body']['truncated']:
+                            result['content_analysis']['truncated'] = True
+                    if expected_body is not None and result['success'] and not result['body']['matched']:
+                        result['success'] = False
+                        result['error'] = "Expected body not found"
+                        alert_error = f"В ответе нет ожидаемого содержимого: {expected_body[:100]}"
+                except Exception as e:
+                    logger.warning(f"Content analysis failed for {url}: {str(e)}")
+                    result['content_analysis']['error'] = str(e)
+
+        except asyncio.TimeoutError:
+            timed_out = result['status_code'] is None
+            result['error'] = f"Timeout after {request_timeout:.1f}s"
+            alert_error = f"Таймаут ({request_timeout:.1f} с)"
         except aiohttp.ClientError as e:
             result['error'] = str(e)
-            # Отправляем уведомление о критических ошибках соединения
-            try:
-                telegram_service.send_error_notification(
-                    url=url,
-                    status_code=0,  # 0 означает ошибку соединения
-                    error_message=f"Ошибка соединения: {str(e)}"
-                )
-            except Exception as telegram_error:
-                logger.error(f"Ошибка отправки Telegram уведомления: {telegram_error}")
+            alert_error = f"Ошибка соединения: {str(e)}"
         except Exception as e:
             result['error'] = f"Unexpected error: {str(e)}"
-            # Отправляем уведомление о неожиданных ошибках
-            try:
-                telegram_service.send_error_notification(
-                    url=url,
-                    status_code=0,  # 0 означает неожиданную ошибку
-                    error_message=f"Неожиданная ошибка: {str(e)}"
-                )
-            except Exception as telegram_error:
-                logger.error(f"Ошибка отправки Telegram уведомления: {telegram_error}")
+            alert_error = f"Неожиданная ошибка: {str(e)}"
+        finally:
+            # Задержка хоста - до заголовков ответа, без чтения и разбора тела
+            latency = result['response_time'] if result['response_time'] is not None else time.time() - start_time
+            control.release(
+                latency,
+                failed=result['status_code'] is None,
+                overloaded=result['status_code'] in (429, 503),
+                timed_out=timed_out,
+                trial=trial
+            )
+
+        # Уведомляем только о переходах состояния (DOWN, повтор, восстановление)
+        self._track_alert_state(alert_key, result.get('status_code') or 0, alert_error)
+
+        # Сертификат проверяется отдельным рукопожатием с проверкой цепочки (кэш по host:port)
+        if tls_target is not None and settings.TLS_INSPECTION_ENABLED:
+            result['tls_certificate'] = await tls_inspector.inspect(*tls_target)
 
         # Дополнительные проверки для успешных запросов
         if result['success']:
@@ -162,41 +239,111 @@ class EndpointTester:
 
         return result
 
+    @staticmethod
+    def _is_analyzed_type(content_type: Optional[str]) -> bool:
+        """Типы, для которых _analyze_content что-то извлекает; тело остальных не читаем"""
+        if not content_type:
+            return False
+        return 'text/' in content_type or 'json' in content_type or 'xml' in content_type
+
+    async def _read_body(self, response: aiohttp.ClientResponse, expected_body: Optional[str],
+                         needs_body: bool):
+        """
+        Потоковое чтение тела ответа не более MAX_BODY_SIZE байт
+
+        Хэш и поиск expected_body считаются по мере чтения. Соединение
+        закрывается, как только достигнут лимит или найдено ожидаемое содержимое.
+
+        Returns:
+            Tuple[bytes, Dict]: прочитанная часть тела и сведения о чтении
+        """
+        info = {'bytes_read': 0, 'truncated': False, 'sha256': None, 'matched': None}
+        if not needs_body:
+            response.close()
+            return b'', info
+
+        limit = self.max_body_size
+        needle = expected_body.encode('utf-8') if expected_body is not None else None
+        digest = hashlib.sha256()
+        chunks = []
+        tail = b''
+
+        async for chunk in response.content.iter_chunked(settings.BODY_CHUNK_SIZE):
+            remaining = limit - info['bytes_read']
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                info['truncated'] = True
+            digest.update(chunk)
+            chunks.append(chunk)
+            info['bytes_read'] += len(chunk)
+
+            if needle is not None:
+                # Хвост предыдущего фрагмента - чтобы найти совпадение на границе
+                window = tail + chunk
+                if needle in window:
+                    info['matched'] = True
+                    break
+                tail = window[-(len(needle) - 1):] if len(needle) > 1 else b''
+
+            if info['truncated']:
+                break
+
+        if needle is not None and info['matched'] is None:
+            info['matched'] = False
+
+        if response.content.at_eof() and not info['truncated']:
+            info['sha256'] = digest.hexdigest()
+        else:
+            # Оставшееся тело не нужно - разрываем соединение, не дочитывая его
+            response.close()
+        return b''.join(chunks), info
+
+    @staticmethod
+    def _probe_method(method: str, availability_only: bool, expected_body: Optional[str]) -> str:
+        """Для GET-проверок только доступности тело не нужно - используем HEAD"""
+        if method == 'GET' and availability_only and expected_body is None:
+            return 'HEAD'
+        return method
+
+    async def _send_request(self, method: str, url: str, headers: Optional[Dict[str, str]],
+                            body: Optional[str], timeout: aiohttp.ClientTimeout) -> aiohttp.ClientResponse:
+        """Запрос проверки; ответ закрывается вызывающим кодом"""
+        return await self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=body.encode('utf-8') if body is not None else None,
+            allow_redirects=True,
+            ssl=self.ssl_context,
+            timeout=timeout
+        )
+
+    def _track_alert_state(self, url: str, status_code: int, alert_error: Optional[str]):
+        """Передает результат проверки в автомат состояний и ставит алерт в очередь"""
+        transition = alert_tracker.observe(url, alert_error is not None, self.alert_policy)
+        if transition is None:
+            return
+
+        if transition.kind == ALERT_RECOVERED:
+            telegram_notifier.notify_recovery(url, time.time() - transition.down_since)
+        elif transition.kind == ALERT_DOWN:
+            telegram_notifier.notify_error(url=url, status_code=status_code, error_message=alert_error)
+        elif transition.kind == ALERT_STILL_DOWN:
+            telegram_notifier.notify_error(
+                url=url,
+                status_code=status_code,
+                error_message=f"Все еще недоступен ({transition.failures} проверок подряд): {alert_error}"
+            )
+
     def _analyze_security_headers(self, result: Dict, headers):
         """Анализ security headers"""
-        security_headers = {
-            'strict-transport-security': headers.get('Strict-Transport-Security'),
-            'x-content-type-options': headers.get('X-Content-Type-Options'),
-            'x-frame-options': headers.get('X-Frame-Options'),
-            'x-xss-protection': headers.get('X-XSS-Protection'),
-            'content-security-policy': headers.get('Content-Security-Policy'),
-            'referrer-policy': headers.get('Referrer-Policy'),
-            'permissions-policy': headers.get('Permissions-Policy'),
-            'access-control-allow-origin': headers.get('Access-Control-Allow-Origin'),
-            'access-control-allow-methods': headers.get('Access-Control-Allow-Methods'),
-        }
-        result['security_headers'] = security_headers
+        # Список общий со схемой Kafka (result_schema), заголовки ищутся без учета регистра
+        result['security_headers'] = {name: headers.get(name) for name in SECURITY_HEADERS}
 
     def _analyze_technology_stack(self, result: Dict, headers):
         """Анализ технологического стека по заголовкам"""
-        technologies = []
-
         # Определение технологий по заголовкам
-        server = headers.get('Server', '').lower()
-        if 'nginx' in server:
-            technologies.append('nginx')
-        elif 'apache' in server:
-            technologies.append('apache')
-        elif 'iis' in server:
-            technologies.append('iis')
-
-        powered_by = headers.get('X-Powered-By', '').lower()
-        if 'php' in powered_by:
-            technologies.append('php')
-        elif 'asp.net' in powered_by:
-            technologies.append('asp.net')
-        elif 'node' in powered_by:
-            technologies.append('node.js')
+        technologies = technology_matcher.match_headers(headers)
 
         # По заголовкам приложения
         if headers.get('X-Generator'):
@@ -233,23 +380,8 @@ class EndpointTester:
                     'forms': len(soup.find_all('form')),
                 }
 
-                # Поиск технологий в контенте
-                content_str = content.decode('utf-8', errors='ignore').lower()
-                tech_indicators = {
-                    'wordpress': ['wp-content', 'wp-includes', 'wordpress'],
-                    'drupal': ['drupal', 'sites/all'],
-                    'joomla': ['joomla', 'media/jui'],
-                    'react': ['react', 'react-dom'],
-                    'vue': ['vue.js', 'vue@'],
-                    'angular': ['angular', 'ng-'],
-                    'jquery': ['jquery', '$().'],
-                    'bootstrap': ['bootstrap', 'btn-primary'],
-                }
-
-                detected_tech = []
-                for tech, indicators in tech_indicators.items():
-                    if any(indicator in content_str for indicator in indicators):
-                        detected_tech.append(tech)
+                # Поиск технологий в контенте (один проход по всем сигнатурам)
+                detected_tech = technology_matcher.match_body(content)
 
                 result['technology_stack'].extend(detected_tech)
                 result['technology_stack'] = list(set(result['technology_stack']))
@@ -287,8 +419,22 @@ class EndpointTester:
         result['content_analysis'] = content_analysis
 
     async def _perform_additional_checks(self, result: Dict, url: str):
-        """Дополнительные проверки"""
+        """Дополнительные проверки (кэшируются по хосту)"""
         parsed_url = urlparse(url)
+        host = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        result['additional_checks'] = await host_checks_cache.get(
+            host, lambda: self._fetch_additional_checks(parsed_url), ttl_for=self._additional_checks_ttl
+        )
+
+    @staticmethod
+    def _additional_checks_ttl(checks: Dict) -> float:
+        """Ошибка сети не значит, что файла нет, - такой результат кэшируется ненадолго"""
+        if any('error' in check for check in checks.values()):
+            return settings.ADDITIONAL_CHECKS_ERROR_TTL
+        return host_checks_cache.ttl
+
+    async def _fetch_additional_checks(self, parsed_url) -> Dict:
+        """Запросы robots.txt, sitemap.xml и favicon.ico для хоста"""
         additional_checks = {}
 
         # Проверка robots.txt
@@ -301,8 +447,8 @@ class EndpointTester:
                         'status_code': response.status,
                         'content_type': response.headers.get('Content-Type')
                     }
-            except:
-                additional_checks['robots_txt'] = {'exists': False}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                additional_checks['robots_txt'] = {'exists': False, 'error': str(e) or type(e).__name__}
 
         # Проверка sitemap.xml
         sitemap_url = f"{parsed_url.scheme}://{parsed_url.netloc}/sitemap.xml"
@@ -313,8 +459,8 @@ class EndpointTester:
                     'status_code': response.status,
                     'content_type': response.headers.get('Content-Type')
                 }
-        except:
-            additional_checks['sitemap_xml'] = {'exists': False}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            additional_checks['sitemap_xml'] = {'exists': False, 'error': str(e) or type(e).__name__}
 
         # Проверка favicon.ico
         favicon_url = f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.ico"
@@ -325,23 +471,39 @@ class EndpointTester:
                     'content_type': response.headers.get('Content-Type'),
                     'size': response.headers.get('Content-Length')
                 }
-        except:
-            additional_checks['favicon'] = {'exists': False}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            additional_checks['favicon'] = {'exists': False, 'error': str(e) or type(e).__name__}
+
+        return additional_checks
 
-        result['additional_checks'] = additional_checks
+    async def test_multiple_endpoints(self, targets: List[Union[str, Dict]]) -> List[Dict]:
+        """
+        Тестирование множества эндпоинтов
 
-    async def test_multiple_endpoints(self, urls: List[str]) -> List[Dict]:
-        """Тестирование множества эндпоинтов"""
+        Args:
+            targets: URL или описания проверок с ключами аргументов test_endpoint
+                (url, method, headers, body, expected_status, expected_body, availability_only)
+        """
         if not self.session:
             await self.init_session()
 
-        tasks = []
-        for url in urls:
-            task = asyncio.create_task(self.test_endpoint(url))
-            tasks.append(task)
+        # С общей сессией лимит соединений общий на процесс - параллельность задания ограничиваем здесь
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def limited(target: Union[str, Dict]) -> Dict:
+            async with semaphore:
+                if isinstance(target, dict):
+                    return await self.test_endpoint(**target)
+                return await self.test_endpoint(target)
+
+        urls = [target['url'] if isinstance(target, dict) else target for target in targets]
+        tasks = [asyncio.create_task(limited(target)) for target in targets]
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
+        # Сохраняем изменившиеся состояния алертов (для восстановления после рестарта)
+        await alert_tracker.save()
+
         # Обработка исключений
         processed_results = []
         for i, result in enumerate(results):
@@ -388,15 +550,12 @@ async def monitor_endpoints(urls: List[str]):
         logger.info(f"Среднее время ответа: {avg_response_time:.3f}s")
 
         # Отправляем сводку в Telegram
-        try:
-            telegram_service.send_monitoring_summary(
-                total_urls=len(urls),
-                successful=successful,
-                failed=failed,
-                avg_response_time=avg_response_time if successful > 0 else None
-            )
-        except Exception as e:
-            logger.error(f"Ошибка отправки сводки в Telegram: {e}")
+        telegram_notifier.notify_monitoring_summary(
+            total_urls=len(urls),
+            successful=successful,
+            failed=failed,
+            avg_response_time=avg_response_time if successful > 0 else None
+        )
 
         # Сохранение результатов
         SimpleResultsStorage.save_results_to_file(results)
@@ -405,6 +564,7 @@ async def monitor_endpoints(urls: List[str]):
 
     finally:
         await tester.close_session()
+        await telegram_notifier.close()
 
 
 # Функция для красивого вывода результатов
@@ -0,0 +1,113 @@
+"""
+Кэш дополнительных проверок (robots.txt, sitemap.xml, favicon) по хосту
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+class HostChecksCache:
+    """TTL-кэш (LRU) с объединением одновременных запросов к одному хосту (single-flight)"""
+
+    def __init__(self, ttl: float, max_hosts: int, requests_per_fetch: int = 3):
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self.requests_per_fetch = requests_per_fetch
+        self._entries: Dict[str, Tuple[float, Dict]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, host: str, fetch: Callable[[], Awaitable[Dict]],
+                  ttl_for: Optional[Callable[[Dict], float]] = None) -> Dict:
+        """
+        Возвращает проверки хоста из кэша или выполняет fetch не более одного раза
+
+        Args:
+            host (str): Ключ хоста (scheme://netloc)
+            fetch: Корутина-фабрика, выполняющая реальные запросы
+            ttl_for: TTL для конкретного результата (по умолчанию - ttl кэша)
+
+        Returns:
+            Dict: Копия результата проверок
+        """
+        entry = self._entries.get(host)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            # Недавно использованный хост переносится в конец - вытесняются самые давние
+            self._entries[host] = self._entries.pop(host)
+            return copy.deepcopy(entry[1])
+
+        while True:
+            in_flight = self._in_flight.get(host)
+            if in_flight is None:
+                break
+            self.coalesced += 1
+            checks = await asyncio.shield(in_flight)
+            if checks is not None:
+                return copy.deepcopy(checks)
+            # Ведущий запрос отменен - отмена не наша, ведущим становится первый из ожидающих
+            self.coalesced -= 1
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[host] = future
+        try:
+            checks = await fetch()
+        except asyncio.CancelledError:
+            # Ожидающие получают None и повторяют запрос без ведущего
+            future.set_result(None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим, помечаем его как полученное
+            future.exception()
+            raise
+        else:
+            self._store(host, checks, ttl_for(checks) if ttl_for else self.ttl)
+            future.set_result(checks)
+        finally:
+            self._in_flight.pop(host, None)
+
+        return copy.deepcopy(checks)
+
+    def _store(self, host: str, checks: Dict, ttl: float):
+        """Сохранение результата с вытеснением устаревших и давно не использованных записей (LRU)"""
+        now = time.monotonic()
+        if len(self._entries) >= self.max_hosts:
+            for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[key]
+        while len(self._entries) >= self.max_hosts:
+            del self._entries[next(iter(self._entries))]
+        self._entries[host] = (now + ttl, checks)
+
+    def get_stats(self) -> Dict:
+        """Статистика кэша: доля попаданий и число сэкономленных запросов"""
+        served = self.hits + self.coalesced
+        lookups = served + self.misses
+        return {
+            'hosts_cached': len(self._entries),
+            'ttl_seconds': self.ttl,
+            'lookups': lookups,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'misses': self.misses,
+            'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+            'requests_saved': served * self.requests_per_fetch,
+        }
+
+
+# Глобальный экземпляр кэша, общий для всех тестеров процесса
+host_checks_cache = HostChecksCache(
+    ttl=settings.ADDITIONAL_CHECKS_TTL,
+    max_hosts=settings.ADDITIONAL_CHECKS_MAX_HOSTS
+)
@@ -0,0 +1,237 @@
+"""
+Адаптивное управление нагрузкой по хосту: AIMD-лимит параллельности,
+таймауты по перцентилям задержки и circuit breaker
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from config import settings
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class HostController:
+    """
+    Состояние одного хоста
+
+    - лимит параллельности растет на 1/limit за успешный запрос и делится пополам
+      при таймауте, ошибке соединения или ответе 429/503 (не чаще раза за p50);
+    - таймаут = p99 последних задержек × multiplier в пределах [min_timeout, max_timeout];
+      таймаут запроса тоже попадает в выборку, поэтому у замедлившегося хоста
+      таймаут растет (в multiplier раз), а не обрывает каждый запрос;
+    - после failure_threshold ошибок соединения подряд хост считается недоступным
+      на open_seconds, затем пропускается один пробный запрос (half-open);
+      состояние circuit breaker меняют только запросы, начатые при закрытом
+      circuit, и пробный запрос - итог запросов, начатых до открытия, не учитывается.
+    """
+
+    def __init__(self, host: str, initial_limit: float, max_limit: float, window: int,
+                 min_samples: int, timeout_multiplier: float, min_timeout: float,
+                 failure_threshold: int, open_seconds: float):
+        self.host = host
+        self.limit = initial_limit
+        self.max_limit = max_limit
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._last_decrease = 0.0
+
+        self.circuit = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    # --- circuit breaker ---
+
+    def allow_request(self) -> Tuple[bool, bool]:
+        """
+        Допуск запроса к хосту
+
+        Returns:
+            Tuple[bool, bool]: (разрешен, пробный); не разрешен - хост недоступен,
+            проверку нужно завершить сразу. Признак пробного запроса передается
+            в acquire и release.
+        """
+        if self.circuit == CLOSED:
+            return True, False
+        if self.circuit == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.circuit = HALF_OPEN
+        if self.circuit == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True, True
+        return False, False
+
+    def retry_in(self) -> float:
+        """Сколько секунд осталось до пробного запроса"""
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    # --- AIMD-лимит ---
+
+    async def acquire(self, trial: bool = False) -> bool:
+        """
+        Ожидание свободного слота в пределах текущего лимита хоста
+
+        Args:
+            trial: Пробный запрос half-open (если слот не получен, пробу можно повторить)
+
+        Returns:
+            bool: False, если пока запрос ждал слот, circuit breaker открылся
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот уже был передан этой задаче - возвращаем его
+                self._release_slot()
+            else:
+                self._waiters.remove(waiter)
+            if trial:
+                self._trial_in_flight = False
+            raise
+
+        if self.circuit == OPEN:
+            self._release_slot()
+            if trial:
+                self._trial_in_flight = False
+            return False
+        return True
+
+    def release(self, duration: float, failed: bool, overloaded: bool,
+                timed_out: bool = False, trial: bool = False):
+        """
+        Освобождение слота и учет результата запроса
+
+        Args:
+            duration: Время до получения заголовков ответа (или до ошибки) в секундах
+            failed: Ответ не получен (таймаут, ошибка соединения)
+            overloaded: Хост ответил 429/503
+            timed_out: Запрос прерван по таймауту
+            trial: Пробный запрос half-open
+        """
+        now = time.monotonic()
+        if trial:
+            self._trial_in_flight = False
+
+        if failed or overloaded:
+            # Multiplicative decrease не чаще одного раза за типичное время ответа
+            if now - self._last_decrease >= self._percentile(0.5, default=1.0):
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+            if timed_out:
+                # Задержка не меньше таймаута: следующий таймаут будет больше
+                self._latencies.append(duration)
+        else:
+            self._latencies.append(duration)
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        # Запросы, начатые до открытия circuit, его состояние не меняют
+        if self.circuit == CLOSED or trial:
+            if failed:
+                self.consecutive_failures += 1
+                if trial or self.consecutive_failures >= self.failure_threshold:
+                    logger.warning(f"Circuit breaker открыт для {self.host}: {self.consecutive_failures} ошибок подряд")
+                    self.circuit = OPEN
+                    self._opened_at = now
+            else:
+                if self.circuit != CLOSED:
+                    logger.info(f"Circuit breaker закрыт для {self.host}")
+                self.consecutive_failures = 0
+                self.circuit = CLOSED
+
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    # --- таймауты ---
+
+    def timeout(self, max_timeout: float) -> float:
+        """Таймаут запроса по p99 последних задержек (до набора статистики - max_timeout)"""
+        if len(self._latencies) < self.min_samples:
+            return max_timeout
+        return min(max_timeout, max(self.min_timeout, self._percentile(0.99) * self.timeout_multiplier))
+
+    def _percentile(self, q: float, default: Optional[float] = None) -> float:
+        if not self._latencies:
+            return default
+        ordered = sorted(self._latencies)
+        return ordered[int(q * (len(ordered) - 1))]
+
+
+class HostControlRegistry:
+    """Контроллеры хостов процесса; общие для всех тестеров и пакетов"""
+
+    def __init__(self, max_hosts: int, **controller_settings):
+        self.max_hosts = max_hosts
+        self.controller_settings = controller_settings
+        self._controllers: 'OrderedDict[str, HostController]' = OrderedDict()
+        self.fast_failed = 0
+
+    def get(self, host: str) -> HostController:
+        controller = self._controllers.get(host)
+        if controller is None:
+            controller = self._controllers[host] = HostController(host, **self.controller_settings)
+            # Вытесняем давно не использовавшиеся хосты без запросов в полете
+            if len(self._controllers) > self.max_hosts:
+                for key, old in list(self._controllers.items()):
+                    if old.in_flight == 0:
+                        del self._controllers[key]
+                        break
+        else:
+            self._controllers.move_to_end(host)
+        return controller
+
+    def get_stats(self) -> Dict:
+        circuits = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        for controller in self._controllers.values():
+            circuits[controller.circuit] += 1
+        hosts = len(self._controllers)
+        return {
+            'hosts_tracked': hosts,
+            'circuits': circuits,
+            'fast_failed': self.fast_failed,
+            'avg_concurrency_limit': round(
+                sum(c.limit for c in self._controllers.values()) / hosts, 2
+            ) if hosts else 0.0,
+            'open_hosts': [c.host for c in self._controllers.values() if c.circuit != CLOSED][:50],
+        }
+
+
+# Глобальный реестр: история задержек и состояние хостов сохраняются между пакетами
+host_controls = HostControlRegistry(
+    max_hosts=settings.HOST_CONTROL_MAX_HOSTS,
+    initial_limit=settings.HOST_CONCURRENCY_INITIAL,
+    max_limit=settings.HOST_CONCURRENCY_MAX,
+    window=settings.HOST_LATENCY_WINDOW,
+    min_samples=settings.HOST_LATENCY_MIN_SAMPLES,
+    timeout_multiplier=settings.HOST_TIMEOUT_MULTIPLIER,
+    min_timeout=settings.HOST_TIMEOUT_MIN,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=settings.CIRCUIT_OPEN_SECONDS
+)
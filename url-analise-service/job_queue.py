@@ -0,0 +1,132 @@
+"""
+Ограниченная очередь фоновых заданий на тестирование эндпоинтов
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Очередь заданий заполнена"""
+
+
+class JobQueue:
+    """
+    Очередь заданий с фиксированным пулом воркеров и ограниченной глубиной
+
+    Статусы заданий хранятся в памяти; завершенные вытесняются по max_history.
+    """
+
+    def __init__(self, handler: Callable[[str, Dict], Awaitable[Dict]],
+                 max_size: int, workers: int, max_history: int = 1000):
+        self.handler = handler
+        self.max_size = max_size
+        self.workers = workers
+        self.max_history = max_history
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+
+    async def start(self):
+        """Запуск воркеров (вызывается при старте сервиса)"""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Очередь заданий запущена: воркеров {self.workers}, глубина {self.max_size}")
+
+    async def stop(self):
+        """Остановка воркеров; незавершенные задания помечаются как failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if job['status'] in (QUEUED, RUNNING):
+                job['status'] = FAILED
+                job['error'] = 'Сервис остановлен'
+
+    def submit(self, job_id: str, payload: Dict) -> Dict:
+        """
+        Ставит задание в очередь без ожидания
+
+        Raises:
+            QueueFullError: если очередь заполнена (backpressure)
+        """
+        if self._queue is None:
+            raise RuntimeError("Очередь заданий не запущена")
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Очередь заданий заполнена ({self.max_size})")
+
+        job = {
+            'batch_id': job_id,
+            'status': QUEUED,
+            'total_urls': len(payload.get('targets', [])),
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        self._jobs[job_id] = job
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict:
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job['status']] += 1
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'max_size': self.max_size,
+            'workers': self.workers,
+            **counts
+        }
+
+    def _trim_history(self):
+        """Вытесняет самые старые завершенные задания"""
+        while len(self._jobs) > self.max_history:
+            for job_id, job in self._jobs.items():
+                if job['status'] in (DONE, FAILED):
+                    del self._jobs[job_id]
+                    break
+            else:
+                return
+
+    async def _worker(self, number: int):
+        while True:
+            job_id, payload = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is not None:
+                    job['status'] = RUNNING
+                    job['started_at'] = time.time()
+                result = await self.handler(job_id, payload)
+                if job is not None:
+                    job['status'] = DONE
+                    job['result'] = result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Задание {job_id} завершилось с ошибкой: {e}")
+                if job is not None:
+                    job['status'] = FAILED
+                    job['error'] = str(e)
+            finally:
+                if job is not None and job['status'] in (DONE, FAILED):
+                    job['finished_at'] = time.time()
+                self._queue.task_done()
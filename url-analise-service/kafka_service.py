@@ -0,0 +1,227 @@
+"""
+Отправка результатов проверок и назначений probe-воркерам в Kafka
+
+Модуль не зависит от FastAPI: его используют и API (main.py), и probe-воркеры.
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from kafka import KafkaProducer
+
+from config import settings
+from result_schema import encode_results
+from sharding import group_by_host
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+class KafkaSendError(Exception):
+    """Kafka недоступен или запись не поставлена в очередь producer"""
+
+
+class KafkaService:
+    """Kafka producer для отправки результатов тестирования и назначений probe-воркерам"""
+
+    def __init__(self):
+        self.producer = None
+        self.kafka_bootstrap_servers = settings.KAFKA_BOOTSTRAP_SERVERS
+        self.kafka_topic = settings.KAFKA_TOPIC
+        self.probe_topic = settings.KAFKA_PROBE_TOPIC
+        self.deep_topic = settings.KAFKA_DEEP_TOPIC
+        self.assignment_topic = settings.KAFKA_ASSIGNMENT_TOPIC
+        self.cert_topic = settings.KAFKA_CERT_TOPIC
+        # json - прежний топик, msgpack - компактные probe/deep топики, both - оба
+        self.result_format = settings.KAFKA_RESULT_FORMAT
+        # Счетчики подтверждений доставки: изменяются только в event loop
+        self.queued = 0
+        self.delivered = 0
+        self.failed = 0
+        # producer.send блокируется до max_block_ms при заполненном буфере, поэтому
+        # отправка идет в отдельном потоке; один поток сохраняет порядок записей
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kafka-sender')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+    def init_producer(self):
+        """Инициализация Kafka producer"""
+        try:
+            # Получаем конфигурацию Kafka
+            kafka_config = settings.get_kafka_config()
+            
+            # Создаем producer с аутентификацией
+            producer_config = {
+                'bootstrap_servers': kafka_config['bootstrap_servers'],
+                # Значения кодируются заранее (result_schema), producer получает готовые байты
+                'key_serializer': lambda k: k.encode('utf-8') if k else None,
+                'security_protocol': kafka_config['security_protocol'],
+                'sasl_mechanism': kafka_config['sasl_mechanism'],
+                'sasl_plain_username': kafka_config['sasl_plain_username'],
+                'sasl_plain_password': kafka_config['sasl_plain_password'],
+                # Настройки для предотвращения дублирования соединений (совместимые с kafka-python)
+                'retries': 3,
+                'retry_backoff_ms': 100,
+                'request_timeout_ms': 30000,
+                'max_block_ms': 10000,
+                'acks': 'all',  # Ждем подтверждения от всех реплик
+                # Пакетная отправка: записи копятся до linger_ms или batch_size и сжимаются вместе
+                'linger_ms': kafka_config['linger_ms'],
+                'batch_size': kafka_config['batch_size'],
+                'compression_type': kafka_config['compression_type']
+            }
+            
+            self.producer = KafkaProducer(**producer_config)
+            logger.info(f"Kafka producer инициализирован: {kafka_config['bootstrap_servers']}")
+            logger.info(f"Kafka топик: {kafka_config['topic']}")
+            logger.info(f"Kafka пользователь: {kafka_config['sasl_plain_username']}")
+        except Exception as e:
+            logger.error(f"Ошибка инициализации Kafka producer: {e}")
+            raise KafkaSendError(f"Kafka недоступен: {e}")
+    
+    async def _in_sender(self, func, *args):
+        """Выполнение func в потоке отправки, не блокируя event loop"""
+        self._loop = asyncio.get_running_loop()
+        return await self._loop.run_in_executor(self._sender, func, *args)
+    
+    async def send_results(self, results: List[Dict], request_id: str = None):
+        """
+        Асинхронная отправка результатов в Kafka: одна запись на результат с ключом URL
+        
+        Ключ URL гарантирует, что история одной цели попадает в одну партицию
+        и сохраняет порядок. Метод не ждет подтверждения: доставка учитывается
+        в колбэках producer.
+        """
+        await self._in_sender(self._send_results, results, request_id)
+    
+    def _send_results(self, results: List[Dict], request_id: str = None):
+        if not self.producer:
+            self.init_producer()
+        
+        try:
+            send_json = self.result_format in ('json', 'both')
+            send_binary = self.result_format in ('msgpack', 'both')
+            
+            # Каждый результат кодируется один раз и переиспользуется всеми топиками
+            for encoded in encode_results(results, request_id, include_deep=settings.KAFKA_SEND_DEEP):
+                if send_json:
+                    self._send(self.kafka_topic, encoded.key, encoded.json)
+                if send_binary:
+                    self._send(self.probe_topic, encoded.key, encoded.probe)
+                    if encoded.deep is not None:
+                        self._send(self.deep_topic, encoded.key, encoded.deep)
+            
+            logger.info(f"📤 Поставлено в очередь Kafka {len(results)} записей (топик: {self.kafka_topic}, request_id: {request_id})")
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка отправки в Kafka: {e}")
+            raise KafkaSendError(f"Ошибка отправки в Kafka: {e}")
+    
+    async def send_cert_expiry(self, results: List[Dict], request_id: str) -> int:
+        """
+        Отдельная метрика истекающих сертификатов: одна запись на host:port в пакете
+        
+        Ключ - host:port, поэтому последняя запись по хосту отражает текущий срок.
+        """
+        return await self._in_sender(self._send_cert_expiry, results, request_id)
+    
+    def _send_cert_expiry(self, results: List[Dict], request_id: str) -> int:
+        certificates = {}
+        for result in results:
+            certificate = result.get('tls_certificate') or {}
+            if certificate.get('expiring_soon'):
+                certificates[certificate['host']] = certificate
+        if not certificates:
+            return 0
+        
+        if not self.producer:
+            self.init_producer()
+        
+        for host, certificate in certificates.items():
+            metric = {
+                'host': host,
+                'days_left': certificate['days_left'],
+                'not_after': certificate['not_after'],
+                'issuer': certificate['issuer'],
+                'chain_valid': certificate['chain_valid'],
+                'hostname_match': certificate['hostname_match'],
+                'request_id': request_id,
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }
+            self._send(self.cert_topic, host, json.dumps(metric).encode('utf-8'))
+        
+        logger.warning(f"⚠️ Истекающих сертификатов: {len(certificates)} (топик: {self.cert_topic})")
+        return len(certificates)
+    
+    async def send_assignments(self, batch_id: str, payload: Dict) -> int:
+        """
+        Публикация назначений на проверку для probe-воркеров: одна запись на хост
+        
+        Ключ - хост, поэтому все URL хоста попадают в одну партицию и
+        проверяются одним воркером группы.
+        """
+        return await self._in_sender(self._send_assignments, batch_id, payload)
+    
+    def _send_assignments(self, batch_id: str, payload: Dict) -> int:
+        if not self.producer:
+            self.init_producer()
+        
+        groups = group_by_host(payload['targets'])
+        for host, targets in groups.items():
+            assignment = {**payload, 'targets': targets, 'batch_id': batch_id}
+            self._send(self.assignment_topic, host, json.dumps(assignment).encode('utf-8'))
+        
+        logger.info(f"📤 Задание {batch_id} разбито на {len(groups)} назначений по хостам (топик: {self.assignment_topic})")
+        return len(groups)
+    
+    def _send(self, topic: str, key: str, value: bytes):
+        """Постановка записи в очередь producer с колбэками доставки (в потоке отправки)"""
+        # Учитываем запись до send, чтобы подтверждение не обогнало счетчик queued
+        self._count('queued')
+        self.producer.send(
+            topic,
+            key=key,
+            value=value
+        ).add_callback(self._on_send_success).add_errback(self._on_send_error, key)
+    
+    def _count(self, counter: str):
+        """Увеличение счетчика из любого потока: само изменение выполняет event loop"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._increment, counter)
+    
+    def _increment(self, counter: str):
+        setattr(self, counter, getattr(self, counter) + 1)
+    
+    def _on_send_success(self, record_metadata):
+        """Колбэк подтверждения доставки записи (поток ввода-вывода producer)"""
+        self._count('delivered')
+        logger.debug(f"📨 Запись доставлена в партицию {record_metadata.partition}, offset {record_metadata.offset}")
+    
+    def _on_send_error(self, url, exc):
+        """Колбэк ошибки доставки записи (поток ввода-вывода producer)"""
+        self._count('failed')
+        logger.error(f"❌ Не удалось доставить результат {url} в Kafka: {exc}")
+    
+    def get_stats(self) -> Dict:
+        """Статистика доставки записей"""
+        return {
+            'topic': self.kafka_topic,
+            'result_format': self.result_format,
+            'queued': self.queued,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'pending': self.queued - self.delivered - self.failed
+        }
+    
+    async def close(self):
+        """Закрытие Kafka producer (дожидается отправки накопленных записей)"""
+        if self.producer:
+            await self._in_sender(self.producer.close)
+        self._sender.shutdown(wait=False)
+
+
+# Глобальный экземпляр Kafka сервиса
+kafka_service = KafkaService()
@@ -1,18 +1,28 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Dict, Optional
 import asyncio
 import json
 import logging
 import time
-from kafka import KafkaProducer
 import os
+import uuid
 
 # Импортируем наши классы из предоставленного кода
 from url_parser import URLService, SimpleURLScanner
 from endpoint_tester import EndpointTester, monitor_endpoints
 from config import settings
-from telegram_service import telegram_service
+from telegram_service import telegram_notifier
+from host_checks_cache import host_checks_cache
+from host_control import host_controls
+from tls_inspector import tls_inspector
+from alert_state import alert_tracker, default_alert_policy
+from job_queue import JobQueue, QueueFullError
+from kafka_service import KafkaSendError, kafka_service
+from probe_runner import probe_session, run_test_batch
+from batch_status import batch_tracker
+from sharding import host_key
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +38,7 @@ app = FastAPI(
 class URLRequest(BaseModel):
     url: HttpUrl
     max_pages: Optional[int] = settings.DEFAULT_MAX_PAGES
+    use_sitemap: Optional[bool] = settings.DEFAULT_USE_SITEMAP
 
 class URLResponse(BaseModel):
     internal_urls: List[str]
@@ -35,117 +46,56 @@ class URLResponse(BaseModel):
     visited_pages: int
     total_internal_urls: int
     total_media_urls: int
+    sitemap_urls: int = 0
+
+class AlertPolicyRequest(BaseModel):
+    delay: int = default_alert_policy.delay
+    repeat_interval: int = default_alert_policy.repeat_interval
+    failure_threshold: int = default_alert_policy.failure_threshold
+    recovery_threshold: int = default_alert_policy.recovery_threshold
+
+class CheckTarget(BaseModel):
+    url: HttpUrl
+    method: str = 'GET'
+    headers: Optional[Dict[str, str]] = None
+    body: Optional[str] = None
+    expected_status: Optional[int] = None
+    expected_body: Optional[str] = None
+    # Только доступность: GET-проверка выполняется запросом HEAD без тела
+    availability_only: bool = False
 
 class EndpointTestRequest(BaseModel):
-    urls: List[HttpUrl]
+    urls: List[HttpUrl] = []
+    targets: List[CheckTarget] = []
     max_concurrent: Optional[int] = settings.DEFAULT_MAX_CONCURRENT
     timeout: Optional[int] = settings.DEFAULT_TIMEOUT
+    alert_policy: Optional[AlertPolicyRequest] = None
 
 class EndpointTestResponse(BaseModel):
     message: str
     total_urls: int
     kafka_topic: str
     batch_id: str
+    status: str = 'queued'
+    status_url: Optional[str] = None
 
-# Kafka Producer для отправки результатов тестирования
-class KafkaService:
-    def __init__(self):
-        self.producer = None
-        self.kafka_bootstrap_servers = settings.KAFKA_BOOTSTRAP_SERVERS
-        self.kafka_topic = settings.KAFKA_TOPIC
-        
-    def init_producer(self):
-        """Инициализация Kafka producer"""
-        try:
-            # Получаем конфигурацию Kafka
-            kafka_config = settings.get_kafka_config()
-            
-            # Создаем producer с аутентификацией
-            producer_config = {
-                'bootstrap_servers': kafka_config['bootstrap_servers'],
-                'value_serializer': lambda v: json.dumps(v, ensure_ascii=False).encode('utf-8'),
-                'key_serializer': lambda k: k.encode('utf-8') if k else None,
-                'security_protocol': kafka_config['security_protocol'],
-                'sasl_mechanism': kafka_config['sasl_mechanism'],
-                'sasl_plain_username': kafka_config['sasl_plain_username'],
-                'sasl_plain_password': kafka_config['sasl_plain_password'],
-                # Настройки для предотвращения дублирования соединений (совместимые с kafka-python)
-                'retries': 3,
-                'retry_backoff_ms': 100,
-                'request_timeout_ms': 30000,
-                'max_block_ms': 10000,
-                'acks': 'all',  # Ждем подтверждения от всех реплик
-                'compression_type': 'gzip'  # Сжатие для экономии трафика
-            }
-            
-            self.producer = KafkaProducer(**producer_config)
-            logger.info(f"Kafka producer инициализирован: {kafka_config['bootstrap_servers']}")
-            logger.info(f"Kafka топик: {kafka_config['topic']}")
-            logger.info(f"Kafka пользователь: {kafka_config['sasl_plain_username']}")
-        except Exception as e:
-            logger.error(f"Ошибка инициализации Kafka producer: {e}")
-            raise HTTPException(status_code=500, detail=f"Kafka недоступен: {e}")
-    
-    def send_results(self, results: List[Dict], request_id: str = None):
-        """Отправка результатов в Kafka как один топик со списком JSON"""
-        if not self.producer:
-            self.init_producer()
-        
-        try:
-            logger.info(f"🚀 НАЧИНАЕМ ОТПРАВКУ {len(results)} РЕЗУЛЬТАТОВ В KAFKA КАК ОДИН ТОПИК")
-            logger.info(f"📋 Request ID: {request_id}")
-            logger.info(f"📋 Kafka Topic: {self.kafka_topic}")
-            
-            # Обогащаем каждый результат метаданными
-            enriched_results = []
-            for i, result in enumerate(results):
-                logger.info(f"📝 Обрабатываем результат {i+1}/{len(results)}: {result.get('url', 'unknown')}")
-                enriched_result = {
-                    **result,
-                    'request_id': request_id or f"req_{i}",
-                    'batch_timestamp': result.get('timestamp'),
-                    'service_version': '1.0.0'
-                }
-                enriched_results.append(enriched_result)
-            
-            logger.info(f"📊 Количество результатов для отправки: {len(enriched_results)}")
-            logger.info(f"📊 Структура данных: {type(enriched_results)} - список из {len(enriched_results)} элементов")
-            
-            # ВАЖНО: Отправляем ТОЛЬКО ОДИН топик со списком результатов (простой массив JSON)
-            # НЕ отправляем отдельные топики для каждого URL!
-            logger.info(f"📤 ОТПРАВЛЯЕМ ТОЛЬКО ОДИН ТОПИК В KAFKA...")
-            logger.info(f"📤 НЕ отправляем отдельные топики для каждого URL!")
-            
-            # Создаем уникальный ключ для предотвращения дублирования
-            unique_key = f"{request_id}_{int(time.time() * 1000)}"
-            logger.info(f"🔑 Уникальный ключ для топика: {unique_key}")
-            
-            # ЕДИНСТВЕННЫЙ вызов producer.send() - отправляет весь список как один топик
-            future = self.producer.send(
-                self.kafka_topic,
-                key=unique_key,
-                value=enriched_results  # Это список из N элементов, отправляется как ОДИН топик
-            )
-            
-            # Ждем подтверждения отправки
-            record_metadata = future.get(timeout=10)
-            logger.info(f"📨 Сообщение отправлено в партицию {record_metadata.partition}, offset {record_metadata.offset}")
-            
-            self.producer.flush()
-            logger.info(f"✅ УСПЕШНО ОТПРАВЛЕН ОДИН ТОПИК с {len(results)} результатами в Kafka: {self.kafka_topic}")
-            logger.info(f"✅ Данные отправлены как массив JSON с {len(enriched_results)} элементами")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка отправки в Kafka: {e}")
-            raise HTTPException(status_code=500, detail=f"Ошибка отправки в Kafka: {e}")
-    
-    def close(self):
-        """Закрытие Kafka producer"""
-        if self.producer:
-            self.producer.close()
+class JobStatusResponse(BaseModel):
+    batch_id: str
+    status: str
+    total_urls: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
 
-# Глобальный экземпляр Kafka сервиса
-kafka_service = KafkaService()
+# Очередь фоновых заданий: HTTP-запрос только ставит задание и сразу отвечает
+job_queue = JobQueue(
+    handler=run_test_batch,
+    max_size=settings.JOB_QUEUE_SIZE,
+    workers=settings.JOB_WORKERS,
+    max_history=settings.JOB_HISTORY_SIZE
+)
 
 @app.get("/")
 async def root():
@@ -155,7 +105,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "parse_url": "/api/v1/parse-url",
-            "test_endpoints": "/api/v1/test-endpoints"
+            "test_endpoints": "/api/v1/test-endpoints",
+            "additional_checks_cache": "/api/v1/stats/additional-checks-cache",
+            "hosts": "/api/v1/stats/hosts",
+            "tls": "/api/v1/stats/tls",
+            "test_endpoints_status": "/api/v1/test-endpoints/{batch_id}",
+            "jobs": "/api/v1/stats/jobs",
+            "alerts": "/api/v1/stats/alerts",
+            "kafka": "/api/v1/stats/kafka"
         }
     }
 
@@ -164,6 +121,21 @@ async def health_check():
     """Проверка здоровья сервиса"""
     return {"status": "healthy", "service": "url-analysis-service"}
 
+@app.get("/api/v1/stats/additional-checks-cache")
+async def additional_checks_cache_stats():
+    """Статистика кэша robots.txt / sitemap.xml / favicon по хостам"""
+    return host_checks_cache.get_stats()
+
+@app.get("/api/v1/stats/tls")
+async def tls_stats():
+    """Истекающие в ближайшие TLS_EXPIRY_WARNING_DAYS дней и невалидные сертификаты"""
+    return tls_inspector.get_stats()
+
+@app.get("/api/v1/stats/hosts")
+async def host_control_stats():
+    """Адаптивные лимиты по хостам: состояние circuit breaker и средний лимит параллельности"""
+    return host_controls.get_stats()
+
 @app.post("/api/v1/parse-url", response_model=URLResponse)
 async def parse_website_urls(request: URLRequest):
     """
@@ -175,7 +147,7 @@ async def parse_website_urls(request: URLRequest):
         logger.info(f"Начинаем парсинг URL: {request.url}")
         
         # Используем URLService для парсинга
-        results = URLService.extract_urls(str(request.url), request.max_pages)
+        results = await URLService.extract_urls(str(request.url), request.max_pages, request.use_sitemap)
         
         logger.info(f"Парсинг завершен. Найдено {len(results['internal_urls'])} внутренних URL и {len(results['media_urls'])} медиа-файлов")
         
@@ -184,83 +156,137 @@ async def parse_website_urls(request: URLRequest):
             media_urls=results['media_urls'],
             visited_pages=results['visited_pages'],
             total_internal_urls=len(results['internal_urls']),
-            total_media_urls=len(results['media_urls'])
+            total_media_urls=len(results['media_urls']),
+            sitemap_urls=results.get('sitemap_urls', 0)
         )
         
     except Exception as e:
         logger.error(f"Ошибка при парсинге URL {request.url}: {str(e)}")
-        # Отправляем уведомление об ошибке сервиса
-        try:
-            telegram_service.send_service_error_notification(
-                service_name="URL Parser",
-                error_message=f"Ошибка парсинга URL {request.url}: {str(e)}"
-            )
-        except Exception as telegram_error:
-            logger.error(f"Ошибка отправки Telegram уведомления: {telegram_error}")
+        # Уведомление об ошибке сервиса (через очередь, не блокирует обработчик)
+        telegram_notifier.notify_service_error(
+            service_name="URL Parser",
+            error_message=f"Ошибка парсинга URL {request.url}: {str(e)}"
+        )
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
 
-@app.post("/api/v1/test-endpoints", response_model=EndpointTestResponse)
+@app.post("/api/v1/test-endpoints", response_model=EndpointTestResponse, status_code=202)
 async def test_endpoints(request: EndpointTestRequest):
     """
-    Тестирование списка эндпоинтов и отправка результатов в Kafka
+    Постановка тестирования списка эндпоинтов в очередь
     
-    Принимает список URL для тестирования и отправляет результаты в Kafka
+    Сразу возвращает batch_id (202 Accepted); результаты отправляются в Kafka
+    фоновым воркером, статус задания доступен по status_url.
+    При заполненной очереди возвращает 429 с заголовком Retry-After.
     """
-    try:
-        logger.info(f"Начинаем тестирование {len(request.urls)} эндпоинтов")
-        
-        # Конвертируем HttpUrl в строки
-        url_strings = [str(url) for url in request.urls]
-        
-        # Создаем тестер с настройками из запроса
-        tester = EndpointTester(
-            max_concurrent=request.max_concurrent,
-            timeout=request.timeout
-        )
-        
-        # Тестируем эндпоинты
-        logger.info(f"🔍 Начинаем тестирование {len(url_strings)} эндпоинтов...")
+    # Простые URL проверяются GET; targets задают метод, тело и ожидаемый ответ
+    targets = [{'url': str(url)} for url in request.urls]
+    targets += [{**target.model_dump(exclude_none=True), 'url': str(target.url)} for target in request.targets]
+    if not targets:
+        raise HTTPException(status_code=422, detail="Нужно передать urls или targets")
+
+    url_strings = [target['url'] for target in targets]
+    batch_id = f"test_{len(url_strings)}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    payload = {
+        'targets': targets,
+        'max_concurrent': request.max_concurrent,
+        'timeout': request.timeout,
+        'alert_policy': request.alert_policy.model_dump() if request.alert_policy else None
+    }
+
+    if settings.PROBE_MODE == 'sharded':
+        # Проверки выполняют probe-воркеры; прогресс по хостам они записывают в Redis
+        status_url = None
+        if batch_tracker.enabled:
+            try:
+                await batch_tracker.register(batch_id, len(url_strings), len({host_key(url) for url in url_strings}))
+                status_url = f"/api/v1/test-endpoints/{batch_id}"
+            except Exception as e:
+                logger.error(f"Не удалось зарегистрировать задание {batch_id} в Redis: {e}")
         try:
-            results = await tester.test_multiple_endpoints(url_strings)
-            logger.info(f"✅ Тестирование завершено. Получено {len(results)} результатов")
-            
-            # Отправляем результаты в Kafka
-            request_id = f"test_{len(url_strings)}_{int(time.time())}"
-            logger.info(f"📤 Отправляем результаты в Kafka с request_id: {request_id}")
-            kafka_service.send_results(results, request_id)
-        finally:
-            # Обязательно закрываем сессию
-            await tester.close_session()
-        
-        # Статистика
-        successful = sum(1 for r in results if r.get('success', False))
-        avg_response_time = sum(r.get('response_time', 0) for r in results if r.get('success', False)) / max(successful, 1)
-        
-        logger.info(f"Тестирование завершено. Успешных: {successful}/{len(url_strings)}, среднее время: {avg_response_time:.3f}s")
-        
+            hosts = await kafka_service.send_assignments(batch_id, payload)
+        except KafkaSendError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         return EndpointTestResponse(
-            message=f"Протестировано {len(url_strings)} эндпоинтов. Успешных: {successful}",
+            message=f"Тестирование {len(url_strings)} эндпоинтов ({hosts} хостов) передано probe-воркерам",
             total_urls=len(url_strings),
             kafka_topic=kafka_service.kafka_topic,
-            batch_id=request_id
+            batch_id=batch_id,
+            status='dispatched',
+            status_url=status_url
         )
-        
-    except Exception as e:
-        logger.error(f"Ошибка при тестировании эндпоинтов: {str(e)}")
-        # Отправляем уведомление об ошибке сервиса
+
+    try:
+        job_queue.submit(batch_id, payload)
+    except QueueFullError as e:
+        logger.warning(f"Задание на {len(url_strings)} эндпоинтов отклонено: {str(e)}")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(settings.JOB_RETRY_AFTER)}
+        )
+
+    logger.info(f"📥 Задание {batch_id} на {len(url_strings)} эндпоинтов поставлено в очередь")
+
+    return EndpointTestResponse(
+        message=f"Тестирование {len(url_strings)} эндпоинтов поставлено в очередь",
+        total_urls=len(url_strings),
+        kafka_topic=kafka_service.kafka_topic,
+        batch_id=batch_id,
+        status_url=f"/api/v1/test-endpoints/{batch_id}"
+    )
+
+@app.get("/api/v1/test-endpoints/{batch_id}", response_model=JobStatusResponse)
+async def test_endpoints_status(batch_id: str):
+    """
+    Статус задания на тестирование: queued, running, done или failed
+
+    В режиме sharded статус (dispatched, running, done, failed) собирается
+    из итогов probe-воркеров по хостам в Redis.
+    """
+    if settings.PROBE_MODE == 'sharded':
         try:
-            telegram_service.send_service_error_notification(
-                service_name="Endpoint Tester",
-                error_message=f"Ошибка тестирования эндпоинтов: {str(e)}"
-            )
-        except Exception as telegram_error:
-            logger.error(f"Ошибка отправки Telegram уведомления: {telegram_error}")
-        raise HTTPException(status_code=500, detail=f"Ошибка тестирования: {str(e)}")
+            job = await batch_tracker.get(batch_id)
+        except Exception as e:
+            logger.error(f"Не удалось получить статус задания {batch_id} из Redis: {e}")
+            raise HTTPException(status_code=503, detail="Статус заданий временно недоступен")
+    else:
+        job = job_queue.get(batch_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Задание {batch_id} не найдено")
+    return JobStatusResponse(**job)
+
+@app.get("/api/v1/stats/jobs")
+async def job_stats():
+    """Глубина очереди и количество заданий по статусам"""
+    return job_queue.get_stats()
+
+@app.get("/api/v1/stats/kafka")
+async def kafka_stats():
+    """Статистика подтверждений доставки в Kafka"""
+    return kafka_service.get_stats()
+
+@app.get("/api/v1/stats/alerts")
+async def alert_stats():
+    """Количество целей в состояниях SUSPECT / DOWN / RECOVERING"""
+    return alert_tracker.get_stats()
+
+@app.on_event("startup")
+async def startup_event():
+    """Восстановление состояния алертов и запуск воркеров очереди заданий"""
+    await alert_tracker.restore()
+    if settings.PROBE_MODE != 'sharded':
+        await job_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Очистка ресурсов при завершении работы"""
-    kafka_service.close()
+    await job_queue.stop()
+    await probe_session.close()
+    await kafka_service.close()
+    await batch_tracker.close()
+    await telegram_notifier.close()
+    await alert_tracker.save()
+    await alert_tracker.close()
     logger.info("Сервис завершает работу")
 
 if __name__ == "__main__":
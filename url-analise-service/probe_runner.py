@@ -0,0 +1,87 @@
+"""
+Выполнение заданий на тестирование эндпоинтов с отправкой результатов в Kafka
+
+Модуль не зависит от FastAPI: его используют очередь заданий API (main.py)
+и probe-воркеры (probe_worker.py). Все задания процесса работают через одну
+HTTP-сессию: соединения с хостом переиспользуются от задания к заданию.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import aiohttp
+
+from alert_state import AlertPolicy
+from config import settings
+from endpoint_tester import EndpointTester, create_probe_session
+from host_checks_cache import host_checks_cache
+from kafka_service import kafka_service
+from telegram_service import telegram_notifier
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+class ProbeSession:
+    """Долгоживущая сессия проверок процесса; создается при первом задании"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_probe_session(settings.PROBE_CONNECTION_LIMIT, settings.DEFAULT_TIMEOUT)
+        return self._session
+
+    async def close(self):
+        """Закрытие сессии при остановке сервиса"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+probe_session = ProbeSession()
+
+
+async def run_test_batch(batch_id: str, payload: Dict) -> Dict:
+    """Выполнение одного задания на тестирование в фоновом воркере"""
+    # Назначения старого формата содержат только список URL
+    targets = payload.get('targets') or payload.get('urls', [])
+    alert_policy = payload.get('alert_policy')
+
+    tester = EndpointTester(
+        max_concurrent=payload['max_concurrent'],
+        timeout=payload['timeout'],
+        alert_policy=AlertPolicy(**alert_policy) if alert_policy else None,
+        session=probe_session.get()
+    )
+
+    logger.info(f"🔍 [{batch_id}] Начинаем тестирование {len(targets)} эндпоинтов...")
+    try:
+        results = await tester.test_multiple_endpoints(targets)
+        logger.info(f"✅ [{batch_id}] Тестирование завершено. Получено {len(results)} результатов")
+
+        # Отправляем результаты в Kafka
+        await kafka_service.send_results(results, batch_id)
+        await kafka_service.send_cert_expiry(results, batch_id)
+    except Exception as e:
+        # Уведомление об ошибке сервиса (через очередь, не блокирует воркер)
+        telegram_notifier.notify_service_error(
+            service_name="Endpoint Tester",
+            error_message=f"Ошибка тестирования эндпоинтов ({batch_id}): {str(e)}"
+        )
+        raise
+
+    # Статистика
+    successful = sum(1 for r in results if r.get('success', False))
+    avg_response_time = sum(r.get('response_time', 0) for r in results if r.get('success', False)) / max(successful, 1)
+
+    logger.info(f"[{batch_id}] Успешных: {successful}/{len(targets)}, среднее время: {avg_response_time:.3f}s")
+    cache_stats = host_checks_cache.get_stats()
+    logger.info(f"Кэш доп. проверок: hit rate {cache_stats['hit_rate']:.1%}, сэкономлено запросов: {cache_stats['requests_saved']}")
+
+    return {
+        'successful': successful,
+        'failed': len(results) - successful,
+        'avg_response_time': round(avg_response_time, 3)
+    }
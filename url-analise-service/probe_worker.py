@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Probe-воркер: потребляет назначения на проверку из партиционированного топика Kafka
+
+Все воркеры входят в одну consumer group, поэтому каждая партиция (и каждый
+хост, см. sharding.py) обрабатывается ровно одним воркером. Для масштабирования
+достаточно запустить еще процессы; Kafka перераспределит партиции сама.
+
+Запуск: python probe_worker.py
+"""
+
+import asyncio
+import json
+import logging
+
+from kafka import ConsumerRebalanceListener, KafkaConsumer
+from kafka.coordinator.assignors.sticky.sticky_assignor import StickyPartitionAssignor
+
+from config import settings
+from batch_status import batch_tracker
+from kafka_service import kafka_service
+from probe_runner import probe_session, run_test_batch
+from alert_state import alert_tracker
+from telegram_service import telegram_notifier
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AlertStateReload(ConsumerRebalanceListener):
+    """
+    Отмечает перераспределение партиций
+
+    Новый владелец хоста должен загрузить его состояние алертов, иначе алерт
+    о недоступности повторится, а восстановление потеряется. Колбэки вызываются
+    внутри poll (в потоке), поэтому здесь только флаг - состояние перечитывается
+    в event loop до обработки назначений этого poll.
+    """
+
+    def __init__(self):
+        self.pending = False
+
+    def on_partitions_revoked(self, revoked):
+        pass
+
+    def on_partitions_assigned(self, assigned):
+        self.pending = True
+
+
+def create_consumer(listener: ConsumerRebalanceListener) -> KafkaConsumer:
+    """Consumer группы probe-воркеров с ручным коммитом после обработки"""
+    kafka_config = settings.get_kafka_config()
+    consumer = KafkaConsumer(
+        bootstrap_servers=kafka_config['bootstrap_servers'],
+        security_protocol=kafka_config['security_protocol'],
+        sasl_mechanism=kafka_config['sasl_mechanism'],
+        sasl_plain_username=kafka_config['sasl_plain_username'],
+        sasl_plain_password=kafka_config['sasl_plain_password'],
+        group_id=settings.PROBE_WORKER_GROUP,
+        # При перебалансировке переезжают только партиции ушедшего/нового воркера
+        partition_assignment_strategy=[StickyPartitionAssignor],
+        key_deserializer=lambda k: k.decode('utf-8') if k else None,
+        value_deserializer=lambda v: json.loads(v.decode('utf-8')),
+        # Коммит только после проверки: при падении воркера назначение получит другой
+        enable_auto_commit=False,
+        auto_offset_reset='latest',
+        max_poll_records=settings.PROBE_WORKER_MAX_RECORDS,
+        max_poll_interval_ms=settings.PROBE_WORKER_MAX_POLL_INTERVAL_MS
+    )
+    consumer.subscribe([settings.KAFKA_ASSIGNMENT_TOPIC], listener=listener)
+    return consumer
+
+
+async def process_assignment(record) -> None:
+    """Проверка URL одного хоста; ошибки не останавливают воркер"""
+    assignment = record.value
+    batch_id = assignment.pop('batch_id')
+    await batch_tracker.started(batch_id)
+    try:
+        result = await run_test_batch(batch_id, assignment)
+    except Exception as e:
+        logger.error(f"Назначение {batch_id} для хоста {record.key} не выполнено: {e}")
+        await batch_tracker.record(batch_id, record.key, error=str(e))
+    else:
+        await batch_tracker.record(batch_id, record.key, result)
+
+
+async def run_worker():
+    rebalance = AlertStateReload()
+    consumer = create_consumer(rebalance)
+    logger.info(f"🚀 Probe-воркер запущен (группа: {settings.PROBE_WORKER_GROUP}, топик: {settings.KAFKA_ASSIGNMENT_TOPIC})")
+
+    try:
+        while True:
+            # poll блокирующий - выполняем в потоке, чтобы не останавливать event loop
+            batches = await asyncio.to_thread(consumer.poll, 1000)
+            if rebalance.pending:
+                # Состояние алертов читается при каждом назначении партиций, включая первое
+                rebalance.pending = False
+                await alert_tracker.save()
+                await alert_tracker.restore()
+            records = [record for partition_records in batches.values() for record in partition_records]
+            if not records:
+                continue
+
+            # Назначения разных хостов проверяются параллельно
+            await asyncio.gather(*(process_assignment(record) for record in records))
+            await asyncio.to_thread(consumer.commit)
+            logger.info(f"✅ Обработано назначений: {len(records)}, партиции: {sorted(tp.partition for tp in batches)}")
+    finally:
+        consumer.close()
+        await probe_session.close()
+        await kafka_service.close()
+        await batch_tracker.close()
+        await telegram_notifier.close()
+        await alert_tracker.save()
+        await alert_tracker.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        logger.info("👋 Probe-воркер остановлен")
@@ -0,0 +1,183 @@
+"""
+Компактная версионированная схема результатов проверок (MessagePack + schema id)
+
+Формат записи: 1 байт magic (0x00) + 4 байта schema id (big-endian) + тело MessagePack.
+Тело - позиционный массив без имен полей; порядок полей задается схемой.
+
+- probe (PROBE_SCHEMA_ID): минимальная запись о доступности
+- deep (DEEP_SCHEMA_ID): заголовки, анализ контента, TLS-сертификат и прочие тяжелые поля
+"""
+
+import json
+import struct
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import msgpack
+
+MAGIC_BYTE = 0
+PROBE_SCHEMA_ID = 1
+DEEP_SCHEMA_ID = 2
+
+_HEADER = struct.Struct('>bI')
+
+# Порядок полей в позиционных записях; новые поля добавляются только в конец
+PROBE_FIELDS: Tuple[str, ...] = (
+    'url', 'timestamp', 'success', 'status_code', 'response_time',
+    'error', 'content_type', 'content_length', 'is_https', 'request_id',
+    'method', 'service_version',
+)
+DEEP_FIELDS: Tuple[str, ...] = (
+    'url', 'timestamp', 'headers', 'security_headers', 'technology_stack',
+    'content_analysis', 'additional_checks', 'redirect_chain', 'ssl_info',
+    'body', 'tls_certificate',
+)
+
+# Проверяемые security headers; в deep передаются только присутствующие
+SECURITY_HEADERS: Tuple[str, ...] = (
+    'strict-transport-security', 'x-content-type-options', 'x-frame-options',
+    'x-xss-protection', 'content-security-policy', 'referrer-policy',
+    'permissions-policy', 'access-control-allow-origin', 'access-control-allow-methods',
+)
+
+SERVICE_VERSION = '1.0.0'
+
+
+def _timestamp_to_ms(value: Optional[str]) -> Optional[int]:
+    """ISO-время в миллисекунды эпохи (int компактнее строки)"""
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def _timestamp_from_ms(value: Optional[int]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat()
+
+
+def _pack(schema_id: int, values: List) -> bytes:
+    return _HEADER.pack(MAGIC_BYTE, schema_id) + msgpack.packb(values, use_bin_type=True)
+
+
+class EncodedResult:
+    """
+    Результат, закодированный один раз и переиспользуемый всеми приемниками
+
+    Каждое представление (probe, deep, JSON) строится лениво при первом
+    обращении и кэшируется, поэтому кодируются только форматы включенных топиков.
+    """
+    __slots__ = ('key', '_result', '_include_deep', '_probe', '_deep', '_json')
+
+    def __init__(self, result: Dict, include_deep: bool = True):
+        self.key = result.get('url')
+        self._result = result
+        self._include_deep = include_deep
+        self._probe = None
+        self._deep = None
+        self._json = None
+
+    @property
+    def probe(self) -> bytes:
+        """Запись о доступности (PROBE_SCHEMA_ID)"""
+        if self._probe is None:
+            result = self._result
+            probe = [result.get(field) for field in PROBE_FIELDS]
+            probe[PROBE_FIELDS.index('timestamp')] = _timestamp_to_ms(result.get('timestamp'))
+            response_time = result.get('response_time')
+            # Время ответа храним в миллисекундах целым числом
+            probe[PROBE_FIELDS.index('response_time')] = (
+                round(response_time * 1000) if response_time is not None else None
+            )
+            self._probe = _pack(PROBE_SCHEMA_ID, probe)
+        return self._probe
+
+    @property
+    def deep(self) -> Optional[bytes]:
+        """Тяжелые поля (DEEP_SCHEMA_ID); None, если deep не отправляется"""
+        if self._deep is None and self._include_deep:
+            result = self._result
+            deep = [result.get(field) for field in DEEP_FIELDS]
+            deep[DEEP_FIELDS.index('timestamp')] = _timestamp_to_ms(result.get('timestamp'))
+            # Отсутствующие security headers не передаем, decode_to_json восстанавливает их как null
+            security_headers = result.get('security_headers') or {}
+            deep[DEEP_FIELDS.index('security_headers')] = {
+                name: value for name, value in security_headers.items() if value is not None
+            }
+            self._deep = _pack(DEEP_SCHEMA_ID, deep)
+        return self._deep
+
+    @property
+    def json(self) -> bytes:
+        """Прежний JSON-формат записи для существующих потребителей"""
+        if self._json is None:
+            self._json = json.dumps(self._result, ensure_ascii=False).encode('utf-8')
+        return self._json
+
+
+def encode_results(results: List[Dict], request_id: str, include_deep: bool = True) -> List[EncodedResult]:
+    """Обогащает результаты метаданными и кодирует каждый один раз"""
+    encoded = []
+    for i, result in enumerate(results):
+        enriched_result = {
+            **result,
+            'request_id': request_id or f"req_{i}",
+            'batch_timestamp': result.get('timestamp'),
+            'service_version': SERVICE_VERSION
+        }
+        encoded.append(EncodedResult(enriched_result, include_deep))
+    return encoded
+
+
+def decode_record(data: bytes) -> Dict:
+    """
+    Декодирует probe или deep запись в словарь прежнего JSON-формата
+
+    Используется как прослойка совместимости для потребителей, ожидающих JSON.
+    """
+    magic, schema_id = _HEADER.unpack_from(data)
+    if magic != MAGIC_BYTE:
+        raise ValueError(f"Неизвестный формат записи: magic={magic}")
+
+    values = msgpack.unpackb(data[_HEADER.size:], raw=False)
+    if schema_id == PROBE_SCHEMA_ID:
+        fields = PROBE_FIELDS
+    elif schema_id == DEEP_SCHEMA_ID:
+        fields = DEEP_FIELDS
+    else:
+        raise ValueError(f"Неизвестная схема записи: {schema_id}")
+
+    # Записи более новой версии могут содержать дополнительные поля в конце
+    record = dict(zip(fields, values))
+    record['timestamp'] = _timestamp_from_ms(record.get('timestamp'))
+    if schema_id == PROBE_SCHEMA_ID:
+        response_time = record.get('response_time')
+        record['response_time'] = response_time / 1000 if response_time is not None else None
+    record['schema_id'] = schema_id
+    return record
+
+
+def decode_to_json(probe: bytes, deep: Optional[bytes] = None) -> bytes:
+    """
+    Собирает JSON прежнего формата из пары probe/deep записей
+
+    batch_timestamp совпадает с timestamp, service_version передается в probe,
+    отсутствующие security headers ответа восстанавливаются как null.
+    Время и response_time округлены до миллисекунд; без deep в JSON нет
+    заголовков и анализа контента.
+    """
+    record = decode_record(probe)
+    record.pop('schema_id')
+    record['batch_timestamp'] = record['timestamp']
+    # Записи до появления поля service_version
+    record.setdefault('service_version', None)
+    if deep is not None:
+        deep_record = decode_record(deep)
+        deep_record.pop('schema_id')
+        security_headers = deep_record.get('security_headers') or {}
+        if record.get('status_code') is not None:
+            # Заголовки анализируются у каждого полученного ответа
+            security_headers = {name: security_headers.get(name) for name in SECURITY_HEADERS}
+        deep_record['security_headers'] = security_headers
+        record.update(deep_record)
+    return json.dumps(record, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,49 @@
+"""
+Шардирование проверок по хосту для горизонтального масштабирования воркеров
+
+Задания публикуются в топик назначений с ключом - хостом. Партиция выбирается
+тем же murmur2, что и у стандартного партиционера Kafka, поэтому все URL одного
+хоста всегда попадают в одну партицию и обрабатываются одним воркером группы
+(вежливость к хосту, переиспользование соединений, локальное состояние алертов).
+При подключении или падении воркера Kafka переназначает партиции автоматически.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+
+from kafka.partitioner.default import murmur2
+
+
+def host_key(url: str) -> str:
+    """Ключ шардирования: хост с портом в нижнем регистре"""
+    return urlparse(url).netloc.lower()
+
+
+def group_by_host(targets: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """Группировка проверок (словарей с ключом url) по хосту с сохранением исходного порядка"""
+    groups: Dict[str, List[Dict]] = defaultdict(list)
+    for target in targets:
+        groups[host_key(target['url'])].append(target)
+    return dict(groups)
+
+
+def partition_for_host(host: str, num_partitions: int) -> int:
+    """Партиция хоста - совпадает с выбором стандартного партиционера Kafka"""
+    return (murmur2(host.encode('utf-8')) & 0x7fffffff) % num_partitions
+
+
+def assign_partitions(num_partitions: int, workers: int) -> List[List[int]]:
+    """
+    Распределение партиций между воркерами (как range assignor Kafka)
+
+    Используется бенчмарком и для оценки перебалансировки без брокера.
+    """
+    per_worker, extra = divmod(num_partitions, workers)
+    assignment = []
+    start = 0
+    for worker in range(workers):
+        count = per_worker + (1 if worker < extra else 0)
+        assignment.append(list(range(start, start + count)))
+        start += count
+    return assignment
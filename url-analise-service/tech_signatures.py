@@ -0,0 +1,103 @@
+"""
+Сигнатуры технологий и однопроходный матчер на основе Aho-Corasick
+"""
+
+from typing import Dict, List, Set, Tuple
+import ahocorasick
+
+
+# Сигнатуры в заголовках: порядок важен, для каждого заголовка
+# берется первая совпавшая сигнатура из списка
+HEADER_SIGNATURES: Dict[str, List[Tuple[str, str]]] = {
+    'Server': [
+        ('nginx', 'nginx'),
+        ('apache', 'apache'),
+        ('iis', 'iis'),
+    ],
+    'X-Powered-By': [
+        ('php', 'php'),
+        ('asp.net', 'asp.net'),
+        ('node', 'node.js'),
+    ],
+}
+
+# Сигнатуры в теле HTML: технология определяется, если найден любой индикатор
+BODY_SIGNATURES: Dict[str, List[str]] = {
+    'wordpress': ['wp-content', 'wp-includes', 'wordpress'],
+    'drupal': ['drupal', 'sites/all'],
+    'joomla': ['joomla', 'media/jui'],
+    'react': ['react', 'react-dom'],
+    'vue': ['vue.js', 'vue@'],
+    'angular': ['angular', 'ng-'],
+    'jquery': ['jquery', '$().'],
+    'bootstrap': ['bootstrap', 'btn-primary'],
+}
+
+
+class TechnologyMatcher:
+    """Поиск всех сигнатур за один проход по тексту"""
+
+    def __init__(self,
+                 body_signatures: Dict[str, List[str]] = None,
+                 header_signatures: Dict[str, List[Tuple[str, str]]] = None):
+        body_signatures = BODY_SIGNATURES if body_signatures is None else body_signatures
+        header_signatures = HEADER_SIGNATURES if header_signatures is None else header_signatures
+
+        self.body_technologies = frozenset(body_signatures)
+        self._body_automaton = self._build_automaton(
+            (indicator.lower(), tech)
+            for tech, indicators in body_signatures.items()
+            for indicator in indicators
+        )
+
+        # Для заголовков храним (приоритет, технология), чтобы сохранить порядок правил
+        self._header_automatons = {
+            header: self._build_automaton(
+                (indicator.lower(), (priority, tech))
+                for priority, (indicator, tech) in enumerate(rules)
+            )
+            for header, rules in header_signatures.items()
+            if rules
+        }
+
+    @staticmethod
+    def _build_automaton(entries) -> ahocorasick.Automaton:
+        """Строит автомат; одинаковые индикаторы разных технологий объединяются"""
+        payloads: Dict[str, list] = {}
+        for indicator, payload in entries:
+            payloads.setdefault(indicator, []).append(payload)
+
+        automaton = ahocorasick.Automaton()
+        for indicator, values in payloads.items():
+            automaton.add_word(indicator, tuple(values))
+        automaton.make_automaton()
+        return automaton
+
+    def match_headers(self, headers) -> List[str]:
+        """Определение технологий по заголовкам ответа"""
+        technologies = []
+        for header, automaton in self._header_automatons.items():
+            value = headers.get(header, '')
+            if not value:
+                continue
+            matches = [match for _, values in automaton.iter(value.lower()) for match in values]
+            if matches:
+                technologies.append(min(matches)[1])
+        return technologies
+
+    def match_body(self, content: bytes) -> Set[str]:
+        """Определение технологий по телу ответа за один проход"""
+        text = content.decode('utf-8', errors='ignore').lower()
+        detected: Set[str] = set()
+        total = len(self.body_technologies)
+
+        for _, technologies in self._body_automaton.iter(text):
+            detected.update(technologies)
+            if len(detected) == total:
+                break
+
+        return detected
+
+
+# Матчер строится один раз при импорте модуля
+technology_matcher = TechnologyMatcher()
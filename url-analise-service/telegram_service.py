@@ -3,8 +3,11 @@
 """
 
 import requests
+import aiohttp
+import asyncio
+import html
 import logging
-from typing import Optional
+from typing import List, Optional, Tuple
 from config import settings
 
 # Настройка логирования
@@ -73,16 +76,19 @@ class TelegramService:
         Returns:
             bool: True если отправка успешна, False в случае ошибки
         """
+        return self.send_message(self.format_error_notification(url, status_code, error_message))
+    
+    def format_error_notification(self, url: str, status_code: int, error_message: str = None) -> str:
+        """Формирует текст уведомления об ошибке эндпоинта"""
         message = f"🚨 <b>Ошибка эндпоинта</b>\n\n"
-        message += f"🔗 <b>URL:</b> <code>{url}</code>\n"
+        message += f"🔗 <b>URL:</b> <code>{html.escape(url)}</code>\n"
         message += f"📊 <b>Статус:</b> <code>{status_code}</code>\n"
         
         if error_message:
-            message += f"❌ <b>Ошибка:</b> <code>{error_message}</code>\n"
+            message += f"❌ <b>Ошибка:</b> <code>{html.escape(error_message)}</code>\n"
         
         message += f"\n⏰ <b>Время:</b> {self._get_current_time()}"
-        
-        return self.send_message(message)
+        return message
     
     def send_service_error_notification(self, service_name: str, error_message: str) -> bool:
         """
@@ -95,12 +101,15 @@ class TelegramService:
         Returns:
             bool: True если отправка успешна, False в случае ошибки
         """
+        return self.send_message(self.format_service_error_notification(service_name, error_message))
+    
+    def format_service_error_notification(self, service_name: str, error_message: str) -> str:
+        """Формирует текст уведомления об ошибке сервиса"""
         message = f"🚨 <b>Ошибка сервиса</b>\n\n"
-        message += f"🔧 <b>Сервис:</b> <code>{service_name}</code>\n"
-        message += f"❌ <b>Ошибка:</b> <code>{error_message}</code>\n"
+        message += f"🔧 <b>Сервис:</b> <code>{html.escape(service_name)}</code>\n"
+        message += f"❌ <b>Ошибка:</b> <code>{html.escape(error_message)}</code>\n"
         message += f"\n⏰ <b>Время:</b> {self._get_current_time()}"
-        
-        return self.send_message(message)
+        return message
     
     def send_monitoring_summary(self, total_urls: int, successful: int, failed: int, 
                               avg_response_time: float = None) -> bool:
@@ -116,6 +125,13 @@ class TelegramService:
         Returns:
             bool: True если отправка успешна, False в случае ошибки
         """
+        return self.send_message(
+            self.format_monitoring_summary(total_urls, successful, failed, avg_response_time)
+        )
+    
+    def format_monitoring_summary(self, total_urls: int, successful: int, failed: int,
+                                  avg_response_time: float = None) -> str:
+        """Формирует текст сводки по мониторингу"""
         message = f"📊 <b>Сводка мониторинга</b>\n\n"
         message += f"🔗 <b>Всего URL:</b> <code>{total_urls}</code>\n"
         message += f"✅ <b>Успешных:</b> <code>{successful}</code>\n"
@@ -128,8 +144,7 @@ class TelegramService:
         message += f"📈 <b>Процент успеха:</b> <code>{success_rate:.1f}%</code>\n"
         
         message += f"\n⏰ <b>Время:</b> {self._get_current_time()}"
-        
-        return self.send_message(message)
+        return message
     
     def _get_current_time(self) -> str:
         """Возвращает текущее время в формате строки"""
@@ -137,5 +152,200 @@ class TelegramService:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+class TelegramNotifier:
+    """
+    Неблокирующая отправка уведомлений в Telegram
+
+    Уведомления кладутся во внутреннюю очередь и отправляются фоновой задачей.
+    Ошибки эндпоинтов, накопленные за окно batch_window, объединяются в одну
+    сводку; между сообщениями выдерживается min_interval (лимиты Telegram).
+    """
+    
+    # Максимальная длина сообщения в Telegram
+    MAX_MESSAGE_LENGTH = 4096
+    
+    def __init__(self, service: TelegramService, batch_window: float, max_batch: int,
+                 min_interval: float, queue_size: int):
+        self.service = service
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._next_send = 0.0
+        self.sent_messages = 0
+        self.dropped = 0
+    
+    def notify_error(self, url: str, status_code: int, error_message: str = None):
+        """Ставит в очередь уведомление об ошибке эндпоинта (попадет в сводку)"""
+        self._enqueue(('error', (url, status_code, error_message)))
+    
+    def notify_recovery(self, url: str, downtime: float = None):
+        """Ставит в очередь уведомление о восстановлении эндпоинта (попадет в сводку)"""
+        self._enqueue(('recovery', (url, downtime)))
+    
+    def notify_message(self, message: str):
+        """Ставит в очередь отдельное сообщение"""
+        self._enqueue(('message', message))
+    
+    def notify_service_error(self, service_name: str, error_message: str):
+        """Ставит в очередь уведомление об ошибке сервиса"""
+        self.notify_message(self.service.format_service_error_notification(service_name, error_message))
+    
+    def notify_monitoring_summary(self, total_urls: int, successful: int, failed: int,
+                                  avg_response_time: float = None):
+        """Ставит в очередь сводку мониторинга"""
+        self.notify_message(
+            self.service.format_monitoring_summary(total_urls, successful, failed, avg_response_time)
+        )
+    
+    def _enqueue(self, item: Tuple[str, object]):
+        if not self.service.enabled or not self.service.bot_token or not self.service.chat_id:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"Очередь Telegram уведомлений переполнена, отброшено: {self.dropped}")
+    
+    def _ensure_started(self):
+        """Ленивый запуск фоновой задачи в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._session = None
+            self._task = loop.create_task(self._run())
+    
+    async def _run(self):
+        """Фоновая отправка: собирает пачку за batch_window и отправляет"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                messages = [payload for kind, payload in batch if kind == 'message']
+                errors = [payload for kind, payload in batch if kind == 'error']
+                recoveries = [payload for kind, payload in batch if kind == 'recovery']
+                if errors:
+                    messages.append(self._format_digest(errors))
+                if recoveries:
+                    messages.append(self._format_recovery_digest(recoveries))
+                for message in messages:
+                    await self._send(message)
+            except Exception as e:
+                logger.error(f"Ошибка фоновой отправки Telegram уведомлений: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _format_digest(self, errors: List[Tuple[str, int, Optional[str]]]) -> str:
+        """Объединяет несколько ошибок эндпоинтов в одно сообщение"""
+        if len(errors) == 1:
+            return self.service.format_error_notification(*errors[0])
+        
+        header = f"🚨 <b>Ошибки эндпоинтов: {len(errors)}</b>\n\n"
+        footer = f"\n⏰ <b>Время:</b> {self.service._get_current_time()}"
+        lines = []
+        length = len(header) + len(footer)
+        for shown, (url, status_code, error_message) in enumerate(errors):
+            line = f"• <code>{status_code}</code> <code>{html.escape(url)}</code>"
+            if error_message:
+                line += f" — {html.escape(error_message[:200])}"
+            line += "\n"
+            # Оставляем место под строку "и еще N"
+            if length + len(line) > self.MAX_MESSAGE_LENGTH - 64:
+                lines.append(f"… и еще {len(errors) - shown}\n")
+                break
+            lines.append(line)
+            length += len(line)
+        return header + ''.join(lines) + footer
+    
+    def _format_recovery_digest(self, recoveries: List[Tuple[str, Optional[float]]]) -> str:
+        """Объединяет восстановления эндпоинтов в одно сообщение"""
+        header = f"✅ <b>Восстановлено эндпоинтов: {len(recoveries)}</b>\n\n"
+        footer = f"\n⏰ <b>Время:</b> {self.service._get_current_time()}"
+        lines = []
+        length = len(header) + len(footer)
+        for shown, (url, downtime) in enumerate(recoveries):
+            line = f"• <code>{html.escape(url)}</code>"
+            if downtime is not None:
+                line += f" — простой {downtime / 60:.1f} мин"
+            line += "\n"
+            if length + len(line) > self.MAX_MESSAGE_LENGTH - 64:
+                lines.append(f"… и еще {len(recoveries) - shown}\n")
+                break
+            lines.append(line)
+            length += len(line)
+        return header + ''.join(lines) + footer
+    
+    async def _send(self, message: str):
+        """Отправка одного сообщения с соблюдением интервала и обработкой 429"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        
+        url = f"https://api.telegram.org/bot{self.service.bot_token}/sendMessage"
+        payload = {'chat_id': self.service.chat_id, 'text': message, 'parse_mode': 'HTML'}
+        loop = asyncio.get_running_loop()
+        
+        for _ in range(3):
+            wait = self._next_send - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_send = loop.time() + self.min_interval
+            try:
+                async with self._session.post(url, data=payload) as response:
+                    if response.status == 429:
+                        body = await response.json(content_type=None)
+                        retry_after = body.get('parameters', {}).get('retry_after', self.min_interval)
+                        logger.warning(f"Telegram rate limit, повтор через {retry_after}s")
+                        self._next_send = loop.time() + retry_after
+                        continue
+                    response.raise_for_status()
+                    self.sent_messages += 1
+                    logger.info("Telegram сообщение успешно отправлено")
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Ошибка при отправке Telegram сообщения: {e}")
+                return
+    
+    async def close(self, timeout: float = 10):
+        """Дожидается отправки очереди и останавливает фоновую задачу"""
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не все Telegram уведомления были отправлены до остановки")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._session:
+            await self._session.close()
+
+
 # Глобальный экземпляр сервиса
 telegram_service = TelegramService()
+
+# Глобальный неблокирующий отправитель для асинхронного кода
+telegram_notifier = TelegramNotifier(
+    telegram_service,
+    batch_window=settings.TELEGRAM_BATCH_WINDOW,
+    max_batch=settings.TELEGRAM_MAX_BATCH,
+    min_interval=settings.TELEGRAM_MIN_INTERVAL,
+    queue_size=settings.TELEGRAM_QUEUE_SIZE
+)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Тесты переходов HostController: адаптивный таймаут и circuit breaker
+
+Запуск: python test_host_control.py (или python -m pytest test_host_control.py)
+"""
+
+import asyncio
+import unittest
+
+from host_control import CLOSED, HALF_OPEN, OPEN, HostController
+
+MAX_TIMEOUT = 15.0
+
+
+def make_controller(**overrides) -> HostController:
+    settings = dict(
+        host='example.com', initial_limit=4, max_limit=16, window=100, min_samples=20,
+        timeout_multiplier=3, min_timeout=2, failure_threshold=5, open_seconds=30
+    )
+    settings.update(overrides)
+    return HostController(**settings)
+
+
+def open_circuit(control: HostController):
+    """Открывает circuit серией ошибок и сразу разрешает пробный запрос"""
+    for _ in range(control.failure_threshold):
+        control.in_flight += 1
+        control.release(0.01, failed=True, overloaded=False)
+    assert control.circuit == OPEN
+    control._opened_at -= control.open_seconds
+
+
+class AdaptiveTimeoutTest(unittest.TestCase):
+    def test_timeout_grows_when_host_slows_down(self):
+        """Хост замедлился до 5 с: таймауты попадают в выборку, и таймаут вырастает выше 5 с"""
+        control = make_controller()
+        for _ in range(20):
+            control.in_flight += 1
+            control.release(0.1, failed=False, overloaded=False)
+        self.assertEqual(control.timeout(MAX_TIMEOUT), 2.0)
+
+        timeouts = []
+        while control.timeout(MAX_TIMEOUT) < 5.0:
+            request_timeout = control.timeout(MAX_TIMEOUT)
+            timeouts.append(request_timeout)
+            control.in_flight += 1
+            control.release(request_timeout, failed=True, overloaded=False, timed_out=True)
+
+        self.assertEqual(timeouts, [2.0, 2.0])
+        self.assertEqual(control.timeout(MAX_TIMEOUT), 6.0)
+        self.assertEqual(control.circuit, CLOSED)
+
+        # Ответ за 5 с укладывается в таймаут, серия ошибок прерывается
+        control.in_flight += 1
+        control.release(5.0, failed=False, overloaded=False)
+        self.assertEqual(control.consecutive_failures, 0)
+        self.assertEqual(control.timeout(MAX_TIMEOUT), 6.0)
+
+        # Дальше таймаут растет не выше max_timeout
+        for _ in range(2):
+            control.in_flight += 1
+            control.release(control.timeout(MAX_TIMEOUT), failed=True, overloaded=False, timed_out=True)
+        self.assertEqual(control.timeout(MAX_TIMEOUT), MAX_TIMEOUT)
+
+    def test_connection_errors_do_not_change_timeout(self):
+        control = make_controller()
+        for _ in range(20):
+            control.in_flight += 1
+            control.release(0.1, failed=False, overloaded=False)
+        for _ in range(3):
+            control.in_flight += 1
+            control.release(0.01, failed=True, overloaded=False)
+        self.assertEqual(control.timeout(MAX_TIMEOUT), 2.0)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_single_trial_in_half_open(self):
+        control = make_controller()
+        open_circuit(control)
+
+        self.assertEqual(control.allow_request(), (True, True))
+        self.assertEqual(control.circuit, HALF_OPEN)
+        self.assertEqual(control.allow_request(), (False, False))
+
+    def test_stale_request_keeps_trial_in_flight(self):
+        """Запрос, начатый до открытия circuit, не сбрасывает признак пробного запроса"""
+        control = make_controller()
+        control.in_flight += 1  # запрос начат при закрытом circuit
+        open_circuit(control)
+        control.allow_request()
+
+        control.release(0.1, failed=False, overloaded=False)
+
+        self.assertEqual(control.circuit, HALF_OPEN)
+        self.assertEqual(control.allow_request(), (False, False))
+
+    def test_stale_success_does_not_close_open_circuit(self):
+        control = make_controller()
+        control.in_flight += 1
+        open_circuit(control)
+        control._opened_at += control.open_seconds
+
+        control.release(0.1, failed=False, overloaded=False)
+
+        self.assertEqual(control.circuit, OPEN)
+
+    def test_stale_failure_does_not_extend_open_period(self):
+        control = make_controller()
+        control.in_flight += 1
+        open_circuit(control)
+        opened_at = control._opened_at
+
+        control.release(0.01, failed=True, overloaded=False)
+
+        self.assertEqual(control._opened_at, opened_at)
+
+    def test_trial_success_closes_circuit(self):
+        control = make_controller()
+        open_circuit(control)
+        allowed, trial = control.allow_request()
+        control.in_flight += 1
+
+        control.release(0.1, failed=False, overloaded=False, trial=trial)
+
+        self.assertEqual(control.circuit, CLOSED)
+        self.assertEqual(control.consecutive_failures, 0)
+
+    def test_trial_failure_reopens_circuit(self):
+        control = make_controller()
+        open_circuit(control)
+        allowed, trial = control.allow_request()
+        control.in_flight += 1
+
+        control.release(2.0, failed=True, overloaded=False, timed_out=True, trial=trial)
+
+        self.assertEqual(control.circuit, OPEN)
+        self.assertEqual(control.allow_request(), (False, False))
+
+
+class TrialAcquireTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_trial_allows_next_trial(self):
+        """Пробный запрос отменен в ожидании слота - следующий запрос может стать пробным"""
+        control = make_controller(initial_limit=1)
+        open_circuit(control)
+        control.in_flight = 1  # слот занят запросом, начатым до открытия
+        allowed, trial = control.allow_request()
+
+        waiting = asyncio.create_task(control.acquire(trial))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+
+        self.assertEqual(control.allow_request(), (True, True))
+
+    async def test_trial_denied_slot_allows_next_trial(self):
+        """acquire вернул False (circuit открыт) - признак пробного запроса сбрасывается"""
+        control = make_controller(initial_limit=1)
+        open_circuit(control)
+        control.in_flight = 1
+        allowed, trial = control.allow_request()
+
+        waiting = asyncio.create_task(control.acquire(trial))
+        await asyncio.sleep(0)
+        control.circuit = OPEN
+        control._release_slot()
+
+        self.assertFalse(await waiting)
+        self.assertEqual(control.in_flight, 0)
+        self.assertEqual(control.allow_request(), (True, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
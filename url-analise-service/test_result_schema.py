@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Тесты кодирования результатов в probe/deep записи и обратно в JSON
+
+Запуск: python test_result_schema.py (или python -m pytest test_result_schema.py)
+"""
+
+import json
+import unittest
+
+import msgpack
+
+from result_schema import (
+    DEEP_FIELDS, DEEP_SCHEMA_ID, PROBE_FIELDS, _HEADER, _pack, decode_record, decode_to_json, encode_results
+)
+
+
+def https_result() -> dict:
+    """Результат проверки HTTPS-эндпоинта в том виде, в каком его собирает EndpointTester"""
+    return {
+        'url': 'https://example.com/',
+        'method': 'GET',
+        'timestamp': '2024-01-01T00:00:00.123000+00:00',
+        'success': True,
+        'error': None,
+        'response_time': 0.25,
+        'status_code': 200,
+        'content_type': 'text/html',
+        'content_length': '512',
+        'headers': {'Server': 'nginx'},
+        'is_https': True,
+        'technology_stack': ['nginx'],
+        'security_headers': {'strict-transport-security': 'max-age=31536000'},
+        'content_analysis': {'title': 'Example'},
+        'additional_checks': {'robots_txt': {'exists': True, 'size': 42}},
+        'redirect_chain': [],
+        'ssl_info': {'version': 'TLSv1.3'},
+        'body': {'bytes_read': 512, 'truncated': False, 'sha256': 'ab' * 32, 'matched': None},
+        'tls_certificate': {
+            'subject': 'example.com',
+            'issuer': "Let's Encrypt",
+            'not_before': '2023-12-01T00:00:00+00:00',
+            'not_after': '2024-03-01T00:00:00+00:00',
+            'days_left': 60,
+            'expiring_soon': False,
+            'san': ['example.com', 'www.example.com'],
+            'hostname_match': True,
+            'serial_number': '3a1f',
+            'chain_valid': True,
+            'verify_error': None,
+            'protocol': 'TLSv1.3',
+            'cipher': 'TLS_AES_256_GCM_SHA384',
+        },
+    }
+
+
+class DeepRecordTest(unittest.TestCase):
+    def test_tls_certificate_round_trip(self):
+        result = https_result()
+        encoded = encode_results([result], 'req-1')[0]
+
+        record = json.loads(decode_to_json(encoded.probe, encoded.deep))
+
+        self.assertEqual(record['tls_certificate'], result['tls_certificate'])
+        self.assertEqual(decode_record(encoded.deep)['tls_certificate'], result['tls_certificate'])
+
+    def test_round_trip_restores_json_format(self):
+        """Декодированная пара probe/deep совпадает с прежним JSON-форматом"""
+        encoded = encode_results([https_result()], 'req-1')[0]
+
+        record = json.loads(decode_to_json(encoded.probe, encoded.deep))
+
+        self.assertEqual(record.keys(), json.loads(encoded.json).keys())
+        for field in set(PROBE_FIELDS + DEEP_FIELDS) - {'security_headers'}:
+            self.assertEqual(record[field], json.loads(encoded.json)[field], field)
+
+    def test_deep_record_without_tls_certificate(self):
+        """Записи, закодированные до появления поля, декодируются без него"""
+        result = https_result()
+        values = [result[field] for field in DEEP_FIELDS[:-1]]
+        values[DEEP_FIELDS.index('timestamp')] = None
+        legacy = _pack(DEEP_SCHEMA_ID, values)
+
+        record = decode_record(legacy)
+
+        self.assertNotIn('tls_certificate', record)
+        self.assertEqual(record['body'], result['body'])
+
+    def test_positional_layout(self):
+        """Поле добавлено в конец deep-записи - позиции прежних полей не изменились"""
+        encoded = encode_results([https_result()], 'req-1')[0]
+        values = msgpack.unpackb(encoded.deep[_HEADER.size:], raw=False)
+
+        self.assertEqual(DEEP_FIELDS[-1], 'tls_certificate')
+        self.assertEqual(values[DEEP_FIELDS.index('body')], https_result()['body'])
+        self.assertEqual(values[-1]['serial_number'], '3a1f')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+Проверка TLS-сертификатов: срок действия, издатель, SAN и валидность цепочки
+
+Проверка выполняется отдельным рукопожатием с проверкой цепочки (основной запрос
+тестера сертификаты не проверяет) и кэшируется по host:port на TLS_CERT_REFRESH секунд,
+ошибки рукопожатия - на TLS_ERROR_TTL секунд.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import ssl
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+
+from config import settings
+from host_checks_cache import HostChecksCache
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+def _hostname_matches(host: str, names: List[str], ip_addresses: List[str]) -> bool:
+    """Соответствие имени хоста SAN сертификата (wildcard только на один уровень)"""
+    try:
+        return str(ipaddress.ip_address(host)) in ip_addresses
+    except ValueError:
+        pass
+
+    host = host.lower().rstrip('.')
+    for name in names:
+        name = name.lower().rstrip('.')
+        if name == host:
+            return True
+        if name.startswith('*.') and host.count('.') == name.count('.') and host.endswith(name[1:]):
+            return True
+    return False
+
+
+def _name_attribute(name: x509.Name, oid) -> Optional[str]:
+    attributes = name.get_attributes_for_oid(oid)
+    return attributes[0].value if attributes else None
+
+
+class TLSInspector:
+    """Проверка сертификатов с кэшированием и учетом истекающих сертификатов"""
+
+    def __init__(self, refresh_interval: float, timeout: float, expiry_warning_days: int, max_hosts: int,
+                 error_ttl: float = 300):
+        self.timeout = timeout
+        self.error_ttl = error_ttl
+        self.expiry_warning_days = expiry_warning_days
+        self._cache = HostChecksCache(ttl=refresh_interval, max_hosts=max_hosts, requests_per_fetch=1)
+        self._verify_context = ssl.create_default_context()
+        # Имя хоста сверяется с SAN отдельно, чтобы отличать его от ошибок цепочки
+        self._verify_context.check_hostname = False
+        self._insecure_context = ssl.create_default_context()
+        self._insecure_context.check_hostname = False
+        self._insecure_context.verify_mode = ssl.CERT_NONE
+        # Последнее состояние сертификатов по host:port для метрики истекающих
+        self._latest: Dict[str, Dict] = {}
+
+    async def inspect(self, host: str, port: int = 443) -> Dict:
+        """Сведения о сертификате host:port (из кэша или новым рукопожатием)"""
+        key = f"{host}:{port}"
+        certificate = await self._cache.get(key, lambda: self._fetch(host, port), ttl_for=self._ttl_for)
+        if 'error' in certificate:
+            return certificate
+        # Срок считаем от текущего момента, а не от момента рукопожатия
+        not_after = datetime.fromisoformat(certificate['not_after'])
+        certificate['days_left'] = (not_after - datetime.now(timezone.utc)).days
+        certificate['expiring_soon'] = certificate['days_left'] <= self.expiry_warning_days
+        return certificate
+
+    def _ttl_for(self, certificate: Dict) -> float:
+        # Ошибку кэшируем ненадолго: хост с неработающим TLS не получает рукопожатие на каждой проверке,
+        # а исправленный сертификат будет виден через error_ttl
+        return self.error_ttl if 'error' in certificate else self._cache.ttl
+
+    async def _fetch(self, host: str, port: int) -> Dict:
+        try:
+            try:
+                der, protocol, cipher = await self._handshake(host, port, self._verify_context)
+                chain_valid, verify_error = True, None
+            except ssl.SSLCertVerificationError as e:
+                chain_valid, verify_error = False, e.verify_message
+                # Цепочка невалидна - сертификат все равно разбираем для отчета
+                der, protocol, cipher = await self._handshake(host, port, self._insecure_context)
+            certificate = self._parse(host, der)
+        except Exception as e:
+            return {'error': str(e) or type(e).__name__}
+
+        certificate.update({
+            'host': f"{host}:{port}",
+            'chain_valid': chain_valid,
+            'verify_error': verify_error,
+            'protocol': protocol,
+            'cipher': cipher,
+            'checked_at': datetime.now(timezone.utc).isoformat(),
+        })
+        return self._remember(host, port, certificate)
+
+    async def _handshake(self, host: str, port: int, context: ssl.SSLContext):
+        """TLS-рукопожатие без HTTP-запроса; возвращает сертификат в DER"""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context, server_hostname=host),
+            timeout=self.timeout
+        )
+        try:
+            ssl_object = writer.get_extra_info('ssl_object')
+            cipher = ssl_object.cipher()
+            return ssl_object.getpeercert(binary_form=True), ssl_object.version(), cipher[0] if cipher else None
+        finally:
+            writer.close()
+            try:
+                # Дожидаемся закрытия транспорта, чтобы он не оставался открытым
+                await asyncio.wait_for(writer.wait_closed(), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                # Ошибка при закрытии (например, сервер оборвал соединение) результат не меняет
+                pass
+
+    def _parse(self, host: str, der: bytes) -> Dict:
+        cert = x509.load_der_x509_certificate(der)
+        try:
+            san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+            dns_names = san.get_values_for_type(x509.DNSName)
+            ip_addresses = [str(ip) for ip in san.get_values_for_type(x509.IPAddress)]
+        except x509.ExtensionNotFound:
+            dns_names, ip_addresses = [], []
+
+        not_after = cert.not_valid_after_utc
+        days_left = (not_after - datetime.now(timezone.utc)).days
+        return {
+            'subject': _name_attribute(cert.subject, NameOID.COMMON_NAME),
+            'issuer': _name_attribute(cert.issuer, NameOID.ORGANIZATION_NAME)
+            or _name_attribute(cert.issuer, NameOID.COMMON_NAME),
+            'not_before': cert.not_valid_before_utc.isoformat(),
+            'not_after': not_after.isoformat(),
+            'days_left': days_left,
+            'expiring_soon': days_left <= self.expiry_warning_days,
+            'san': dns_names + ip_addresses,
+            'hostname_match': _hostname_matches(host, dns_names, ip_addresses),
+            'serial_number': format(cert.serial_number, 'x'),
+        }
+
+    def _remember(self, host: str, port: int, certificate: Dict) -> Dict:
+        key = f"{host}:{port}"
+        self._latest[key] = certificate
+        while len(self._latest) > self._cache.max_hosts:
+            del self._latest[next(iter(self._latest))]
+        if certificate.get('expiring_soon'):
+            logger.warning(f"Сертификат {key} истекает через {certificate['days_left']} дн.")
+        return certificate
+
+    def get_stats(self) -> Dict:
+        """Метрика истекающих и невалидных сертификатов"""
+        now = datetime.now(timezone.utc)
+        expiring = []
+        invalid = []
+        for key, certificate in self._latest.items():
+            days_left = (datetime.fromisoformat(certificate['not_after']) - now).days
+            if days_left <= self.expiry_warning_days:
+                expiring.append({'host': key, 'days_left': days_left, 'not_after': certificate['not_after']})
+            if not certificate['chain_valid'] or not certificate['hostname_match']:
+                invalid.append({'host': key, 'error': certificate['verify_error'] or 'hostname mismatch'})
+        expiring.sort(key=lambda item: item['days_left'])
+        return {
+            'hosts_inspected': len(self._latest),
+            'expiry_warning_days': self.expiry_warning_days,
+            'expiring_soon': len(expiring),
+            'invalid': len(invalid),
+            'expiring_hosts': expiring[:100],
+            'invalid_hosts': invalid[:100],
+            'cache': self._cache.get_stats(),
+        }
+
+
+# Глобальный экземпляр: одно рукопожатие на host:port за TLS_CERT_REFRESH
+tls_inspector = TLSInspector(
+    refresh_interval=settings.TLS_CERT_REFRESH,
+    timeout=settings.TLS_HANDSHAKE_TIMEOUT,
+    expiry_warning_days=settings.TLS_EXPIRY_WARNING_DAYS,
+    max_hosts=settings.TLS_CERT_MAX_HOSTS,
+    error_ttl=settings.TLS_ERROR_TTL
+)
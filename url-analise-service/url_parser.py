@@ -1,15 +1,107 @@
 import requests
+import aiohttp
+import asyncio
 from urllib.parse import urljoin, urlparse, urlunparse
 from bs4 import BeautifulSoup
 import re
 from typing import Set, Dict, List
 import time
+import math
+import hashlib
+import zlib
+import xml.etree.ElementTree as ET
 from collections import deque
+from config import settings
+
+
+# Правила классификации медиа-URL компилируются один раз при импорте
+MEDIA_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp',  # Изображения
+    '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm',  # Видео
+    '.mp3', '.wav', '.ogg', '.m4a', '.flac',  # Аудио
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx',  # Документы
+    '.zip', '.rar', '.tar', '.gz',  # Архивы
+    '.css', '.js'  # Стили и скрипты
+)
+
+# Распространенные медиа-пути и ключевые слова в одном выражении
+# ('/images/', '/videos/', '/audio/' покрываются словами image, video, audio)
+MEDIA_PATH_PATTERN = re.compile(
+    r'/(?:media|uploads|assets|static|files|img|downloads)/|image|video|audio'
+)
+
+SIMPLE_MEDIA_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.mp4', '.mp3', '.pdf')
+
+
+class BloomFilter:
+    """Компактный вероятностный фильтр для очень больших сайтов"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        # Стандартные формулы оптимального размера и числа хэш-функций
+        size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2)) or 1
+        self.size = size
+        self.hash_count = max(1, round(size / capacity * math.log(2)))
+        self.bits = bytearray((size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> bool:
+        """Добавляет элемент; возвращает True, если его (вероятно) не было"""
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+
+class CrawlFrontier:
+    """Очередь обхода с проверкой членства за O(1)"""
+
+    def __init__(self, bloom_capacity: int = 0):
+        # При bloom_capacity > 0 вместо множества используется Bloom-фильтр:
+        # память фиксирована, но небольшая доля URL может быть пропущена
+        self.queue = deque()
+        self.seen = BloomFilter(bloom_capacity) if bloom_capacity else set()
+
+    def mark_seen(self, url: str) -> bool:
+        """Помечает URL как известный; возвращает True, если он встретился впервые"""
+        if isinstance(self.seen, BloomFilter):
+            return self.seen.add(url)
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        return True
+
+    def push(self, url: str) -> bool:
+        """Добавляет URL в очередь, если он еще не встречался"""
+        if not self.mark_seen(url):
+            return False
+        self.queue.append(url)
+        return True
+
+    def pop(self) -> str:
+        return self.queue.popleft()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.seen
+
+    def __len__(self) -> int:
+        return len(self.queue)
 
 
 class WebsiteCrawler:
-    def __init__(self, user_agent: str = None, delay: float = 0.1):
+    def __init__(self, user_agent: str = None, delay: float = 0.1, bloom_capacity: int = 0):
         self.session = requests.Session()
+        self.bloom_capacity = bloom_capacity
         self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         self.delay = delay
         self.visited_urls = set()
@@ -31,29 +123,8 @@ class WebsiteCrawler:
 
     def is_media_url(self, url: str) -> bool:
         """Проверяет, является ли URL медиа-файлом"""
-        media_extensions = {
-            '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp',  # Изображения
-            '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm',  # Видео
-            '.mp3', '.wav', '.ogg', '.m4a', '.flac',  # Аудио
-            '.pdf', '.doc', '.docx', '.xls', '.xlsx',  # Документы
-            '.zip', '.rar', '.tar', '.gz',  # Архивы
-            '.css', '.js'  # Стили и скрипты
-        }
-
-        # Проверяем расширение файла в URL
-        parsed_url = urlparse(url)
-        path = parsed_url.path.lower()
-
-        # Также проверяем распространенные медиа-пути
-        media_patterns = [
-            r'/media/', r'/uploads/', r'/images/', r'/videos/',
-            r'/audio/', r'/assets/', r'/static/', r'/files/',
-            r'/img/', r'/video/', r'/audio/', r'/downloads/'
-        ]
-
-        return (any(path.endswith(ext) for ext in media_extensions) or
-                any(pattern in path for pattern in media_patterns) or
-                'image' in path or 'video' in path or 'audio' in path)
+        path = urlparse(url).path.lower()
+        return path.endswith(MEDIA_EXTENSIONS) or MEDIA_PATH_PATTERN.search(path) is not None
 
     def extract_urls_from_page(self, url: str, html_content: str) -> Set[str]:
         """Извлекает все URL со страницы"""
@@ -125,11 +196,12 @@ class WebsiteCrawler:
         """Основной метод для сканирования сайта"""
         # Нормализуем стартовый URL
         start_url = self.normalize_url(start_url)
-        queue = deque([start_url])
+        frontier = CrawlFrontier(self.bloom_capacity)
+        frontier.push(start_url)
         self.internal_urls.add(start_url)
 
-        while queue and len(self.visited_urls) < max_pages:
-            current_url = queue.popleft()
+        while frontier and len(self.visited_urls) < max_pages:
+            current_url = frontier.pop()
 
             if current_url in self.visited_urls:
                 continue
@@ -161,8 +233,7 @@ class WebsiteCrawler:
 
                     # Добавляем внутренние ссылки в очередь для сканирования
                     elif self.should_visit_url(normalized_url, start_url):
-                        if normalized_url not in queue and normalized_url not in self.visited_urls:
-                            queue.append(normalized_url)
+                        if frontier.push(normalized_url):
                             self.internal_urls.add(normalized_url)
 
                 time.sleep(self.delay)
@@ -186,13 +257,298 @@ class WebsiteCrawler:
         }
 
 
+class AsyncWebsiteCrawler(WebsiteCrawler):
+    """Асинхронный краулер с пулом воркеров и ограничением частоты запросов к хосту"""
+
+    def __init__(self, user_agent: str = None, max_concurrent: int = 10,
+                 requests_per_second: float = 10.0, timeout: float = 10, bloom_capacity: int = 0,
+                 max_sitemap_files: int = 50, max_sitemap_urls: int = 50000,
+                 max_sitemap_size: int = 50 * 1024 * 1024, max_page_size: int = 5 * 1024 * 1024):
+        super().__init__(user_agent=user_agent, delay=1.0 / requests_per_second,
+                         bloom_capacity=bloom_capacity)
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        # Сколько байт страницы читается: огромная страница не занимает память каждого воркера
+        self.max_page_size = max_page_size
+        self.max_sitemap_files = max_sitemap_files
+        self.max_sitemap_urls = max_sitemap_urls
+        # Лимит распакованного размера одного sitemap (защита от gzip-бомб)
+        self.max_sitemap_size = max_sitemap_size
+        self.sitemap_urls_found = 0
+        self._host_next_request: Dict[str, float] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+
+    async def _wait_for_host(self, url: str):
+        """Выдерживает минимальный интервал между запросами к одному хосту"""
+        host = urlparse(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            next_request = self._host_next_request.get(host, now)
+            if next_request > now:
+                await asyncio.sleep(next_request - now)
+                now = next_request
+            self._host_next_request[host] = now + self.delay
+
+    async def _read_page(self, response: aiohttp.ClientResponse) -> str:
+        """Потоковое чтение не более max_page_size байт страницы; ссылки ищутся в прочитанной части"""
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(settings.BODY_CHUNK_SIZE):
+            chunks.append(chunk[:self.max_page_size - size])
+            size += len(chunks[-1])
+            if size >= self.max_page_size:
+                # Остаток не нужен - соединение закрывается без дочитывания
+                response.close()
+                break
+        content = b''.join(chunks)
+        try:
+            return content.decode(response.charset or 'utf-8', errors='ignore')
+        except LookupError:
+            # Неизвестная кодировка в Content-Type
+            return content.decode('utf-8', errors='ignore')
+
+    async def _process_page(self, session: aiohttp.ClientSession, current_url: str,
+                            start_url: str, queue: asyncio.Queue, frontier: CrawlFrontier):
+        """Загрузка одной страницы и добавление найденных ссылок в очередь"""
+        try:
+            print(f"Обрабатывается: {current_url}")
+
+            await self._wait_for_host(current_url)
+            async with session.get(current_url) as response:
+                response.raise_for_status()
+
+                # Проверяем, что это HTML страница (до чтения тела)
+                content_type = response.headers.get('content-type', '').lower()
+                if 'text/html' not in content_type:
+                    return
+
+                html_content = await self._read_page(response)
+
+            # Разбор HTML выносим из event loop, чтобы сервис оставался отзывчивым
+            found_urls = await asyncio.to_thread(self.extract_urls_from_page, current_url, html_content)
+
+            for url in found_urls:
+                normalized_url = self.normalize_url(url)
+
+                # Добавляем медиа-файлы
+                if self.is_media_url(normalized_url):
+                    self.media_urls.add(normalized_url)
+
+                # Добавляем внутренние ссылки в очередь для сканирования
+                elif self.should_visit_url(normalized_url, start_url):
+                    if frontier.mark_seen(normalized_url):
+                        queue.put_nowait(normalized_url)
+                        self.internal_urls.add(normalized_url)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Ошибка при обработке {current_url}: {e}")
+        except Exception as e:
+            print(f"Неожиданная ошибка при обработке {current_url}: {e}")
+
+    async def _get_robots_sitemaps(self, session: aiohttp.ClientSession, origin: str) -> List[str]:
+        """Список sitemap из строк Sitemap: в robots.txt (или /sitemap.xml по умолчанию)"""
+        sitemaps = []
+        robots_url = f"{origin}/robots.txt"
+        try:
+            await self._wait_for_host(robots_url)
+            async with session.get(robots_url) as response:
+                if response.status == 200:
+                    robots_txt = await response.text(errors='ignore')
+                    for line in robots_txt.splitlines():
+                        key, _, value = line.partition(':')
+                        if key.strip().lower() == 'sitemap' and value.strip():
+                            sitemaps.append(urljoin(origin, value.strip()))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Ошибка при загрузке {robots_url}: {e}")
+
+        return sitemaps or [f"{origin}/sitemap.xml"]
+
+    async def _parse_sitemap(self, session: aiohttp.ClientSession, sitemap_url: str,
+                             nested_sitemaps: List[str], page_urls: List[str]):
+        """Потоковый разбор sitemap или sitemap index (в том числе .gz) с постоянной памятью"""
+        print(f"Обрабатывается sitemap: {sitemap_url}")
+
+        await self._wait_for_host(sitemap_url)
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.timeout)
+        async with session.get(sitemap_url, timeout=timeout) as response:
+            response.raise_for_status()
+
+            parser = ET.XMLPullParser(events=('start', 'end'))
+            decompressor = None
+            root = None
+            first_chunk = True
+            parsed_size = 0
+
+            def feed(data: bytes) -> bool:
+                """Передает XML парсеру; False - достигнут лимит URL или размера"""
+                nonlocal root, parsed_size
+                parsed_size += len(data)
+                if parsed_size > self.max_sitemap_size:
+                    print(f"Sitemap {sitemap_url} больше {self.max_sitemap_size} байт, разбор остановлен")
+                    return False
+                parser.feed(data)
+
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        if root is None:
+                            root = elem
+                        continue
+
+                    tag = elem.tag.rsplit('}', 1)[-1]
+                    if tag == 'loc' and elem.text:
+                        loc = elem.text.strip()
+                        # Родитель <loc> - <sitemap> в индексе или <url> в обычном sitemap
+                        if root.tag.rsplit('}', 1)[-1] == 'sitemapindex':
+                            # Больше max_sitemap_files все равно не будет обработано
+                            if len(nested_sitemaps) < self.max_sitemap_files:
+                                nested_sitemaps.append(loc)
+                        else:
+                            page_urls.append(loc)
+                    elif tag in ('url', 'sitemap'):
+                        # Освобождаем разобранные записи, чтобы дерево не росло
+                        root.clear()
+
+                return len(page_urls) < self.max_sitemap_urls
+
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                # Сжатый файл (.gz) распознаем по сигнатуре gzip в первом блоке
+                if first_chunk:
+                    first_chunk = False
+                    if chunk[:2] == b'\x1f\x8b':
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+                if decompressor is None:
+                    if not feed(chunk):
+                        return
+                    continue
+
+                # Распаковываем порциями не больше 64 КБ: gzip-бомба не разворачивается в память целиком
+                while chunk:
+                    if not feed(decompressor.decompress(chunk, 64 * 1024)):
+                        return
+                    chunk = decompressor.unconsumed_tail
+
+            if decompressor and not feed(decompressor.flush()):
+                return
+            parser.close()
+
+    @staticmethod
+    def _same_origin(url: str, other: str) -> bool:
+        """Совпадают ли схема и хост (с портом) двух URL"""
+        parsed, parsed_other = urlparse(url), urlparse(other)
+        return (parsed.scheme.lower(), parsed.netloc.lower()) == \
+            (parsed_other.scheme.lower(), parsed_other.netloc.lower())
+
+    async def discover_from_sitemaps(self, session: aiohttp.ClientSession, start_url: str) -> List[str]:
+        """Сбор URL страниц из sitemap, указанных в robots.txt"""
+        parsed = urlparse(start_url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+
+        # Очередь sitemap вместе с корневым sitemap из robots.txt, из индекса которого они получены
+        sitemaps = deque((url, url) for url in await self._get_robots_sitemaps(session, origin))
+        processed = set()
+        page_urls: List[str] = []
+
+        while sitemaps and len(processed) < self.max_sitemap_files:
+            sitemap_url, root_url = sitemaps.popleft()
+            if sitemap_url in processed:
+                continue
+            processed.add(sitemap_url)
+            nested_sitemaps: List[str] = []
+            try:
+                await self._parse_sitemap(session, sitemap_url, nested_sitemaps, page_urls)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError, zlib.error) as e:
+                print(f"Ошибка при обработке sitemap {sitemap_url}: {e}")
+            for nested_url in nested_sitemaps:
+                # Индекс не может отправить парсер на чужой хост
+                if self._same_origin(nested_url, root_url):
+                    sitemaps.append((nested_url, root_url))
+                else:
+                    print(f"Пропущен sitemap {nested_url}: схема или хост не совпадают с {root_url}")
+            if len(page_urls) >= self.max_sitemap_urls:
+                break
+
+        return page_urls[:self.max_sitemap_urls]
+
+    async def crawl_website(self, start_url: str, max_pages: int = 100,
+                            use_sitemap: bool = False) -> Dict[str, List[str]]:
+        """
+        Основной метод для сканирования сайта
+
+        При use_sitemap сначала читаются sitemap из robots.txt; найденные в них URL
+        не загружаются, обход HTML дополняет только то, чего в sitemap нет.
+        """
+        # Нормализуем стартовый URL
+        start_url = self.normalize_url(start_url)
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait(start_url)
+        # Очередь ожидания ведет asyncio.Queue, фронтир отвечает только за членство
+        frontier = CrawlFrontier(self.bloom_capacity)
+        frontier.mark_seen(start_url)
+        self.internal_urls.add(start_url)
+
+        async def worker():
+            while True:
+                current_url = await queue.get()
+                try:
+                    # Страница считается посещенной в момент взятия, чтобы не превысить max_pages
+                    if current_url in self.visited_urls or len(self.visited_urls) >= max_pages:
+                        continue
+                    self.visited_urls.add(current_url)
+                    await self._process_page(session, current_url, start_url, queue, frontier)
+                finally:
+                    queue.task_done()
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent)
+        async with aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': self.user_agent},
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as session:
+            if use_sitemap:
+                for url in await self.discover_from_sitemaps(session, start_url):
+                    normalized_url = self.normalize_url(url)
+                    if self.is_media_url(normalized_url):
+                        self.media_urls.add(normalized_url)
+                    elif self.is_same_domain(start_url, normalized_url) and frontier.mark_seen(normalized_url):
+                        self.internal_urls.add(normalized_url)
+                        self.sitemap_urls_found += 1
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrent)]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        # Убираем стартовый URL из внутренних, если нужно
+        self.internal_urls.discard(start_url)
+
+        return {
+            'internal_urls': sorted(list(self.internal_urls)),
+            'media_urls': sorted(list(self.media_urls)),
+            'visited_pages': len(self.visited_urls),
+            'sitemap_urls': self.sitemap_urls_found
+        }
+
+
 # Сервисный класс для удобного использования
 class URLService:
     @staticmethod
-    def extract_urls(url: str, max_pages: int = 50) -> Dict[str, List[str]]:
+    async def extract_urls(url: str, max_pages: int = 50, use_sitemap: bool = False) -> Dict[str, List[str]]:
         """Основной метод сервиса для извлечения URL"""
-        crawler = WebsiteCrawler(delay=0.3)  # Увеличиваем задержку для безопасности
-        return crawler.crawl_website(url, max_pages)
+        crawler = AsyncWebsiteCrawler(
+            max_concurrent=settings.CRAWLER_MAX_CONCURRENT,
+            requests_per_second=settings.CRAWLER_HOST_RPS,
+            max_sitemap_files=settings.SITEMAP_MAX_FILES,
+            max_sitemap_urls=settings.SITEMAP_MAX_URLS,
+            max_sitemap_size=settings.SITEMAP_MAX_SIZE,
+            max_page_size=settings.CRAWLER_MAX_PAGE_SIZE
+        )
+        return await crawler.crawl_website(url, max_pages, use_sitemap=use_sitemap)
 
     @staticmethod
     def save_results(results: Dict[str, List[str]], filename: str = "urls_results.txt"):
@@ -258,5 +614,4 @@ class SimpleURLScanner:
 
     @staticmethod
     def is_media_url(url: str) -> bool:
-        media_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.mp4', '.mp3', '.pdf'}
-        return any(url.lower().endswith(ext) for ext in media_extensions)
+        return url.lower().endswith(SIMPLE_MEDIA_EXTENSIONS)